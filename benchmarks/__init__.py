@@ -0,0 +1 @@
+"""Performance benchmarks for the Health & Nutrition Coach Agent."""
@@ -0,0 +1,75 @@
+"""Benchmark the fast-path router on a mix of logging and conversational messages."""
+
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+
+from nutrition_coach_agent.config import FAST_PATH_MODEL_TURN_ESTIMATE_S
+from nutrition_coach_agent.fast_path import FastPathRouter
+
+# Roughly the shape of real traffic: most turns are quick logs, the rest need the model
+MESSAGES = [
+    "I drank 500ml of water",
+    "had a glass of water",
+    "drank 1.5 liters of water",
+    "just had 2 bottles of water",
+    "did 45 min moderate cardio",
+    "I did a 60 minute high intensity strength workout",
+    "ran for 30 minutes at a moderate pace",
+    "30 min of light yoga",
+    "had 2 eggs and a banana for breakfast",
+    "I ate chicken breast 150g and rice 1 cup for lunch",
+    "had greek yogurt with berries for a snack",
+    "had salmon and sweet potato for dinner",
+    "did 45 min cardio",
+    "had my usual smoothie for breakfast",
+    "I drank some water",
+    "How much water should I drink daily?",
+    "Can you create a weekly meal plan for me? I'm vegetarian.",
+    "I need a workout program for muscle gain.",
+    "Tomorrow is my rest day. What should I eat?",
+    "My knee hurts after squats, what should I do?"
+]
+REPEATS = 200
+
+
+def run_benchmark(messages: List[str] = MESSAGES) -> Dict[str, float]:
+    """Route every message, logging hits for a throwaway user, and time both paths."""
+    router = FastPathRouter()
+    context = SimpleNamespace(user_id="bench_fast_path", session=SimpleNamespace(id="bench"))
+    hits = [message for message in messages if router.match(message) is not None]
+    misses = [message for message in messages if message not in hits]
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for message in hits:
+            router.handle(message, tool_context=context)
+    hit_us = (time.perf_counter() - start) / (REPEATS * len(hits)) * 1e6
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for message in misses:
+            router.match(message)
+    miss_us = (time.perf_counter() - start) / (REPEATS * len(misses)) * 1e6
+
+    return {
+        "messages": len(messages),
+        "hits": len(hits),
+        "hit_rate": len(hits) / len(messages),
+        "hit_us": hit_us,
+        "miss_us": miss_us,
+        "saved_per_100_turns_s": 100 * (
+            len(hits) / len(messages) * FAST_PATH_MODEL_TURN_ESTIMATE_S - hit_us / 1e6
+        ) - 100 * len(misses) / len(messages) * miss_us / 1e6
+    }
+
+
+if __name__ == "__main__":
+    print("🚀 Fast-path router benchmark")
+    print("=" * 60)
+    result = run_benchmark()
+    print(f"Hit rate:            {result['hit_rate']:.0%} ({result['hits']}/{result['messages']} messages)")
+    print(f"Fast-path turn:      {result['hit_us']:.1f} µs (tool call + reply)")
+    print(f"Overhead on a miss:  {result['miss_us']:.1f} µs")
+    print(f"Saved per 100 turns: ~{result['saved_per_100_turns_s']:.0f} s "
+          f"(at {FAST_PATH_MODEL_TURN_ESTIMATE_S}s per model turn)")
@@ -0,0 +1,88 @@
+"""Compare memory per 100k log entries: legacy dict entries vs compact records."""
+
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from nutrition_coach_agent.records import HydrationRecord, MealRecord, WorkoutRecord
+
+ENTRY_COUNT = 100_000
+FOODS = ["chicken breast", "rice", "broccoli", "oats", "banana", "greek yogurt", "eggs", "salmon"]
+EXERCISES = ["squat", "bench press", "deadlift", "row", "plank"]
+
+
+def _timestamps(count: int) -> List[datetime]:
+    start = datetime.now() - timedelta(days=365)
+    step = timedelta(days=365) / count
+    return [start + step * i for i in range(count)]
+
+
+def _meal_data(i: int) -> Dict:
+    # Split per entry, as log_meal does from the tool's comma-separated input
+    return {
+        "name": "Chicken bowl",
+        "type": "lunch",
+        "foods": [f.strip() for f in ", ".join(FOODS[i % 5:i % 5 + 3]).split(",")],
+        "calories": 550 + i % 50,
+        "macros": {"protein": 40.0, "carbs": 55.0, "fats": 15.0},
+        "notes": ""
+    }
+
+
+def _workout_data(i: int) -> Dict:
+    return {
+        "type": "strength",
+        "duration": 45 + i % 30,
+        "intensity": "high",
+        "exercises": [e.strip() for e in ", ".join(EXERCISES[i % 3:i % 3 + 3]).split(",")],
+        "notes": ""
+    }
+
+
+def legacy_entries(kind: str, timestamps: List[datetime]) -> list:
+    """Build entries in the original nested-dict shape with ISO timestamps."""
+    if kind == "hydration":
+        return [{"timestamp": ts.isoformat(), "amount_ml": 250} for ts in timestamps]
+    build = _meal_data if kind == "meal" else _workout_data
+    return [{"timestamp": ts.isoformat(), "data": build(i)} for i, ts in enumerate(timestamps)]
+
+
+def compact_entries(kind: str, timestamps: List[datetime]) -> list:
+    """Build the same entries as compact records."""
+    if kind == "hydration":
+        return [HydrationRecord(ts.timestamp(), 250) for ts in timestamps]
+    record_cls, build = (MealRecord, _meal_data) if kind == "meal" else (WorkoutRecord, _workout_data)
+    return [record_cls.from_data(build(i), ts.timestamp()) for i, ts in enumerate(timestamps)]
+
+
+def measure(builder: Callable[[str, List[datetime]], list], kind: str, timestamps: List[datetime]) -> int:
+    """Return the bytes still allocated by the entries ``builder`` returns."""
+    tracemalloc.start()
+    entries = builder(kind, timestamps)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del entries
+    return size
+
+
+def run_benchmark(entry_count: int = ENTRY_COUNT) -> List[Dict[str, float]]:
+    timestamps = _timestamps(entry_count)
+    results = []
+    for kind in ("meal", "workout", "hydration"):
+        before = measure(legacy_entries, kind, timestamps)
+        after = measure(compact_entries, kind, timestamps)
+        results.append({
+            "kind": kind,
+            "legacy_mb": before / 1e6,
+            "compact_mb": after / 1e6,
+            "saving": 1 - after / before
+        })
+    return results
+
+
+if __name__ == "__main__":
+    print(f"🚀 Log record memory per {ENTRY_COUNT:,} entries")
+    print("=" * 60)
+    print(f"{'kind':>10} {'dict (MB)':>12} {'records (MB)':>14} {'saving':>8}")
+    for row in run_benchmark():
+        print(f"{row['kind']:>10} {row['legacy_mb']:>12.1f} {row['compact_mb']:>14.1f} {row['saving']:>8.0%}")
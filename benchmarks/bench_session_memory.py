@@ -0,0 +1,50 @@
+"""Benchmark SessionMemory daily lookups against growing log history."""
+
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from nutrition_coach_agent.tools import SessionMemory
+
+HISTORY_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+HISTORY_DAYS = 365
+REPEATS = 200
+
+
+def build_memory(history_size: int) -> SessionMemory:
+    """Create a SessionMemory pre-filled with ``history_size`` past hydration entries."""
+    memory = SessionMemory()
+    start = datetime.now() - timedelta(days=HISTORY_DAYS)
+    step = timedelta(days=HISTORY_DAYS) / history_size
+    for i in range(history_size):
+        memory.log_hydration(250, timestamp=start + step * i)
+    return memory
+
+
+def time_call(func, repeats: int = REPEATS) -> float:
+    """Return the mean latency of ``func`` in microseconds."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def run_benchmark(history_sizes: List[int] = HISTORY_SIZES) -> List[Dict[str, float]]:
+    """Measure today's summary and hydration logging at each history size."""
+    results = []
+    for size in history_sizes:
+        memory = build_memory(size)
+        results.append({
+            "history_size": size,
+            "log_hydration_us": time_call(lambda: memory.log_hydration(250)),
+            "daily_summary_us": time_call(memory.get_daily_summary),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    print("🚀 SessionMemory daily lookup benchmark")
+    print("=" * 60)
+    print(f"{'history':>10} {'log_hydration (µs)':>20} {'daily_summary (µs)':>20}")
+    for row in run_benchmark():
+        print(f"{row['history_size']:>10} {row['log_hydration_us']:>20.1f} {row['daily_summary_us']:>20.1f}")
@@ -0,0 +1,50 @@
+"""Benchmark SQLite write-behind logging throughput at several batch sizes."""
+
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+from nutrition_coach_agent.storage import SQLiteBackend
+from nutrition_coach_agent.tools import SessionMemory
+
+BATCH_SIZES = [1, 16, 128, 1024]
+LOG_COUNT = 20_000
+USER_COUNT = 50
+
+
+def run_benchmark(batch_sizes: List[int] = BATCH_SIZES, log_count: int = LOG_COUNT) -> List[Dict[str, float]]:
+    """Measure durable logs/sec (time until every write is committed) per batch size."""
+    results = []
+    for batch_size in batch_sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = SQLiteBackend(os.path.join(tmp, "bench.db"), batch_size=batch_size)
+            memories = [SessionMemory(user_id=f"user_{i}", backend=backend) for i in range(USER_COUNT)]
+
+            start = time.perf_counter()
+            for i in range(log_count):
+                memory = memories[i % USER_COUNT]
+                if i % 3 == 0:
+                    memory.log_hydration(250)
+                elif i % 3 == 1:
+                    memory.log_meal({"name": "Oats", "calories": 350, "macros": {"protein": 15}})
+                else:
+                    memory.log_workout({"type": "cardio", "duration": 30, "intensity": "moderate"})
+            backend.flush()
+            elapsed = time.perf_counter() - start
+
+            results.append({
+                "batch_size": batch_size,
+                "logs_per_sec": log_count / elapsed,
+                "transactions": backend.batches_committed
+            })
+            backend.close()
+    return results
+
+
+if __name__ == "__main__":
+    print("🚀 SQLite write-behind throughput benchmark")
+    print("=" * 60)
+    print(f"{'batch size':>10} {'logs/sec':>12} {'transactions':>14}")
+    for row in run_benchmark():
+        print(f"{row['batch_size']:>10} {row['logs_per_sec']:>12.0f} {row['transactions']:>14}")
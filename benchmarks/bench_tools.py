@@ -0,0 +1,206 @@
+"""Micro-benchmarks for the tool layer at growing history sizes, with baselines.
+
+Each tool is timed against a user with 10 to 10^6 logged entries. Results
+(ops/sec, p50/p99 latency, peak memory) can be saved as a JSON baseline;
+later runs compared against it exit with status 1 on a regression.
+
+    python -m benchmarks.bench_tools --save-baseline
+    python -m benchmarks.bench_tools              # compares with the saved baseline
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from nutrition_coach_agent.tools import (
+    get_daily_summary,
+    get_shopping_list,
+    get_trends,
+    get_user_stats,
+    log_meal,
+    log_water_intake,
+    log_workout,
+    save_meal_plan_to_memory,
+    save_user_profile,
+    session_store
+)
+
+HISTORY_SIZES = [10, 1_000, 100_000, 1_000_000]
+HISTORY_DAYS = 365
+MIN_ITERATIONS = 50
+MAX_ITERATIONS = 2_000
+TIME_BUDGET_S = 0.5
+MEMORY_ITERATIONS = 20
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "bench_tools.json")
+DEFAULT_TOLERANCE = 0.5
+
+MEAL_PLAN_JSON = json.dumps({
+    day: {
+        "breakfast": {"name": "Greek yogurt with berries", "calories": 350, "protein_g": 25,
+                      "foods": ["greek yogurt 200g", "blueberries 1/2 cup"]},
+        "lunch": {"name": "Chicken rice bowl", "calories": 650, "protein_g": 45,
+                  "foods": ["150g chicken breast", "rice 1 cup", "1 tbsp olive oil"]},
+        "dinner": {"name": "Salmon with sweet potato", "calories": 700, "protein_g": 42,
+                   "foods": ["salmon 150g", "1 sweet potato", "broccoli 1 cup"]},
+        "snacks": [{"name": "Protein shake", "calories": 200, "protein_g": 30,
+                    "foods": ["1 scoop whey protein", "milk 250ml"]}]
+    }
+    for day in ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+})
+
+
+def build_context(history_size: int) -> SimpleNamespace:
+    """Create a user with ``history_size`` log entries spread over the past year."""
+    context = SimpleNamespace(user_id=f"bench_tools_{history_size}", session=SimpleNamespace(id="bench"))
+    session_store.evict(context.user_id)
+    save_user_profile("Bench", 30, 75, 178, "muscle_gain", "moderate", tool_context=context)
+    save_meal_plan_to_memory(MEAL_PLAN_JSON, tool_context=context)
+
+    with session_store.lease(context.user_id) as memory:
+        start = datetime.now() - timedelta(days=HISTORY_DAYS)
+        step = timedelta(days=HISTORY_DAYS) / history_size
+        for i in range(history_size):
+            timestamp = start + step * i
+            kind = i % 3
+            if kind == 0:
+                memory.log_hydration(250, timestamp=timestamp)
+            elif kind == 1:
+                memory.log_meal({
+                    "name": "Chicken bowl", "type": "lunch", "foods": ["chicken breast", "rice"],
+                    "calories": 600, "macros": {"protein": 45, "carbs": 60, "fats": 15}, "notes": ""
+                }, timestamp=timestamp)
+            else:
+                memory.log_workout({
+                    "type": "strength", "duration": 60, "intensity": "high",
+                    "exercises": ["squat", "bench press"], "notes": ""
+                }, timestamp=timestamp)
+    return context
+
+
+def benchmark_operations(context: SimpleNamespace) -> Dict[str, Callable[[], Any]]:
+    """The tool calls to time; read-only ones first so writes do not skew them."""
+    return {
+        "get_daily_summary": lambda: get_daily_summary(tool_context=context),
+        "get_daily_summary_details": lambda: get_daily_summary("details", tool_context=context),
+        "get_user_stats": lambda: get_user_stats(tool_context=context),
+        "get_trends": lambda: get_trends(tool_context=context),
+        "get_shopping_list": lambda: get_shopping_list(tool_context=context),
+        "save_meal_plan_to_memory": lambda: save_meal_plan_to_memory(MEAL_PLAN_JSON, tool_context=context),
+        "log_water_intake": lambda: log_water_intake(250, tool_context=context),
+        "log_meal": lambda: log_meal("Oats", "breakfast", "oats, banana", 450, 20, 70, 10, tool_context=context),
+        "log_workout": lambda: log_workout("cardio", 45, "moderate", "running", tool_context=context)
+    }
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def time_operation(func: Callable[[], Any]) -> Dict[str, float]:
+    """Time ``func`` until the time budget or iteration cap is reached."""
+    latencies = []
+    deadline = time.perf_counter() + TIME_BUDGET_S
+    while len(latencies) < MAX_ITERATIONS and (len(latencies) < MIN_ITERATIONS or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    return {
+        "iterations": len(latencies),
+        "ops_per_sec": len(latencies) / sum(latencies),
+        "p50_us": _percentile(latencies, 0.50) * 1e6,
+        "p99_us": _percentile(latencies, 0.99) * 1e6
+    }
+
+
+def peak_memory(func: Callable[[], Any]) -> int:
+    """Peak bytes allocated while running ``func`` a few times (traced separately from timing)."""
+    tracemalloc.start()
+    for _ in range(MEMORY_ITERATIONS):
+        func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def run_benchmark(history_sizes: List[int] = HISTORY_SIZES) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Return results as ``{history_size: {operation: metrics}}``."""
+    results = {}
+    for size in history_sizes:
+        context = build_context(size)
+        results[str(size)] = {}
+        for name, func in benchmark_operations(context).items():
+            metrics = time_operation(func)
+            metrics["peak_kb"] = peak_memory(func) / 1024
+            results[str(size)][name] = metrics
+        session_store.evict(context.user_id)
+    return results
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return a description of every p50 latency that regressed beyond ``tolerance``."""
+    regressions = []
+    for size, operations in results.items():
+        for name, metrics in operations.items():
+            previous = baseline.get(size, {}).get(name)
+            if previous and metrics["p50_us"] > previous["p50_us"] * (1 + tolerance):
+                regressions.append(
+                    f"{name} @ {size} entries: p50 {metrics['p50_us']:.1f}µs vs baseline {previous['p50_us']:.1f}µs"
+                )
+    return regressions
+
+
+def print_results(results: Dict):
+    print(f"{'history':>9} {'operation':<26} {'ops/sec':>10} {'p50 (µs)':>10} {'p99 (µs)':>10} {'peak (KB)':>10}")
+    for size, operations in results.items():
+        for name, m in operations.items():
+            print(f"{size:>9} {name:<26} {m['ops_per_sec']:>10.0f} {m['p50_us']:>10.1f} "
+                  f"{m['p99_us']:>10.1f} {m['peak_kb']:>10.1f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the tool layer and SessionMemory at scale.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=HISTORY_SIZES, help="History sizes to test")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed p50 slowdown vs baseline before failing (0.5 = 50%%)")
+    args = parser.parse_args(argv)
+
+    print("🚀 Tool layer micro-benchmarks")
+    print("=" * 80)
+    results = run_benchmark(args.sizes)
+    print_results(results)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nℹ️ No baseline at {args.baseline} - run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) against {args.baseline}:")
+        for regression in regressions:
+            print(f"   {regression}")
+        return 1
+    print(f"\n✅ No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,58 +1,77 @@
 """Evaluation framework for the Health & Nutrition Coach Agent."""
 
+import argparse
+import asyncio
 import os
-from typing import List, Dict, Any
+import time
+import uuid
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
+from google.adk.apps import App
+from google.adk.plugins.base_plugin import BasePlugin
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
-from nutrition_coach_agent.agent import root_agent
+from google.genai import types
+from nutrition_coach_agent.async_tools import LoopLagMonitor, LoopLagPlugin
+from nutrition_coach_agent.config import LOOP_LAG_THRESHOLD_MS
+from nutrition_coach_agent.fast_path import FastPathPlugin
+from nutrition_coach_agent.model_scheduler import model_scheduler
+from nutrition_coach_agent.model_tiers import model_tiering
+from nutrition_coach_agent.record_replay import RecordReplayPlugin
+from nutrition_coach_agent.tracing import TracingPlugin
 
 # Load environment variables
 load_dotenv()
 
 
+APP_NAME = "health_nutrition_coach_eval"
+DEFAULT_MAX_CONCURRENCY = 4
+
+
 class AgentEvaluator:
-    """Evaluator for testing agent capabilities and quality."""
+    """Evaluator for testing agent capabilities and quality.
+
+    Every test case runs as its own user in a fresh session, so tests cannot
+    see each other's conversation history or logged data and can safely run
+    concurrently (see ``run_tests``).
+    """
 
-    def __init__(self, agent):
+    def __init__(self, agent, plugins: Optional[List[BasePlugin]] = None):
         self.agent = agent
+        self.session_service = InMemorySessionService()
         self.runner = Runner(
-            agent=agent,
-            session_service=InMemorySessionService()
+            app=App(name=APP_NAME, root_agent=agent, plugins=plugins or []),
+            session_service=self.session_service
         )
         self.test_results = []
         self.user_id = "test_user"
-        self.session_id = "test_session"
-
-    async def run_test_async(self, test_name: str, prompt: str, expected_elements: List[str]) -> Dict[str, Any]:
-        """
-        Run a single test case asynchronously.
-
-        Args:
-            test_name: Name of the test
-            prompt: User prompt to send to agent
-            expected_elements: List of expected elements in response
-
-        Returns:
-            Dictionary with test results
-        """
-        print(f"\n{'=' * 60}")
-        print(f"🧪 Running Test: {test_name}")
-        print(f"{'=' * 60}")
-        print(f"📨 Prompt: {prompt}\n")
+        self.suite_wall_time_s: Optional[float] = None
+
+    async def _new_session(self, test_name: str):
+        """Create an isolated user and session for one test case."""
+        user_id = f"{self.user_id}_{uuid.uuid4().hex[:8]}"
+        return await self.session_service.create_session(
+            app_name=APP_NAME,
+            user_id=user_id,
+            session_id=f"{test_name.lower().replace(' ', '_')}_{uuid.uuid4().hex[:8]}"
+        )
 
+    async def _execute_test(self, test_name: str, prompt: str, expected_elements: List[str]) -> Dict[str, Any]:
+        """Run one test case in its own session and score the response (no printing)."""
+        start = time.perf_counter()
         try:
+            session = await self._new_session(test_name)
+            message = types.Content(role="user", parts=[types.Part(text=prompt)])
+
             # Run the agent
             response_text = ""
             async for event in self.runner.run_async(
-                    user_id=self.user_id,
-                    session_id=self.session_id,
-                    new_message=prompt
+                    user_id=session.user_id,
+                    session_id=session.id,
+                    new_message=message
             ):
-                if hasattr(event, 'text') and event.text:
-                    response_text += event.text
-
-            print(f"🤖 Response Preview: {response_text[:300]}...\n")
+                if event.content and event.content.parts:
+                    response_text += "".join(part.text or "" for part in event.content.parts)
 
             # Check for expected elements
             elements_found = []
@@ -64,43 +83,109 @@ class AgentEvaluator:
                 else:
                     elements_missing.append(element)
 
-            success = len(elements_missing) == 0
-
-            result = {
+            return {
                 "test_name": test_name,
                 "prompt": prompt,
-                "success": success,
+                "success": len(elements_missing) == 0,
                 "response_length": len(response_text),
+                "response_preview": response_text[:300],
                 "elements_found": elements_found,
-                "elements_missing": elements_missing
+                "elements_missing": elements_missing,
+                "expected_count": len(expected_elements),
+                "wall_time_s": time.perf_counter() - start
             }
 
-            self.test_results.append(result)
-
-            if success:
-                print(f"✅ Test PASSED - All {len(expected_elements)} elements found")
-            else:
-                print(f"⚠️ Test PARTIAL - {len(elements_found)}/{len(expected_elements)} elements found")
-                print(f"   Missing: {', '.join(elements_missing)}")
-
-            return result
-
         except Exception as e:
-            print(f"❌ Test FAILED with error: {e}")
-            result = {
+            return {
                 "test_name": test_name,
                 "prompt": prompt,
                 "success": False,
-                "error": str(e)
+                "error": str(e),
+                "wall_time_s": time.perf_counter() - start
             }
-            self.test_results.append(result)
-            return result
+
+    @staticmethod
+    def _print_result(result: Dict[str, Any]):
+        """Print the outcome of one test case."""
+        print(f"\n{'=' * 60}")
+        print(f"🧪 Test: {result['test_name']} ({result['wall_time_s']:.2f}s)")
+        print(f"{'=' * 60}")
+        print(f"📨 Prompt: {result['prompt']}\n")
+
+        if "error" in result:
+            print(f"❌ Test FAILED with error: {result['error']}")
+            return
+
+        print(f"🤖 Response Preview: {result['response_preview']}...\n")
+        if result["success"]:
+            print(f"✅ Test PASSED - All {result['expected_count']} elements found")
+        else:
+            print(f"⚠️ Test PARTIAL - {len(result['elements_found'])}/{result['expected_count']} elements found")
+            print(f"   Missing: {', '.join(result['elements_missing'])}")
+
+    async def run_test_async(self, test_name: str, prompt: str, expected_elements: List[str]) -> Dict[str, Any]:
+        """
+        Run a single test case asynchronously.
+
+        Args:
+            test_name: Name of the test
+            prompt: User prompt to send to agent
+            expected_elements: List of expected elements in response
+
+        Returns:
+            Dictionary with test results
+        """
+        result = await self._execute_test(test_name, prompt, expected_elements)
+        self.test_results.append(result)
+        self._print_result(result)
+        return result
 
     def run_test(self, test_name: str, prompt: str, expected_elements: List[str]) -> Dict[str, Any]:
         """Synchronous wrapper for run_test_async."""
-        import asyncio
         return asyncio.run(self.run_test_async(test_name, prompt, expected_elements))
 
+    async def run_tests_async(
+            self,
+            test_cases: List[Dict[str, Any]],
+            max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> List[Dict[str, Any]]:
+        """
+        Run many test cases concurrently, each in its own session.
+
+        Args:
+            test_cases: Dictionaries with test_name, prompt and expected_elements
+            max_concurrency: Maximum number of test cases in flight at once
+
+        Returns:
+            List of test results in the same order as ``test_cases``
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run_one(test_case: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._execute_test(
+                    test_case["test_name"],
+                    test_case["prompt"],
+                    test_case["expected_elements"]
+                )
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(run_one(test_case) for test_case in test_cases))
+        self.suite_wall_time_s = time.perf_counter() - start
+
+        for result in results:
+            self.test_results.append(result)
+            self._print_result(result)
+        return list(results)
+
+    def run_tests(
+            self,
+            test_cases: List[Dict[str, Any]],
+            max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> List[Dict[str, Any]]:
+        """Synchronous wrapper for run_tests_async."""
+        return asyncio.run(self.run_tests_async(test_cases, max_concurrency))
+
     def print_summary(self):
         """Print overall test summary."""
         print(f"\n{'=' * 60}")
@@ -118,32 +203,31 @@ class AgentEvaluator:
         print("\n📋 Test Details:")
         for i, result in enumerate(self.test_results, 1):
             status = "✅" if result.get("success") else "❌"
-            print(f"{i}. {status} {result['test_name']}")
-
+            print(f"{i}. {status} {result['test_name']} ({result.get('wall_time_s', 0):.2f}s)")
 
-def run_evaluation():
-    """Run comprehensive evaluation of the Health & Nutrition Coach Agent."""
+        if self.suite_wall_time_s is not None:
+            total_test_time = sum(r.get("wall_time_s", 0) for r in self.test_results)
+            print(f"\n⏱️ Suite wall time: {self.suite_wall_time_s:.2f}s (sum of test times: {total_test_time:.2f}s)")
 
-    evaluator = AgentEvaluator(root_agent)
 
+EVALUATION_TEST_CASES = [
     # Test 1: Initial Onboarding
-    evaluator.run_test(
-        test_name="Initial Onboarding",
-        prompt="Hi! I'm new here and want to start my fitness journey. I'm 28 years old, weigh 75kg, height 175cm, and want to gain muscle.",
-        expected_elements=[
+    {
+        "test_name": "Initial Onboarding",
+        "prompt": "Hi! I'm new here and want to start my fitness journey. I'm 28 years old, weigh 75kg, height 175cm, and want to gain muscle.",
+        "expected_elements": [
             "profile",
             "calorie",
             "protein",
             "goal",
             "muscle"
         ]
-    )
-
+    },
     # Test 2: Meal Plan Creation
-    evaluator.run_test(
-        test_name="Meal Plan Creation",
-        prompt="Can you create a weekly meal plan for me? I'm vegetarian and allergic to nuts.",
-        expected_elements=[
+    {
+        "test_name": "Meal Plan Creation",
+        "prompt": "Can you create a weekly meal plan for me? I'm vegetarian and allergic to nuts.",
+        "expected_elements": [
             "meal plan",
             "vegetarian",
             "protein",
@@ -151,44 +235,62 @@ def run_evaluation():
             "lunch",
             "dinner"
         ]
-    )
-
+    },
     # Test 3: Workout Program
-    evaluator.run_test(
-        test_name="Workout Program Design",
-        prompt="I need a workout program for muscle gain. I have access to a full gym.",
-        expected_elements=[
+    {
+        "test_name": "Workout Program Design",
+        "prompt": "I need a workout program for muscle gain. I have access to a full gym.",
+        "expected_elements": [
             "workout",
             "muscle",
             "exercises",
             "sets",
             "reps"
         ]
-    )
-
+    },
     # Test 4: Hydration Tracking
-    evaluator.run_test(
-        test_name="Hydration Guidance",
-        prompt="How much water should I drink daily? And can you help me track it?",
-        expected_elements=[
+    {
+        "test_name": "Hydration Guidance",
+        "prompt": "How much water should I drink daily? And can you help me track it?",
+        "expected_elements": [
             "water",
             "hydration",
             "ml",
             "track"
         ]
-    )
-
+    },
     # Test 5: Recovery Guidance
-    evaluator.run_test(
-        test_name="Recovery Guidance",
-        prompt="Tomorrow is my rest day. What should I do differently with my nutrition and activities?",
-        expected_elements=[
+    {
+        "test_name": "Recovery Guidance",
+        "prompt": "Tomorrow is my rest day. What should I do differently with my nutrition and activities?",
+        "expected_elements": [
             "rest day",
             "recovery",
             "nutrition",
             "protein"
         ]
-    )
+    }
+]
+
+
+def run_evaluation(
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        plugins: Optional[List[BasePlugin]] = None,
+        app: Optional[App] = None
+):
+    """
+    Run comprehensive evaluation of the Health & Nutrition Coach Agent.
+
+    Runs ``app`` (the exported ``nutrition_coach_agent.agent.app`` by
+    default) with its own plugins, followed by ``plugins``.
+    """
+    if app is None:
+        from nutrition_coach_agent.agent import app
+
+    evaluator = AgentEvaluator(app.root_agent, plugins=[*app.plugins, *(plugins or [])])
+
+    # Run all test cases concurrently, each in its own session
+    evaluator.run_tests(EVALUATION_TEST_CASES, max_concurrency=max_concurrency)
 
     # Print summary
     evaluator.print_summary()
@@ -196,11 +298,87 @@ def run_evaluation():
     return evaluator.test_results
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evaluate the Health & Nutrition Coach Agent.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", metavar="CASSETTE", help="Record model and tool calls to a cassette file")
+    mode.add_argument("--replay", metavar="CASSETTE", help="Replay model calls from a cassette file (offline)")
+    parser.add_argument("--latency-scale", type=float, default=0.0,
+                        help="During replay, sleep for the recorded model latency times this factor")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="Maximum number of test cases run at once")
+    parser.add_argument("--trace", metavar="SPANS_JSONL",
+                        help="Trace turns, agents, model and tool calls; write spans to this JSONL file")
+    parser.add_argument("--fast-path", action=argparse.BooleanOptionalAction, default=None,
+                        help="Answer simple logging messages without the model and report the hit rate "
+                             "(default: FAST_PATH_ENABLED)")
+    parser.add_argument("--loop-lag", type=float, nargs="?", const=LOOP_LAG_THRESHOLD_MS, metavar="THRESHOLD_MS",
+                        help="Report tools that block the event loop for longer than this (default: %(const)sms)")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+
     print("🚀 Starting Health & Nutrition Coach Agent Evaluation")
     print("=" * 60)
 
-    results = run_evaluation()
+    from nutrition_coach_agent.agent import app, app_plugins
+
+    if args.trace or args.fast_path is not None:
+        app = app.model_copy(update={"plugins": app_plugins(
+            tracing=True if args.trace else None, trace_path=args.trace, fast_path=args.fast_path
+        )})
+    tracing = next((p for p in app.plugins if isinstance(p, TracingPlugin)), None)
+    fast_path = next((p for p in app.plugins if isinstance(p, FastPathPlugin)), None)
+
+    plugins = []
+    loop_lag = LoopLagPlugin(LoopLagMonitor(threshold_ms=args.loop_lag)) if args.loop_lag is not None else None
+    if loop_lag is not None:
+        plugins.append(loop_lag)
+
+    plugin = None
+    if args.record:
+        plugin = RecordReplayPlugin(args.record, mode="record")
+    elif args.replay:
+        plugin = RecordReplayPlugin(args.replay, mode="replay", latency_scale=args.latency_scale)
+    if plugin is not None:
+        plugins.append(plugin)
+
+    results = run_evaluation(args.max_concurrency, plugins=plugins or None, app=app)
+
+    if plugin is not None:
+        plugin.save()
+        print(f"\n📼 Cassette: {plugin.cassette.path} ({len(plugin.cassette.model_calls)} model calls)")
+
+    if fast_path is not None:
+        stats = fast_path.stats()
+        print(f"\n⚡ Fast path: {stats['hit_rate']:.0%} of {stats['messages']} messages "
+              f"({stats['avg_fast_path_ms']:.2f}ms each), ~{stats['estimated_latency_saved_s']:.1f}s saved")
+
+    if loop_lag is not None:
+        stats = loop_lag.monitor.stats()
+        print(f"\n🐢 Event-loop lag: p50 {stats['p50_ms']:.1f}ms, p99 {stats['p99_ms']:.1f}ms, "
+              f"max {stats['max_ms']:.1f}ms; {stats['stalls']} stalls over {args.loop_lag:g}ms")
+        for tool, count in sorted(stats["stalls_by_tool"].items(), key=lambda item: -item[1]):
+            print(f"   {tool}: {count}")
+
+    for model, stats in model_scheduler.stats().items():
+        print(f"\n🚦 {model}: {stats['requests']} requests, {stats['retries']} retries "
+              f"({stats['rate_limited']} rate limited), {stats['coalesced']} coalesced, {stats['failures']} failed; "
+              f"queue wait p50 {stats['queue_wait_p50_ms']:.0f}ms, p99 {stats['queue_wait_p99_ms']:.0f}ms")
+
+    tiering = model_tiering.stats()
+    for agent, counts in tiering["decisions"].items():
+        print(f"\n🎚️ {agent}: " + ", ".join(f"{tier} {count}" for tier, count in counts.items()))
+    if tiering["fallbacks"]:
+        print("   fallbacks: " + ", ".join(f"{reason} {count}" for reason, count in tiering["fallbacks"].items()))
+
+    if tracing is not None:
+        tracing.tracer.close()
+        exporter = tracing.tracer.exporter
+        print("\n⏱️ Latency by operation" + (f" (spans written to {exporter.path}):" if exporter else ":"))
+        tracing.tracer.print_summary()
 
     print(f"\n{'=' * 60}")
     print("✅ Evaluation Complete!")
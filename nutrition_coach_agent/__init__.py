@@ -1,3 +1,12 @@
 """Health & Nutrition Coach Agent - Main package."""
 
-from . import agent
\ No newline at end of file
+import importlib
+
+
+def __getattr__(name):
+    # ``agent`` pulls in google.adk and builds the agent tree, so it is only
+    # imported when first accessed (e.g. by ``adk run``); ``tools`` and the
+    # other modules can be imported without paying for it.
+    if name == "agent":
+        return importlib.import_module(f"{__name__}.agent")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
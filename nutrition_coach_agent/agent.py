@@ -1,32 +1,78 @@
 """Main Health & Nutrition Coach Agent - Orchestrates all sub-agents using Google ADK."""
 
+from typing import List, Optional
+
 from google.adk.agents import Agent
-from google.adk.tools import google_search, FunctionTool
-from nutrition_coach_agent.config import MAIN_MODEL, PLANNER_MODEL, WORKOUT_MODEL, TRACKER_MODEL, RECOVERY_MODEL
+from google.adk.apps import App
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.tools import FunctionTool
+from nutrition_coach_agent.config import (
+    FAST_PATH_ENABLED,
+    MAIN_MODEL,
+    PLANNER_MODEL,
+    WORKOUT_MODEL,
+    TRACKER_MODEL,
+    RECOVERY_MODEL,
+    TRACE_PATH,
+    TRACING_ENABLED
+)
+from nutrition_coach_agent.async_tools import to_async
+from nutrition_coach_agent.fast_path import FastPathPlugin
+from nutrition_coach_agent.fanout import SpecialistFanOut
+from nutrition_coach_agent.meal_planning import LlmDayPlanner, WeeklyMealPlanAgent
+from nutrition_coach_agent.model_scheduler import BACKGROUND
+from nutrition_coach_agent.model_tiers import tiered_model
+from nutrition_coach_agent.tracing import TracingPlugin
 from nutrition_coach_agent.tools import (
     save_user_profile,
+    compute_targets,
     log_workout,
     log_meal,
+    estimate_food_nutrition,
     log_water_intake,
+    log_meals,
+    log_workouts,
+    log_water_intakes,
     get_daily_summary,
+    get_daily_totals,
     save_meal_plan_to_memory,
-    get_user_stats
+    get_cached_meal_plan,
+    get_planned_meal,
+    get_remaining_meals,
+    get_meal_plan_totals,
+    get_shopping_list,
+    get_user_stats,
+    get_trends,
+    web_search
 )
 
 
-# Wrap custom tools with FunctionTool
-save_profile_tool = FunctionTool(func=save_user_profile)
-log_workout_tool = FunctionTool(func=log_workout)
-log_meal_tool = FunctionTool(func=log_meal)
-log_water_tool = FunctionTool(func=log_water_intake)
-daily_summary_tool = FunctionTool(func=get_daily_summary)
-save_meal_plan_tool = FunctionTool(func=save_meal_plan_to_memory)
-user_stats_tool = FunctionTool(func=get_user_stats)
-
-
-# Sub-Agent 1: Nutrition Planner (with Google Search only)
+# Wrap custom tools with FunctionTool; the synchronous ones run on the tool thread pool
+save_profile_tool = FunctionTool(func=to_async(save_user_profile))
+compute_targets_tool = FunctionTool(func=to_async(compute_targets))
+log_workout_tool = FunctionTool(func=to_async(log_workout))
+log_meal_tool = FunctionTool(func=to_async(log_meal))
+estimate_food_tool = FunctionTool(func=to_async(estimate_food_nutrition))
+log_water_tool = FunctionTool(func=to_async(log_water_intake))
+log_meals_tool = FunctionTool(func=to_async(log_meals))
+log_workouts_tool = FunctionTool(func=to_async(log_workouts))
+log_water_intakes_tool = FunctionTool(func=to_async(log_water_intakes))
+daily_summary_tool = FunctionTool(func=to_async(get_daily_summary))
+daily_totals_tool = FunctionTool(func=to_async(get_daily_totals))
+save_meal_plan_tool = FunctionTool(func=to_async(save_meal_plan_to_memory))
+cached_meal_plan_tool = FunctionTool(func=to_async(get_cached_meal_plan))
+planned_meal_tool = FunctionTool(func=to_async(get_planned_meal))
+remaining_meals_tool = FunctionTool(func=to_async(get_remaining_meals))
+meal_plan_totals_tool = FunctionTool(func=to_async(get_meal_plan_totals))
+shopping_list_tool = FunctionTool(func=to_async(get_shopping_list))
+user_stats_tool = FunctionTool(func=to_async(get_user_stats))
+trends_tool = FunctionTool(func=to_async(get_trends))
+web_search_tool = FunctionTool(func=web_search)
+
+
+# Sub-Agent 1: Nutrition Planner (with cached web search only)
 nutrition_planner = Agent(
-    model=PLANNER_MODEL,
+    model=tiered_model("nutrition_planner", PLANNER_MODEL),
     name="nutrition_planner",
     description="Expert nutritionist that creates comprehensive weekly meal plans tailored to user goals.",
     instruction="""You are an expert nutritionist and meal planning specialist. Your role is to create detailed weekly meal plans that:
@@ -58,7 +104,8 @@ nutrition_planner = Agent(
    - Include preparation time estimates
    - Suggest meal prep strategies for the week
    - Consider budget-friendly options
-   - Provide shopping list grouped by category
+   - List every meal's foods with amounts (e.g. "chicken breast 150g", "rice 1 cup") - the shopping
+     list is computed from them automatically, so do NOT write a shopping list yourself
 
 6. WORKOUT INTEGRATION:
    - Optimize pre-workout meals (complex carbs + moderate protein, 2-3 hours before)
@@ -70,19 +117,28 @@ nutrition_planner = Agent(
    - Daily calorie and macro totals
    - Meal-by-meal breakdown with recipes or meal ideas
    - Estimated macros per meal
-   - Weekly shopping list
+   - Foods with amounts for each meal (a "foods" list per meal when returning JSON)
    - Meal prep instructions
 
-Use Google Search to find current nutrition information, recipes, and food macro data when needed.
+Use the web_search tool (cached Google Search) to find current nutrition information, recipes, and food macro data when needed.
 Be specific with portion sizes and measurements (grams, cups, servings).
 Explain the reasoning behind nutritional choices when relevant.""",
-    tools=[google_search]
+    tools=[web_search_tool]
 )
 
 
-# Sub-Agent 2: Workout Advisor (with Google Search only)
+# Sub-Agent 1b: Weekly Meal Plan pipeline (days generated concurrently, streamed as ready)
+weekly_meal_planner = WeeklyMealPlanAgent(
+    name="weekly_meal_planner",
+    description="Builds and saves a complete 7-day meal plan from the user's saved profile and targets, "
+                "generating the days in parallel and showing each day as soon as it is ready.",
+    generate_day=LlmDayPlanner(tiered_model("day_meal_planner", PLANNER_MODEL, priority=BACKGROUND))
+)
+
+
+# Sub-Agent 2: Workout Advisor (with cached web search only)
 workout_advisor = Agent(
-    model=WORKOUT_MODEL,
+    model=tiered_model("workout_advisor", WORKOUT_MODEL),
     name="workout_advisor",
     description="Expert personal trainer that designs workout programs and provides exercise guidance.",
     instruction="""You are an experienced personal trainer and exercise physiologist. Your role is to:
@@ -147,16 +203,16 @@ workout_advisor = Agent(
    - Suggest mobility and flexibility work
    - Recommend when to seek professional help
 
-Use Google Search to find current exercise science research, training methodologies, and exercise demonstrations when needed.
+Use the web_search tool (cached Google Search) to find current exercise science research, training methodologies, and exercise demonstrations when needed.
 Provide clear, actionable workout plans with specific exercises, sets, reps, and rest periods.
 Be motivating but realistic about expectations and timeline.""",
-    tools=[google_search]
+    tools=[web_search_tool]
 )
 
 
-# Sub-Agent 3: Progress Tracker (with custom tools only - NO google_search)
+# Sub-Agent 3: Progress Tracker (with custom tools only - NO web search)
 progress_tracker = Agent(
-    model=TRACKER_MODEL,
+    model=tiered_model("progress_tracker", TRACKER_MODEL),
     name="progress_tracker",
     description="Analytics expert that tracks progress, analyzes patterns, and provides actionable insights.",
     instruction="""You are a data-driven health analytics expert. Your role is to:
@@ -165,25 +221,28 @@ progress_tracker = Agent(
    - Help users log workouts with proper details using log_workout tool
    - Assist with meal logging and macro tracking using log_meal tool
    - Track daily water intake using log_water_intake tool
+   - When the user reports several items at once (e.g. a whole day), log them together with
+     log_meals, log_workouts and log_water_intakes - one call per kind, all in the same turn -
+     instead of one call per item
    - Maintain accurate records in session memory
 
 2. PROGRESS ANALYSIS:
+   - Use get_trends for consistency, adherence, patterns and trends - it already has the 7- and 28-day
+     averages, adherence rates and streaks, so do not page through the logs to work them out
    - Review workout consistency and frequency
    - Analyze nutritional adherence to meal plan
    - Monitor hydration patterns
    - Identify trends over time
 
 3. HYDRATION MONITORING:
-   - Calculate personalized hydration targets based on:
-     * Body weight (35ml/kg baseline)
-     * Activity level (add 10-20ml/kg for active individuals)
-     * Workout intensity (add extra for intense training days)
+   - Get the personalized hydration target (water_ml) from compute_targets - do not calculate it yourself
+   - Add extra on intense training days
    - Track daily water intake
    - Provide reminders and encouragement
    - Consider factors: climate, sweat rate, workout duration
 
 4. MACRO TRACKING:
-   - Compare actual intake vs targets
+   - Compare actual intake vs targets (calories and macros from compute_targets)
    - Identify macro distribution patterns
    - Suggest adjustments when off-track
    - Track protein intake around workouts
@@ -214,10 +273,19 @@ progress_tracker = Agent(
 
 AVAILABLE TOOLS:
 - log_workout: Log exercise sessions with type, duration, intensity, exercises, notes
-- log_meal: Log meals with name, type, foods, calories, macros, notes
+- log_meal: Log meals with name, type, foods, calories, macros, notes (include amounts in foods, e.g. "chicken breast 150g, rice 1 cup"; leave calories/macros at 0 to have them estimated from the local food database; if the reply says a food had no match, nothing was estimated, so pass your own calories/macros)
+- estimate_food_nutrition: Estimate calories and macros for foods from the local food database
 - log_water_intake: Log water consumption in milliliters
-- get_daily_summary: Get today's logged activities (workouts, meals, hydration)
+- log_meals / log_workouts / log_water_intakes: Log several meals, workouts or water amounts in one call (JSON array); the reply includes today's updated totals, so no separate totals call is needed
+- get_daily_summary: Today's totals and what is left of the targets (default "compact" mode). Use mode="details"
+  to page through today's logged workouts and meals (pass next_cursor back for the next page) and mode="delta"
+  to see only what was logged since your previous delta call - never page through everything unless asked
+- get_daily_totals: Get today's running totals (water, calories, macros, workout minutes) - prefer this for quick "how am I doing today" checks
 - get_user_stats: Get overall user statistics and profile
+- get_trends: 7- and 28-day averages of calories, macros, water and workouts, adherence to targets, the last week
+  against the 28-day baseline, and workout and hydration-goal streaks
+- compute_targets: Get the user's daily calorie, macro and hydration targets
+- get_remaining_meals: Today's planned meals that have not been logged yet, with their combined calories and macros
 
 IMPORTANT: When a user wants to log something, ALWAYS use the appropriate tool.
 Be specific with feedback and make data-driven suggestions.
@@ -225,16 +293,24 @@ Focus on sustainable habits and long-term progress over perfection.""",
     tools=[
         log_workout_tool,
         log_meal_tool,
+        estimate_food_tool,
         log_water_tool,
+        log_meals_tool,
+        log_workouts_tool,
+        log_water_intakes_tool,
         daily_summary_tool,
-        user_stats_tool
+        daily_totals_tool,
+        remaining_meals_tool,
+        user_stats_tool,
+        trends_tool,
+        compute_targets_tool
     ]
 )
 
 
-# Sub-Agent 4: Recovery Specialist (with Google Search only)
+# Sub-Agent 4: Recovery Specialist (with cached web search only)
 recovery_specialist = Agent(
-    model=RECOVERY_MODEL,
+    model=tiered_model("recovery_specialist", RECOVERY_MODEL),
     name="recovery_specialist",
     description="Recovery and regeneration expert specializing in optimizing rest, sleep, and recovery nutrition.",
     instruction="""You are a recovery and sports medicine specialist. Your role is to optimize recovery for maximum performance and injury prevention:
@@ -293,58 +369,69 @@ recovery_specialist = Agent(
    - Assess readiness for next training session
    - Adjust plans based on recovery status
 
-Use Google Search to find current recovery research, techniques, and best practices when needed.
+Use the web_search tool (cached Google Search) to find current recovery research, techniques, and best practices when needed.
 
 Emphasize that recovery is not laziness - it's a critical component of any training program.
 Help users understand the science behind recovery and adaptation.""",
-    tools=[google_search]
+    tools=[web_search_tool]
 )
 
 
-# Main Orchestrator Agent (with custom tools only - NO google_search)
+# Parallel consultation of several specialists for cross-domain requests
+specialist_fanout = SpecialistFanOut([nutrition_planner, weekly_meal_planner, workout_advisor,
+                                      progress_tracker, recovery_specialist])
+consult_specialists_tool = FunctionTool(func=specialist_fanout.consult_specialists)
+
+
+# Main Orchestrator Agent (with custom tools only - NO web search)
 root_agent = Agent(
-    model=MAIN_MODEL,
+    model=tiered_model("health_nutrition_coach", MAIN_MODEL),
     name="health_nutrition_coach",
     description="Comprehensive health and nutrition coaching system that integrates meal planning, workout guidance, progress tracking, and recovery optimization.",
     instruction="""You are a comprehensive Health & Nutrition Coach - an AI-powered personal trainer and nutritionist. You orchestrate a team of specialized agents to provide holistic health and fitness guidance.
 
 YOUR SPECIALIZED TEAM:
-1. **nutrition_planner**: Expert nutritionist for meal planning and macro calculations (has Google Search)
-2. **workout_advisor**: Personal trainer for exercise programming and workout guidance (has Google Search)
+1. **nutrition_planner**: Expert nutritionist for meal planning and macro calculations (has web search)
+1b. **weekly_meal_planner**: Fast pipeline that generates a full 7-day plan from the saved profile and saves it
+2. **workout_advisor**: Personal trainer for exercise programming and workout guidance (has web search)
 3. **progress_tracker**: Analytics expert for logging and tracking all activities (has logging tools)
-4. **recovery_specialist**: Recovery expert for rest, sleep, and regeneration strategies (has Google Search)
+4. **recovery_specialist**: Recovery expert for rest, sleep, and regeneration strategies (has web search)
 
 YOUR WORKFLOW:
 
 STEP 1 - INITIAL ONBOARDING (First Interaction):
 - Warmly greet the user and explain your comprehensive coaching capabilities
 - Collect user profile information:
-  * Name, age, weight (kg), height (cm)
+  * Name, age, sex, weight (kg), height (cm)
   * Fitness goal: muscle_gain, weight_loss, maintenance, or endurance
   * Activity level: sedentary, light, moderate, active, very_active
   * Dietary restrictions (vegetarian, vegan, gluten-free, dairy-free, etc.)
   * Allergies
-  * Daily calorie target (or calculate it based on their stats)
-- Calculate and explain their personalized targets:
-  * Daily calorie needs (use Mifflin-St Jeor equation)
-  * Macro distribution (protein/carbs/fats based on goal)
-  * Hydration target (35-55ml per kg body weight based on activity)
+  * Daily calorie target (optional - computed automatically from their stats if not given)
 - IMMEDIATELY save this profile using save_user_profile tool
+- save_user_profile returns their personalized targets (calories via Mifflin-St Jeor, macro split for their goal, hydration) - explain these to the user; never recalculate them yourself
 
 STEP 2 - NEEDS ASSESSMENT:
 Ask what they need help with today:
 - Weekly meal plan creation → Delegate to nutrition_planner
 - Workout program design → Delegate to workout_advisor
 - Logging today's activities → Delegate to progress_tracker
-- Progress review and insights → Use get_user_stats or delegate to progress_tracker
+- Progress review and insights → Use get_trends (averages, adherence, streaks) or delegate to progress_tracker
 - Recovery and rest day guidance → Delegate to recovery_specialist
 
 STEP 3 - DELEGATE TO SPECIALISTS:
 
 For MEAL PLANNING requests:
-- Delegate to nutrition_planner with full user context
+- FIRST call get_cached_meal_plan - if it returns a plan, present it to the user (it is already saved) and only delegate if they want changes
+- Otherwise, for a standard full-week plan, delegate to weekly_meal_planner - it streams each day to the user and saves the plan itself
+- Delegate to nutrition_planner instead for changes to an existing plan, special requests it cannot express (e.g. recipes, meal prep) or nutrition questions
 - Ensure meal plan includes: 7 days, 3 meals + snacks, macro breakdown
-- After receiving plan, save it using save_meal_plan_to_memory tool
+- For questions about a saved plan, look up only what is needed: get_planned_meal ("what's Tuesday lunch"),
+  get_remaining_meals ("what's left to eat today") and get_meal_plan_totals ("weekly protein total") -
+  do not fetch or repeat the whole plan
+- For a shopping list, save the plan first if needed, then call get_shopping_list and present its result -
+  never write or total a shopping list yourself
+- After receiving a plan from nutrition_planner, save it using save_meal_plan_to_memory tool
 - Provide clear, actionable meal plan to user
 
 For WORKOUT GUIDANCE:
@@ -364,6 +451,13 @@ For RECOVERY & REST DAYS:
 - Provide rest day nutrition adjustments
 - Suggest active recovery activities
 
+For CROSS-DOMAIN REQUESTS (e.g. "plan my week of training and eating"):
+- Do NOT delegate to the specialists one after another - call consult_specialists once with all of them
+  (e.g. "workout_advisor, nutrition_planner") and a self-contained description of the request
+- The specialists answer in parallel; synthesize their answers into ONE integrated plan
+  (align meal timing and calories with training days, resolve any conflicts, no duplicated advice)
+- If a specialist reports an error, answer with the others and offer to retry that part
+
 STEP 4 - CONTINUOUS COACHING:
 - Maintain conversational, supportive tone
 - Check in on progress regularly using get_user_stats tool
@@ -372,23 +466,28 @@ STEP 4 - CONTINUOUS COACHING:
 
 STEP 5 - HYDRATION FOCUS:
 - Regularly remind about water intake
-- Calculate personalized hydration targets:
-  * Sedentary: 35ml/kg body weight
-  * Active: 45ml/kg body weight
-  * Intense training: 55ml/kg body weight
+- Use the hydration target from compute_targets (35-55ml/kg body weight depending on activity)
 - Delegate water logging to progress_tracker
 - Celebrate hydration goals
 
 YOUR DIRECT TOOLS (use these yourself):
-- save_user_profile: Store user info at the beginning
+- save_user_profile: Store user info at the beginning (returns computed daily targets)
+- compute_targets: Look up the user's daily calorie, macro and hydration targets
+- get_cached_meal_plan: Reuse an existing meal plan for the same goal, restrictions, allergies and calories
 - save_meal_plan_to_memory: Store meal plans after nutrition_planner creates them
 - get_user_stats: Check overall progress anytime
+- get_trends: Rolling averages, adherence to targets and streaks - use it for "how am I doing this week/month"
+- get_planned_meal / get_remaining_meals / get_meal_plan_totals: Answer questions about the saved meal plan by direct lookup
+- get_shopping_list: Categorized shopping list for the saved meal plan (optionally for some days only)
+- consult_specialists: Ask several specialists in parallel when a request spans several domains
 
 DELEGATION RULES:
-- Meal planning → nutrition_planner
+- Full weekly meal plan → weekly_meal_planner
+- Meal plan changes and nutrition questions → nutrition_planner
 - Workout programming → workout_advisor
 - ALL logging (workout, meal, water) → progress_tracker
 - Recovery guidance → recovery_specialist
+- Requests spanning several of the above → consult_specialists (parallel), then synthesize
 
 KEY PRINCIPLES:
 - ALWAYS save user profile FIRST using save_user_profile
@@ -400,13 +499,48 @@ KEY PRINCIPLES:
 Remember: You're a coach, not just an information provider. Build rapport and help users achieve their goals!""",
     tools=[
         save_profile_tool,
+        compute_targets_tool,
+        cached_meal_plan_tool,
         save_meal_plan_tool,
-        user_stats_tool
+        user_stats_tool,
+        trends_tool,
+        planned_meal_tool,
+        remaining_meals_tool,
+        meal_plan_totals_tool,
+        shopping_list_tool,
+        consult_specialists_tool
     ],
     sub_agents=[
         nutrition_planner,
+        weekly_meal_planner,
         workout_advisor,
         progress_tracker,
         recovery_specialist
     ]
-)
\ No newline at end of file
+)
+
+
+def app_plugins(tracing: Optional[bool] = None, trace_path: Optional[str] = None,
+                fast_path: Optional[bool] = None) -> List[BasePlugin]:
+    """
+    Plugins every session of the coach runs with, as set in config.
+
+    Tracing comes first, before plugins that short-circuit calls, so every
+    turn is timed, including those the fast path answers.
+
+    Args:
+        tracing: Time turns, agents, model and tool calls (defaults to ``TRACING_ENABLED``)
+        trace_path: JSONL file the spans are written to (defaults to ``TRACE_PATH``)
+        fast_path: Answer simple logging messages without the model
+            (defaults to ``FAST_PATH_ENABLED``)
+    """
+    plugins: List[BasePlugin] = []
+    if TRACING_ENABLED if tracing is None else tracing:
+        plugins.append(TracingPlugin(exporter_path=trace_path or TRACE_PATH))
+    if FAST_PATH_ENABLED if fast_path is None else fast_path:
+        plugins.append(FastPathPlugin())
+    return plugins
+
+
+# Loaded by `adk run` / `adk web` instead of the bare root_agent, so sessions get the plugins too
+app = App(name="nutrition_coach_agent", root_agent=root_agent, plugins=app_plugins())
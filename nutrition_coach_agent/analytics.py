@@ -0,0 +1,249 @@
+"""Progress analytics kept up to date as entries are logged.
+
+``ProgressAnalytics`` keeps 7- and 28-day rolling sums of each day's
+calories, macros, water and training volume, workout and hydration-goal
+streaks, and adherence counts against the profile's targets. Each log call
+adds only the change in that day's contribution, so reading the trends
+takes constant time however long the history is. The trend tool returns
+averages and rates instead of raw logs for the model to work through.
+"""
+
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from nutrition_coach_agent.config import (
+    ANALYTICS_WINDOWS_DAYS,
+    CALORIE_ADHERENCE_TOLERANCE,
+    PROTEIN_ADHERENCE_MIN_RATIO
+)
+
+# What one day contributes to the rolling sums, in this order
+METRICS = (
+    "calories", "protein_g", "carbs_g", "fats_g", "water_ml", "workout_minutes", "workouts",
+    "meal_days", "water_days", "workout_days", "calories_on_target", "protein_on_target", "water_goal_met"
+)
+_INDEX = {metric: i for i, metric in enumerate(METRICS)}
+_ZERO = (0.0,) * len(METRICS)
+
+
+def day_contribution(totals: Optional[Dict[str, Any]], targets: Optional[Dict[str, Any]]) -> Tuple[float, ...]:
+    """A day's values for ``METRICS``, from its running totals and the current targets."""
+    if not totals:
+        return _ZERO
+    meals, water, workouts = totals["meals"], totals["water_ml"], totals["workouts"]
+    calories_on_target = protein_on_target = water_goal_met = 0
+    if targets:
+        if meals and abs(totals["calories"] - targets["calories"]) <= CALORIE_ADHERENCE_TOLERANCE * targets["calories"]:
+            calories_on_target = 1
+        if meals and totals["protein_g"] >= PROTEIN_ADHERENCE_MIN_RATIO * targets["protein_g"]:
+            protein_on_target = 1
+        if water and water >= targets["water_ml"]:
+            water_goal_met = 1
+    return (
+        totals["calories"], totals["protein_g"], totals["carbs_g"], totals["fats_g"], water,
+        sum(totals["workout_minutes"].values()), workouts,
+        1 if meals else 0, 1 if water else 0, 1 if workouts else 0,
+        calories_on_target, protein_on_target, water_goal_met
+    )
+
+
+class RollingWindow:
+    """Sums of ``METRICS`` over the ``days`` days ending at ``end``.
+
+    Args:
+        days: Window length
+        contribution: Returns a day's current contribution, used when days leave the window
+    """
+
+    def __init__(self, days: int, contribution: Callable[[date], Tuple[float, ...]]):
+        self.days = days
+        self.end: Optional[date] = None
+        self.sums: List[float] = list(_ZERO)
+        self._contribution = contribution
+
+    def covers(self, day: date) -> bool:
+        return self.end is not None and self.end - timedelta(days=self.days) < day <= self.end
+
+    def advance(self, to: date) -> None:
+        """Move the window so it ends at ``to``, dropping the days that fall out of it."""
+        if self.end is None or to >= self.end + timedelta(days=self.days):
+            self.sums = list(_ZERO)
+        elif to > self.end:
+            day = self.end - timedelta(days=self.days - 1)
+            while day <= to - timedelta(days=self.days):
+                for i, value in enumerate(self._contribution(day)):
+                    self.sums[i] -= value
+                day += timedelta(days=1)
+        if self.end is None or to > self.end:
+            self.end = to
+
+    def apply(self, day: date, previous: Sequence[float], current: Sequence[float]) -> None:
+        """Account for ``day``'s contribution changing from ``previous`` to ``current``."""
+        if self.end is None or day > self.end:
+            self.advance(day)
+        if self.covers(day):
+            for i, (old, new) in enumerate(zip(previous, current)):
+                self.sums[i] += new - old
+
+    def rebuild(self) -> None:
+        """Recompute the sums from scratch, e.g. after the targets changed."""
+        self.sums = list(_ZERO)
+        if self.end is None:
+            return
+        for offset in range(self.days):
+            for i, value in enumerate(self._contribution(self.end - timedelta(days=offset))):
+                self.sums[i] += value
+
+
+class Streak:
+    """Runs of consecutive days on which something happened (a workout, the water goal met)."""
+
+    def __init__(self):
+        self.days = set()
+        self.last: Optional[date] = None
+        self.run = 0
+        self.longest = 0
+
+    def mark(self, day: date) -> None:
+        if day in self.days:
+            return
+        self.days.add(day)
+        if self.last is not None and day < self.last:
+            # A backdated entry may join or extend earlier runs
+            self._recompute()
+            return
+        self.run = self.run + 1 if self.last == day - timedelta(days=1) else 1
+        self.last = day
+        self.longest = max(self.longest, self.run)
+
+    def _recompute(self) -> None:
+        self.last, self.run, self.longest = None, 0, 0
+        for day in sorted(self.days):
+            self.run = self.run + 1 if self.last == day - timedelta(days=1) else 1
+            self.last = day
+            self.longest = max(self.longest, self.run)
+
+    def reset(self, days) -> None:
+        self.days = set(days)
+        self._recompute()
+
+    def current(self, today: date) -> int:
+        """Length of the run still going: it ends today, or yesterday if today is not done yet."""
+        if self.last is None or self.last < today - timedelta(days=1):
+            return 0
+        return self.run
+
+    def summary(self, today: date) -> Dict[str, int]:
+        return {"current": self.current(today), "longest": self.longest}
+
+
+def _ratio(numerator: float, denominator: float) -> Optional[float]:
+    return round(numerator / denominator, 2) if denominator else None
+
+
+def _average(total: float, days: float) -> Optional[float]:
+    return round(total / days, 1) if days else None
+
+
+class ProgressAnalytics:
+    """Rolling trends, streaks and adherence over one user's per-day running totals.
+
+    ``SessionMemory`` calls ``snapshot`` before it changes a day's totals and
+    ``update`` afterwards.
+
+    Args:
+        daily_totals: The user's running per-day totals (read, never modified)
+        windows: Rolling window lengths in days
+    """
+
+    def __init__(self, daily_totals: Dict[date, Dict[str, Any]], windows: Sequence[int] = ANALYTICS_WINDOWS_DAYS):
+        self._daily_totals = daily_totals
+        self.targets: Optional[Dict[str, Any]] = None
+        self.windows = {days: RollingWindow(days, self._contribution) for days in windows}
+        self.workout_streak = Streak()
+        self.hydration_streak = Streak()
+        self.first_day: Optional[date] = None
+
+    def _contribution(self, day: date) -> Tuple[float, ...]:
+        return day_contribution(self._daily_totals.get(day), self.targets)
+
+    def snapshot(self, day: date) -> Tuple[float, ...]:
+        """``day``'s contribution before an entry is recorded."""
+        return self._contribution(day)
+
+    def update(self, day: date, previous: Tuple[float, ...]) -> None:
+        """Fold the change in ``day``'s totals since ``snapshot`` into every window and streak."""
+        current = self._contribution(day)
+        if self.first_day is None or day < self.first_day:
+            self.first_day = day
+        for window in self.windows.values():
+            window.apply(day, previous, current)
+        if current[_INDEX["workout_days"]] and not previous[_INDEX["workout_days"]]:
+            self.workout_streak.mark(day)
+        if current[_INDEX["water_goal_met"]] and not previous[_INDEX["water_goal_met"]]:
+            self.hydration_streak.mark(day)
+
+    def set_targets(self, targets: Optional[Dict[str, Any]]) -> None:
+        """Use new targets for adherence; past days are re-scored only when the targets changed."""
+        targets = {key: targets[key] for key in ("calories", "protein_g", "water_ml")} if targets else None
+        if targets == self.targets:
+            return
+        self.targets = targets
+        for window in self.windows.values():
+            window.rebuild()
+        self.hydration_streak.reset(
+            day for day in self._daily_totals if self._contribution(day)[_INDEX["water_goal_met"]]
+        )
+
+    def _window_summary(self, window: RollingWindow) -> Dict[str, Any]:
+        sums = dict(zip(METRICS, window.sums))
+        tracked_days = max(0, min(window.days, (window.end - self.first_day).days + 1)) if self.first_day else 0
+        return {
+            "days_with_meals": int(sums["meal_days"]),
+            "avg_calories": _average(sums["calories"], sums["meal_days"]),
+            "avg_protein_g": _average(sums["protein_g"], sums["meal_days"]),
+            "avg_carbs_g": _average(sums["carbs_g"], sums["meal_days"]),
+            "avg_fats_g": _average(sums["fats_g"], sums["meal_days"]),
+            "avg_water_ml": _average(sums["water_ml"], sums["water_days"]),
+            "workouts": int(sums["workouts"]),
+            "workout_minutes": int(sums["workout_minutes"]),
+            "workouts_per_week": round(sums["workouts"] * 7 / window.days, 1),
+            "adherence": {
+                "calories": _ratio(sums["calories_on_target"], sums["meal_days"]),
+                "protein": _ratio(sums["protein_on_target"], sums["meal_days"]),
+                "hydration": _ratio(sums["water_goal_met"], tracked_days) if self.targets else None
+            }
+        }
+
+    def trends(self, today: date) -> Dict[str, Any]:
+        """
+        Rolling averages, adherence rates and streaks as of ``today``.
+
+        Averages of calories and macros are per day with meals logged, and water
+        per day with water logged. Adherence is the share of those days on
+        target (hydration: of the days tracked). Values that cannot be computed
+        yet are None.
+        """
+        windows = {}
+        for days, window in self.windows.items():
+            window.advance(today)
+            windows[f"{days}d"] = self._window_summary(window)
+        result: Dict[str, Any] = {"as_of": today.isoformat(), **windows}
+
+        # Recent week against the longer baseline, e.g. {"calories": -0.12} for 12% fewer calories
+        short, long = (windows[f"{days}d"] for days in (min(self.windows), max(self.windows)))
+        if short is not long:
+            change = {}
+            for key, name in (("avg_calories", "calories"), ("avg_protein_g", "protein_g"),
+                              ("avg_water_ml", "water_ml"), ("workouts_per_week", "workouts_per_week")):
+                if short[key] is not None and long[key]:
+                    change[name] = round(short[key] / long[key] - 1, 2)
+            result[f"change_{min(self.windows)}d_vs_{max(self.windows)}d"] = change
+
+        result["streaks"] = {
+            "workout_days": self.workout_streak.summary(today),
+            "hydration_goal_days": self.hydration_streak.summary(today)
+        }
+        if self.targets:
+            result["targets"] = dict(self.targets)
+        return result
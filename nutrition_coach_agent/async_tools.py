@@ -0,0 +1,226 @@
+"""Run the synchronous tools without blocking the event loop.
+
+The tool functions in ``tools.py`` are synchronous: they take per-user
+locks, may load a user from SQLite on first access and may load the food
+table. ADK calls a synchronous tool directly on the event loop, so while one
+runs every other session sharing the ``Runner`` waits. ``to_async`` turns a
+tool into an async one that runs it on a shared, bounded ``ToolExecutor``
+thread pool. ``LoopLagPlugin`` watches the loop and reports any stall longer
+than a threshold together with the tools that were running at the time.
+"""
+
+import asyncio
+import atexit
+import contextvars
+import functools
+import inspect
+import logging
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+from nutrition_coach_agent.config import (
+    LOOP_LAG_CHECK_INTERVAL_S,
+    LOOP_LAG_THRESHOLD_MS,
+    TOOL_EXECUTOR_MAX_WORKERS
+)
+from nutrition_coach_agent.tracing import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+class ToolExecutor:
+    """Bounded thread pool for blocking tool calls, created on first use."""
+
+    def __init__(self, max_workers: int = TOOL_EXECUTOR_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tool")
+            return self._pool
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``func`` on the pool (with the caller's context variables) and await its result."""
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._get_pool(), call)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+
+# Shared by every tool, the fast path and the meal-plan pipeline
+tool_executor = ToolExecutor()
+atexit.register(tool_executor.shutdown)
+
+
+def to_async(func: Callable[..., Any], executor: Optional[ToolExecutor] = None) -> Callable[..., Any]:
+    """
+    Wrap a synchronous tool as an async one that runs on a thread pool.
+
+    The wrapper keeps the tool's name, docstring and signature, so ADK
+    declares it to the model exactly as before. Async functions are
+    returned unchanged.
+    """
+    if inspect.iscoroutinefunction(func):
+        return func
+
+    @functools.wraps(func)
+    async def async_tool(*args, **kwargs):
+        return await (executor or tool_executor).run(func, *args, **kwargs)
+
+    return async_tool
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag: how late a periodic wake-up actually runs.
+
+    A wake-up that runs more than ``threshold_ms`` late means something held
+    the loop for about that long. Each such stall is logged and kept (the
+    last 100) with the tools whose calls overlapped it.
+
+    Args:
+        threshold_ms: Lag above which a stall is reported
+        interval_s: Time between wake-ups
+    """
+
+    def __init__(self, threshold_ms: float = LOOP_LAG_THRESHOLD_MS, interval_s: float = LOOP_LAG_CHECK_INTERVAL_S):
+        self.threshold_ms = threshold_ms
+        self.interval_s = interval_s
+        self.histogram = LatencyHistogram()
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=100)
+        self.stalls_by_tool: Counter = Counter()
+        # (tool name, start, end) in loop time; end is None while the call is running
+        self._calls: Dict[str, Tuple[str, float, Optional[float]]] = {}
+        self._finished: Deque[Tuple[str, float, float]] = deque(maxlen=256)
+        self._task: Optional[asyncio.Task] = None
+        self._expected: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start sampling on the running loop (no-op if already started)."""
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._sample())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            # A turn that never yields after its last blocking call ends before the
+            # overdue wake-up runs, so account for that wake-up here
+            self._check()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._expected = None
+
+    def tool_started(self, call_id: str, name: str) -> None:
+        self._calls[call_id] = (name, asyncio.get_running_loop().time(), None)
+
+    def tool_finished(self, call_id: str) -> None:
+        call = self._calls.pop(call_id, None)
+        if call is not None:
+            self._finished.append((call[0], call[1], asyncio.get_running_loop().time()))
+
+    def _tools_between(self, start: float, end: float) -> List[str]:
+        calls = list(self._finished) + [(name, begun, None) for name, begun, _ in self._calls.values()]
+        return sorted({name for name, begun, finished in calls
+                       if begun <= end and (finished is None or finished >= start)})
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._expected = loop.time() + self.interval_s
+            await asyncio.sleep(self.interval_s)
+            self._check()
+
+    def _check(self) -> None:
+        """Record the lag of the pending wake-up if it is due."""
+        now = asyncio.get_running_loop().time()
+        if self._expected is None or now < self._expected:
+            return
+        expected, self._expected = self._expected, None
+        lag_ms = (now - expected) * 1000
+        self.histogram.record(lag_ms)
+        if lag_ms > self.threshold_ms:
+            self._report(lag_ms, self._tools_between(expected, now))
+
+    def _report(self, lag_ms: float, tools: List[str]) -> None:
+        self.stalls.append({"lag_ms": round(lag_ms, 1), "tools": tools})
+        self.stalls_by_tool.update(tools or ["<no tool>"])
+        logger.warning("Event loop blocked for %.0fms (tools running: %s)", lag_ms, ", ".join(tools) or "none")
+
+    def stats(self) -> Dict[str, Any]:
+        """Lag percentiles and the number of stalls per tool."""
+        summary = self.histogram.summary()
+        return {
+            "samples": summary["count"],
+            "p50_ms": summary["p50_ms"],
+            "p99_ms": summary["p99_ms"],
+            "max_ms": summary["max_ms"],
+            "stalls": len(self.stalls),
+            "stalls_by_tool": dict(self.stalls_by_tool)
+        }
+
+
+class LoopLagPlugin(BasePlugin):
+    """ADK plugin that runs a ``LoopLagMonitor`` while turns are in flight.
+
+    Tool calls are recorded so that each stall names the tools that were
+    running during it.
+    """
+
+    def __init__(self, monitor: Optional[LoopLagMonitor] = None):
+        super().__init__(name="loop_lag")
+        self.monitor = monitor or LoopLagMonitor()
+        self._turns: Set[str] = set()
+
+    async def before_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        self._turns.add(invocation_context.invocation_id)
+        self.monitor.start()
+        return None
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        # A plugin registered earlier may end the turn before our before_run is called
+        self._turns.discard(invocation_context.invocation_id)
+        if not self._turns:
+            # Stop with the last turn so the task never outlives the loop it runs on
+            await self.monitor.stop()
+
+    @staticmethod
+    def _call_id(tool: BaseTool, tool_context: ToolContext) -> str:
+        return tool_context.function_call_id or f"{tool_context.invocation_id}:{tool.name}"
+
+    async def before_tool_callback(
+            self, *, tool: BaseTool, tool_args: Dict[str, Any], tool_context: ToolContext
+    ) -> Optional[dict]:
+        self.monitor.tool_started(self._call_id(tool, tool_context), tool.name)
+        return None
+
+    async def after_tool_callback(
+            self, *, tool: BaseTool, tool_args: Dict[str, Any], tool_context: ToolContext, result: dict
+    ) -> Optional[dict]:
+        self.monitor.tool_finished(self._call_id(tool, tool_context))
+        return None
+
+    async def on_tool_error_callback(
+            self, *, tool: BaseTool, tool_args: Dict[str, Any], tool_context: ToolContext, error: Exception
+    ) -> Optional[dict]:
+        self.monitor.tool_finished(self._call_id(tool, tool_context))
+        return None
@@ -17,9 +17,89 @@ WORKOUT_MODEL = "gemini-2.0-flash"
 TRACKER_MODEL = "gemini-2.0-flash"
 RECOVERY_MODEL = "gemini-2.0-flash"
 MAIN_MODEL = "gemini-2.0-flash"
+SEARCH_MODEL = "gemini-2.0-flash"
+
+# Model tiering: each request is routed to a tier by its estimated complexity.
+# The *_MODEL settings above are used instead when tiering is turned off.
+MODEL_TIERING_ENABLED = os.getenv("NUTRITION_COACH_MODEL_TIERING", "true").lower() in ("1", "true", "yes")
+MODEL_TIERS = {  # cheapest/fastest first
+    "fast": os.getenv("NUTRITION_COACH_FAST_MODEL", "gemini-2.0-flash-lite"),
+    "standard": os.getenv("NUTRITION_COACH_STANDARD_MODEL", "gemini-2.0-flash"),
+    "large": os.getenv("NUTRITION_COACH_LARGE_MODEL", "gemini-2.5-flash")
+}
+AGENT_MODEL_TIERS = {  # tiers each agent may use, cheapest first
+    "health_nutrition_coach": ("fast", "standard"),
+    "progress_tracker": ("fast", "standard"),
+    "recovery_specialist": ("fast", "standard"),
+    "workout_advisor": ("standard", "large"),
+    "nutrition_planner": ("standard", "large"),
+    "day_meal_planner": ("standard", "large")
+}
+MODEL_TIER_P95_BUDGET_MS = {"fast": 4000, "standard": 10000, "large": 30000}  # slower tiers are avoided
+MODEL_LATENCY_WINDOW_S = 300  # rolling window for per-model p95 latency
+MODEL_LATENCY_MIN_SAMPLES = 5  # a model is not judged slow on fewer samples than this
 
 # Agent Configuration
-MAX_RETRIES = 3
+MAX_RETRIES = 3  # retries of a model call that failed with 429 or 5xx
+
+# Model-call scheduler shared by all agents (token bucket per model)
+MODEL_REQUESTS_PER_MINUTE = int(os.getenv("NUTRITION_COACH_MODEL_RPM", "60"))
+MODEL_BURST = 10  # calls that may start at once after an idle period
+MODEL_RATE_LIMITS = {}  # per-model overrides: {"gemini-2.0-flash": (requests_per_minute, burst)}
+MODEL_RETRY_BASE_DELAY_S = 1.0  # backoff before the first retry, doubled for each further retry
+MODEL_RETRY_MAX_DELAY_S = 30.0
+
+# Session storage (per-user state shared by all tools)
+SESSION_STORE_STRIPES = 16  # independently locked shards
+SESSION_STORE_MAX_USERS = 10000  # least recently used users beyond this are evicted (durable backends only)
+
+# Tool execution: synchronous tools run on a bounded thread pool, off the event loop
+TOOL_EXECUTOR_MAX_WORKERS = 8
+LOOP_LAG_THRESHOLD_MS = 100  # report the event loop being blocked for longer than this
+LOOP_LAG_CHECK_INTERVAL_S = 0.05  # how often the loop-lag monitor wakes up
+
+# Paged tool output: detail entries returned per get_daily_summary call
+SUMMARY_PAGE_SIZE = 10  # default page size
+SUMMARY_MAX_PAGE_SIZE = 50  # upper bound on any requested page size
+
+# Progress analytics (rolling averages, streaks and adherence), updated as entries are logged
+ANALYTICS_WINDOWS_DAYS = (7, 28)
+CALORIE_ADHERENCE_TOLERANCE = 0.10  # a day is on target within this fraction of the calorie target
+PROTEIN_ADHERENCE_MIN_RATIO = 0.9  # a day is on target with at least this fraction of the protein target
+
+# Tracing of turns, agents, model and tool calls; spans are written as JSONL when a path is set
+TRACE_PATH = os.getenv("NUTRITION_COACH_TRACE_PATH") or None
+TRACING_ENABLED = os.getenv("NUTRITION_COACH_TRACING", str(TRACE_PATH is not None)).lower() in ("1", "true", "yes")
+
+# Web search cache shared by all sub-agents
+SEARCH_CACHE_PATH = os.getenv("NUTRITION_COACH_SEARCH_CACHE", "search_cache.db")
+SEARCH_CACHE_TTL_SECONDS = 7 * 24 * 3600
+SEARCH_CACHE_MEMORY_ENTRIES = 1024
+
+# Meal plan cache shared by users with the same goal/restrictions/allergies/calories
+MEAL_PLAN_CACHE_MAX_ENTRIES = 512
+MEAL_PLAN_CACHE_BUCKET_KCAL = 100  # calorie targets are rounded to this bucket size
+MEAL_PLAN_CACHE_MAX_ADAPT_KCAL = 300  # scale a cached plan from buckets at most this far away
+
+# Weekly meal plan pipeline: days are generated concurrently against a fixed budget
+MEAL_PLAN_MAX_PARALLEL_DAYS = 4  # days generated at once
+MEAL_PLAN_DAY_TOLERANCE = 0.15  # a day more than this far off its calorie budget is regenerated once
+MEAL_PLAN_SLOT_SHARES = {"breakfast": 0.25, "lunch": 0.30, "dinner": 0.30, "snacks": 0.15}
+
+# Specialist fan-out: several sub-agents answer one cross-domain request concurrently
+SPECIALIST_FANOUT_TIMEOUT_S = 120  # a specialist still running after this long is reported as failed
+
+# Durable storage: "memory" (nothing persisted) or "sqlite"
+STORAGE_BACKEND = os.getenv("NUTRITION_COACH_STORAGE", "memory")
+SQLITE_PATH = os.getenv("NUTRITION_COACH_DB_PATH", "nutrition_coach.db")
+SQLITE_BATCH_SIZE = 256  # max writes per committed transaction
+SQLITE_FLUSH_INTERVAL = 0.05  # seconds to wait for more writes before committing a partial batch
+SQLITE_WRITE_RETRIES = 3  # retries of a failed batch before its writes are kept for a later retry
+
+# Fast-path router for simple logging messages (answered without the model)
+FAST_PATH_ENABLED = os.getenv("NUTRITION_COACH_FAST_PATH", "true").lower() in ("1", "true", "yes")
+FAST_PATH_MAX_MESSAGE_CHARS = 160  # longer messages always go to the model
+FAST_PATH_MODEL_TURN_ESTIMATE_S = 3.0  # typical two-round-trip model turn, used to estimate time saved
 
 # Nutrition Goals (default macros for different goals)
 MACRO_TARGETS = {
@@ -32,4 +112,33 @@ MACRO_TARGETS = {
 # Hydration targets (ml per kg of body weight)
 HYDRATION_BASE = 35  # ml/kg for sedentary
 HYDRATION_ACTIVE = 45  # ml/kg for active individuals
-HYDRATION_INTENSE = 55  # ml/kg for intense training
\ No newline at end of file
+HYDRATION_INTENSE = 55  # ml/kg for intense training
+
+# Hydration factor used for each activity level
+HYDRATION_BY_ACTIVITY = {
+    "sedentary": HYDRATION_BASE,
+    "light": HYDRATION_BASE,
+    "moderate": HYDRATION_ACTIVE,
+    "active": HYDRATION_ACTIVE,
+    "very_active": HYDRATION_INTENSE
+}
+
+# TDEE multipliers applied to BMR (Mifflin-St Jeor) per activity level
+ACTIVITY_MULTIPLIERS = {
+    "sedentary": 1.2,
+    "light": 1.375,
+    "moderate": 1.55,
+    "active": 1.725,
+    "very_active": 1.9
+}
+
+# Daily calorie adjustment on top of TDEE per fitness goal
+GOAL_CALORIE_ADJUSTMENTS = {
+    "muscle_gain": 300,
+    "weight_loss": -500,
+    "maintenance": 0,
+    "endurance": 0
+}
+
+# Energy per gram of each macronutrient (kcal)
+KCAL_PER_GRAM = {"protein": 4, "carbs": 4, "fats": 9}
@@ -0,0 +1,163 @@
+"""Concurrent fan-out of one request to several specialist agents.
+
+Transferring to sub-agents is sequential: for "plan my week of training and
+eating" the orchestrator hands over to ``workout_advisor``, waits for it,
+then hands over to ``nutrition_planner``, so the turn takes the sum of both.
+``SpecialistFanOut`` instead runs the specialists on the same request at the
+same time and returns all their answers together; the orchestrator's next
+model call is the synthesis step that combines them into one reply. The turn
+then takes roughly the slowest specialist plus that one synthesis call.
+
+Each branch is isolated: every specialist runs as a clone (so it has no
+parent or peers to transfer to) in its own runner, and every branch gets a
+fresh session that is deleted afterwards. Branches never see each other's
+conversation; they share only the user's saved data through ``user_memory``.
+Branch runners get the calling invocation's plugins, so record/replay,
+tracing and loop-lag monitoring cover the branches too.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.plugins.base_plugin import BasePlugin
+from google.genai import types
+
+from nutrition_coach_agent.config import SPECIALIST_FANOUT_TIMEOUT_S
+from nutrition_coach_agent.tools import invocation_plugins, user_memory
+
+
+class SpecialistFanOut:
+    """Runs several specialist agents on the same request concurrently.
+
+    Args:
+        specialists: Agents that can be consulted, addressed by their name
+        timeout_s: A branch still running after this long is reported as an error
+    """
+
+    APP_NAME = "specialist_fanout"
+
+    def __init__(self, specialists: Sequence[BaseAgent], timeout_s: float = SPECIALIST_FANOUT_TIMEOUT_S):
+        self.specialists = {agent.name: agent for agent in specialists}
+        self.timeout_s = timeout_s
+        self._clones: Dict[str, BaseAgent] = {}
+        self._runners: Dict[Tuple[str, Tuple[int, ...]], Any] = {}
+        self._session_service = None
+
+    def _get_runner(self, name: str, plugins: Optional[List[BasePlugin]] = None):
+        # One runner per specialist and plugin set; the runner keeps its plugins alive, so ids are not reused
+        key = (name, tuple(id(plugin) for plugin in plugins or []))
+        if key not in self._runners:
+            from google.adk.apps import App
+            from google.adk.runners import Runner
+            from google.adk.sessions import InMemorySessionService
+
+            if self._session_service is None:
+                self._session_service = InMemorySessionService()
+            if name not in self._clones:
+                self._clones[name] = self.specialists[name].clone()
+            self._runners[key] = Runner(
+                app=App(name=self.APP_NAME, root_agent=self._clones[name], plugins=list(plugins or [])),
+                session_service=self._session_service
+            )
+        return self._runners[key]
+
+    @staticmethod
+    def branch_prompt(question: str, profile: Optional[Dict[str, Any]]) -> str:
+        """The message each branch starts from, since it cannot see the conversation."""
+        lines = [question, ""]
+        if profile:
+            lines.append(f"User profile (already saved, do not ask for it again): {json.dumps(profile)}")
+        lines.append("Other specialists are answering the rest of this request in parallel; "
+                     "answer only the part that is in your specialty.")
+        return "\n".join(lines)
+
+    async def run_branch(self, name: str, prompt: str, user_id: str, plugins: Optional[List[BasePlugin]] = None) -> str:
+        """Run one specialist in a throwaway session (under ``plugins``) and return its reply text."""
+        runner = self._get_runner(name, plugins)
+        session = await runner.session_service.create_session(
+            app_name=self.APP_NAME, user_id=user_id, session_id=f"{name}-{uuid.uuid4().hex}"
+        )
+        message = types.Content(role="user", parts=[types.Part(text=prompt)])
+        replies: List[str] = []
+        try:
+            async for event in runner.run_async(user_id=user_id, session_id=session.id, new_message=message):
+                if event.partial or not event.content or not event.content.parts:
+                    continue
+                text = "".join(part.text or "" for part in event.content.parts if not part.thought)
+                if text.strip():
+                    replies.append(text.strip())
+        finally:
+            await runner.session_service.delete_session(
+                app_name=self.APP_NAME, user_id=user_id, session_id=session.id
+            )
+        return "\n\n".join(replies)
+
+    async def run(self, names: Sequence[str], question: str, user_id: str,
+                  profile: Optional[Dict[str, Any]] = None,
+                  plugins: Optional[List[BasePlugin]] = None) -> Dict[str, Any]:
+        """Run the named specialists concurrently and collect every answer.
+
+        A branch that fails or times out is reported under ``errors``; the
+        other branches' answers are still returned.
+        """
+        prompt = self.branch_prompt(question, profile)
+        timings: Dict[str, float] = {}
+
+        async def timed(name: str) -> str:
+            start = time.perf_counter()
+            try:
+                return await asyncio.wait_for(self.run_branch(name, prompt, user_id, plugins), self.timeout_s)
+            finally:
+                timings[name] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(timed(name) for name in names), return_exceptions=True)
+        answers, errors = {}, {}
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                errors[name] = f"timed out after {self.timeout_s}s"
+            elif isinstance(outcome, BaseException):
+                errors[name] = f"{type(outcome).__name__}: {outcome}"
+            else:
+                answers[name] = outcome
+        return {
+            "answers": answers,
+            "errors": errors,
+            "branch_times_s": timings,
+            "wall_time_s": round(time.perf_counter() - start, 3)
+        }
+
+    async def consult_specialists(self, specialists: str, question: str, tool_context=None) -> str:
+        """
+        Ask several specialists about the same request at the same time.
+
+        Use this instead of delegating to specialists one after another when a
+        request spans several domains, e.g. "plan my week of training and eating"
+        (workout_advisor and nutrition_planner). Each specialist answers its own
+        part independently; combine their answers into one coherent reply.
+
+        Args:
+            specialists: Comma-separated specialist names, e.g. "workout_advisor, nutrition_planner"
+            question: The user's request, self-contained - include any details from the conversation
+                the specialists need (they do not see it, but they do see the saved profile)
+
+        Returns:
+            JSON string with each specialist's answer, any errors, and branch timings
+        """
+        names = list(dict.fromkeys(name.strip() for name in specialists.split(",") if name.strip()))
+        unknown = [name for name in names if name not in self.specialists]
+        if not names or unknown:
+            return (f"Error: unknown specialists {unknown or specialists!r}. "
+                    f"Choose from: {', '.join(self.specialists)}")
+
+        if tool_context is not None:
+            user_id = tool_context.user_id or tool_context.session.id
+        else:
+            user_id = "local_user"
+        with user_memory(tool_context) as memory:
+            profile = dict(memory.user_profile) if memory.user_profile else None
+        return json.dumps(await self.run(names, question, user_id, profile, invocation_plugins(tool_context)))
@@ -0,0 +1,279 @@
+"""Deterministic fast path for simple logging messages.
+
+Messages such as "I drank 500ml of water", "did 45 min moderate cardio" or
+"had 2 eggs and a banana for breakfast" normally cost two model round trips
+(root agent delegates, progress tracker calls the tool). ``FastPathRouter``
+recognizes them with compiled patterns, calls the tool function directly
+and answers from a template. Anything it is not sure about (questions,
+negations, plans, unknown foods, missing intensity, several requests in one
+message) returns None so the message goes to the model as usual.
+
+``FastPathPlugin`` puts the router in front of the agent tree as an ADK
+plugin and keeps hit-rate and latency statistics.
+"""
+
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.plugins.base_plugin import BasePlugin
+from google.genai import types
+
+from nutrition_coach_agent.async_tools import tool_executor
+from nutrition_coach_agent.config import FAST_PATH_MAX_MESSAGE_CHARS, FAST_PATH_MODEL_TURN_ESTIMATE_S
+from nutrition_coach_agent.food_db import food_database, parse_food_item
+from nutrition_coach_agent.tools import log_meal, log_water_intake, log_workout
+
+_NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "half a": 0.5
+}
+_NUMBER = r"\d+(?:\.\d+)?|" + "|".join(sorted(_NUMBER_WORDS, key=len, reverse=True))
+
+# Millilitres per unit of water
+_WATER_UNITS = {
+    "ml": 1, "milliliter": 1, "millilitre": 1,
+    "l": 1000, "liter": 1000, "litre": 1000,
+    "oz": 29.57, "ounce": 29.57,
+    "glass": 250, "cup": 240, "bottle": 500
+}
+_WATER_UNIT = (r"ml|milliliters?|millilitres?|liters?|litres?|l|oz|ounces?"
+               r"|glass(?:es)?|cups?|bottles?")
+MAX_WATER_ML = 5000
+
+_INTENSITIES = {
+    "low": "low", "light": "low", "easy": "low",
+    "moderate": "moderate", "medium": "moderate",
+    "high": "high", "hard": "high", "intense": "high",
+    "very high": "very_high", "very_high": "very_high", "max": "very_high"
+}
+_INTENSITY = r"very[ _]high|low|light|easy|moderate|medium|high|hard|intense|max"
+
+# Workout type for each recognized activity word
+_ACTIVITIES = {
+    "cardio": "cardio", "running": "cardio", "run": "cardio", "jogging": "cardio", "jog": "cardio",
+    "cycling": "cardio", "bike": "cardio", "biking": "cardio", "spin": "cardio", "swimming": "cardio",
+    "swim": "cardio", "walking": "cardio", "walk": "cardio", "rowing": "cardio", "hiit": "cardio",
+    "elliptical": "cardio",
+    "strength": "strength", "weights": "strength", "weight training": "strength", "lifting": "strength",
+    "weightlifting": "strength", "resistance": "strength",
+    "yoga": "flexibility", "stretching": "flexibility", "mobility": "flexibility", "pilates": "flexibility",
+    "flexibility": "flexibility"
+}
+_ACTIVITY = "|".join(sorted((re.escape(a) for a in _ACTIVITIES), key=len, reverse=True))
+_ACTIVITY_VERBS = {
+    "ran": "running", "jogged": "jogging", "cycled": "cycling", "biked": "biking",
+    "swam": "swimming", "walked": "walking", "rowed": "rowing", "lifted": "lifting"
+}
+_ACTIVITY_VERB = "|".join(_ACTIVITY_VERBS)
+_DURATION_UNIT = r"minutes?|mins?|hours?|hrs?|h"
+MAX_WORKOUT_MINUTES = 360
+
+_MEAL_TYPES = {
+    "breakfast": "breakfast", "lunch": "lunch", "dinner": "dinner", "snack": "snack",
+    "a snack": "snack", "pre workout": "pre_workout", "pre-workout": "pre_workout",
+    "post workout": "post_workout", "post-workout": "post_workout"
+}
+_MEAL_TYPE = "|".join(sorted((re.escape(m) for m in _MEAL_TYPES), key=len, reverse=True))
+
+_PREFIX = r"^(?:(?:please\s+)?log\s+(?:that\s+)?)?(?:i(?:'ve|\s+have)?\s+)?(?:(?:just|also)\s+)?"
+
+_WATER = re.compile(
+    _PREFIX + rf"(?:drank|drunk|drink|had|finished|log)?\s*(?:another\s+)?(?P<amount>{_NUMBER})\s*"
+    rf"(?P<unit>{_WATER_UNIT})\s+(?:of\s+)?water$"
+)
+# "did 45 min moderate cardio", "a 60 minute high intensity strength workout"
+_WORKOUT = re.compile(
+    _PREFIX + rf"(?:did|done|completed|finished)?\s*(?:a\s+|an\s+)?(?P<duration>\d+)\s*-?\s*"
+    rf"(?P<unit>{_DURATION_UNIT})\s+(?:of\s+)?"
+    rf"(?:(?P<intensity>{_INTENSITY})(?:[\s-]+intensity)?\s+)?(?P<activity>{_ACTIVITY})"
+    rf"(?:\s+(?:workout|session|training|class))?"
+    rf"(?:\s+(?:at\s+)?(?:a\s+)?(?P<intensity_after>{_INTENSITY})(?:[\s-]+(?:intensity|pace))?)?$"
+)
+# "ran for 30 minutes at a moderate pace", "did yoga for 1 hour at low intensity"
+_WORKOUT_FOR = re.compile(
+    _PREFIX + rf"(?:(?P<verb>{_ACTIVITY_VERB})|(?:did|done)\s+(?:some\s+)?(?P<activity>{_ACTIVITY}))"
+    rf"\s+for\s+(?P<duration>\d+)\s*(?P<unit>{_DURATION_UNIT})"
+    rf"\s+(?:at\s+)?(?:a\s+)?(?P<intensity_after>{_INTENSITY})(?:[\s-]+(?:intensity|pace))?$"
+)
+_MEAL = re.compile(
+    _PREFIX + rf"(?:had|ate|eaten|eat|log)\s+(?P<foods>.+?)\s+for\s+(?P<meal_type>{_MEAL_TYPE})$"
+)
+_FOOD_SEPARATOR = re.compile(r"\s*(?:,|\band\b|\bwith\b|\bplus\b|&)\s*")
+
+# Anything suggesting a question, a plan, a negation or a past day is left to the model
+_UNSURE = re.compile(
+    r"\?|\b(?:not|no|never|didn't|didnt|don't|dont|won't|should|will|going|gonna|plan|planning|want|"
+    r"maybe|might|tomorrow|yesterday|last|tonight|how|what|why|when|which|instead|but)\b"
+)
+_TRAILING = re.compile(r"[\s.!]+$")
+_DECIMAL_POINT = re.compile(r"(?<=\d)\.(?=\d)")
+
+
+class FastPathMatch(NamedTuple):
+    """A recognized logging intent and the tool arguments it resolved to."""
+
+    intent: str
+    args: Dict[str, Any]
+
+
+def _number(text: str) -> float:
+    return _NUMBER_WORDS[text] if text in _NUMBER_WORDS else float(text)
+
+
+def _unit_key(unit: str, units: Dict[str, float]) -> Optional[str]:
+    for candidate in (unit, unit.rstrip("s"), unit[:-2] if unit.endswith("es") else unit):
+        if candidate in units:
+            return candidate
+    return None
+
+
+class FastPathRouter:
+    """Recognize simple logging messages and log them without the model."""
+
+    TOOLS: Dict[str, Callable[..., str]] = {
+        "log_water": log_water_intake,
+        "log_workout": log_workout,
+        "log_meal": log_meal
+    }
+
+    def match(self, message: str) -> Optional[FastPathMatch]:
+        """Return the logging intent in ``message``, or None if not confident."""
+        text = " ".join(message.lower().split())
+        text = _TRAILING.sub("", text)
+        if not text or len(text) > FAST_PATH_MAX_MESSAGE_CHARS or _UNSURE.search(text):
+            return None
+        if any(mark in _DECIMAL_POINT.sub("", text) for mark in ".!;"):
+            return None  # several sentences
+
+        for matcher in (self._match_water, self._match_workout, self._match_meal):
+            result = matcher(text)
+            if result is not None:
+                return result
+        return None
+
+    @staticmethod
+    def _match_water(text: str) -> Optional[FastPathMatch]:
+        match = _WATER.match(text)
+        if match is None:
+            return None
+        unit = _unit_key(match.group("unit"), _WATER_UNITS)
+        if unit is None:
+            return None
+        amount_ml = round(_number(match.group("amount")) * _WATER_UNITS[unit])
+        if not 0 < amount_ml <= MAX_WATER_ML:
+            return None
+        return FastPathMatch("log_water", {"amount_ml": amount_ml})
+
+    @staticmethod
+    def _match_workout(text: str) -> Optional[FastPathMatch]:
+        match = _WORKOUT.match(text) or _WORKOUT_FOR.match(text)
+        if match is None:
+            return None
+        groups = match.groupdict()
+        intensity = groups.get("intensity") or groups["intensity_after"]
+        if intensity is None or (groups.get("intensity") and groups["intensity_after"]):
+            return None  # intensity missing or stated twice
+        duration = int(match.group("duration"))
+        if match.group("unit").startswith("h"):
+            duration *= 60
+        if not 0 < duration <= MAX_WORKOUT_MINUTES:
+            return None
+        activity = groups["activity"] or _ACTIVITY_VERBS[groups["verb"]]
+        return FastPathMatch("log_workout", {
+            "workout_type": _ACTIVITIES[activity],
+            "duration_minutes": duration,
+            "intensity": _INTENSITIES[intensity.replace("_", " ")],
+            "exercises": activity if _ACTIVITIES[activity] != activity else ""
+        })
+
+    @staticmethod
+    def _match_meal(text: str) -> Optional[FastPathMatch]:
+        match = _MEAL.match(text)
+        if match is None:
+            return None
+        foods = [food for food in _FOOD_SEPARATOR.split(match.group("foods")) if food]
+        if not foods:
+            return None
+        for food in foods:
+            # Only foods known by exact name or alias; fuzzy matches go to the model
+            name, _, _ = parse_food_item(food)
+            if food_database.lookup(name, exact=True) is None:
+                return None
+        meal_type = _MEAL_TYPES[match.group("meal_type")]
+        return FastPathMatch("log_meal", {
+            "meal_name": ", ".join(foods).capitalize(),
+            "meal_type": meal_type,
+            "foods": ", ".join(foods)
+        })
+
+    def handle(self, message: str, tool_context=None) -> Optional[str]:
+        """Log ``message`` through the fast path and return the reply, or None to use the model."""
+        result = self.match(message)
+        return None if result is None else self.execute(result, tool_context)
+
+    def execute(self, result: FastPathMatch, tool_context=None) -> str:
+        """Call the tool for a matched intent and return the templated reply."""
+        confirmation = self.TOOLS[result.intent](**result.args, tool_context=tool_context)
+        if result.intent == "log_water":
+            return f"💧 {confirmation}. Keep it up!"
+        if result.intent == "log_workout":
+            return f"💪 {confirmation} at {result.args['intensity'].replace('_', ' ')} intensity. Nice work!"
+        return f"🍽️ {confirmation}."
+
+
+class FastPathPlugin(BasePlugin):
+    """ADK plugin answering simple logging messages before any agent runs.
+
+    Register it after ``TracingPlugin`` (so fast-path turns are still timed)
+    and before ``RecordReplayPlugin``.
+
+    Args:
+        router: Router to use; a new ``FastPathRouter`` if omitted
+        model_turn_estimate_s: Typical latency of the model path for these
+            messages, used to estimate the time saved per hit
+    """
+
+    def __init__(
+            self,
+            router: Optional[FastPathRouter] = None,
+            model_turn_estimate_s: float = FAST_PATH_MODEL_TURN_ESTIMATE_S
+    ):
+        super().__init__(name="fast_path")
+        self.router = router or FastPathRouter()
+        self.model_turn_estimate_s = model_turn_estimate_s
+        self._lock = threading.Lock()
+        self.messages = 0
+        self.hits: Dict[str, int] = {intent: 0 for intent in FastPathRouter.TOOLS}
+        self.fast_path_s = 0.0
+
+    async def before_run_callback(self, *, invocation_context: InvocationContext) -> Optional[types.Content]:
+        content = invocation_context.user_content
+        text = "".join(part.text or "" for part in (content.parts or [])) if content else ""
+        start = time.perf_counter()
+        result = self.router.match(text) if text else None
+        reply = await tool_executor.run(self.router.execute, result, invocation_context) if result is not None else None
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.messages += 1
+            if result is not None:
+                self.hits[result.intent] += 1
+                self.fast_path_s += elapsed
+        if reply is None:
+            return None
+        return types.Content(role="model", parts=[types.Part(text=reply)])
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate per intent and the estimated model time saved."""
+        with self._lock:
+            total_hits = sum(self.hits.values())
+            return {
+                "messages": self.messages,
+                "hits": dict(self.hits),
+                "hit_rate": total_hits / self.messages if self.messages else 0.0,
+                "avg_fast_path_ms": self.fast_path_s / total_hits * 1000 if total_hits else 0.0,
+                "estimated_latency_saved_s": total_hits * self.model_turn_estimate_s - self.fast_path_s
+            }
@@ -0,0 +1,296 @@
+"""Offline food-composition database for estimating meal calories and macros.
+
+The bundled table (``data/foods.csv``) holds per-100g values, typical
+serving, cup and piece weights, and a shopping-list category. It is loaded
+lazily on first lookup and indexed by normalized name and alias, so
+resolving a food string such as "chicken breast 150g" is a couple of dict
+lookups rather than a web search.
+
+Lookups only resolve a food when the match is unambiguous: "grilled chicken
+breast" is chicken breast, but "apple pie" is not apple and "water" is not
+watermelon. Anything else is reported as unresolved rather than guessed.
+"""
+
+import csv
+import difflib
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_FOOD_DB_PATH = os.path.join(os.path.dirname(__file__), "data", "foods.csv")
+
+# Grams per unit for units that do not depend on the food
+_FIXED_UNIT_GRAMS = {
+    "g": 1, "gram": 1, "grams": 1,
+    "kg": 1000,
+    "oz": 28.35, "ounce": 28.35, "ounces": 28.35,
+    "lb": 453.6, "lbs": 453.6,
+    "ml": 1, "l": 1000, "liter": 1000, "litre": 1000
+}
+# Units measured against the food's own cup, piece or serving weight
+_FOOD_UNITS = {
+    "cup": "cup", "cups": "cup",
+    "tbsp": "tbsp", "tablespoon": "tbsp", "tablespoons": "tbsp",
+    "tsp": "tsp", "teaspoon": "tsp", "teaspoons": "tsp",
+    "piece": "piece", "pieces": "piece", "slice": "piece", "slices": "piece",
+    "serving": "serving", "servings": "serving", "scoop": "serving", "scoops": "serving",
+    "glass": "cup", "glasses": "cup", "bowl": "cup", "bowls": "cup"
+}
+_WORD_QUANTITIES = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "half": 0.5}
+
+_UNIT_PATTERN = "|".join(sorted(list(_FIXED_UNIT_GRAMS) + list(_FOOD_UNITS), key=len, reverse=True))
+_QTY_PATTERN = r"\d+/\d+|\d+(?:\.\d+)?|" + "|".join(_WORD_QUANTITIES)
+_LEADING_QUANTITY = re.compile(
+    rf"^(?P<qty>{_QTY_PATTERN})\s*(?:(?P<unit>{_UNIT_PATTERN})\b|(?=\s))\s*(?:of\s+)?"
+)
+_TRAILING_QUANTITY = re.compile(
+    rf"\s+(?P<qty>{_QTY_PATTERN})\s*(?P<unit>{_UNIT_PATTERN})?$"
+)
+_NON_WORD = re.compile(r"[^a-z0-9%]+")
+
+# Preparation and size words that do not change which food is meant ("grilled chicken breast")
+_MODIFIERS = frozenset({
+    "baked", "boiled", "steamed", "roasted", "grilled", "poached", "scrambled", "mashed", "raw", "fresh",
+    "cooked", "plain", "sliced", "chopped", "diced", "whole", "lean", "skinless", "boneless", "organic",
+    "large", "small", "medium", "hard", "soft", "fillet"
+})
+_FUZZY_CUTOFF = 0.85
+
+_CACHE_LIMIT = 4096
+
+
+def _singular(token: str) -> str:
+    if len(token) > 3 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("oes"):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us")):
+        return token[:-1]
+    return token
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase, strip punctuation and singularize each word of a food name."""
+    return " ".join(_singular(token) for token in _NON_WORD.sub(" ", text.lower()).split())
+
+
+def _parse_quantity(qty: str) -> float:
+    if qty in _WORD_QUANTITIES:
+        return _WORD_QUANTITIES[qty]
+    if "/" in qty:
+        numerator, denominator = qty.split("/")
+        return float(numerator) / float(denominator)
+    return float(qty)
+
+
+def parse_food_item(text: str) -> Tuple[str, Optional[float], Optional[str]]:
+    """
+    Split a food string into name, quantity and unit.
+
+    Handles leading ("150g chicken breast", "2 eggs", "1 cup of rice") and
+    trailing ("rice 1 cup", "chicken breast (150 g)") quantities.
+
+    Returns:
+        Tuple of (food name, quantity or None, unit or None)
+    """
+    text = text.lower().replace("(", " ").replace(")", " ").strip()
+    match = _LEADING_QUANTITY.match(text) or _TRAILING_QUANTITY.search(text)
+    if match is None:
+        return text, None, None
+    name = (text[:match.start()] + " " + text[match.end():]).strip()
+    return name, _parse_quantity(match.group("qty")), match.group("unit")
+
+
+def _round_quantity(value: float) -> float:
+    """Round a scaled amount to something a person would measure: 5s, halves or quarters."""
+    if value >= 20:
+        return float(round(value / 5) * 5)
+    if value >= 2:
+        return round(value * 2) / 2
+    return max(round(value * 4) / 4, 0.25)
+
+
+def scale_food_item(text: str, ratio: float) -> str:
+    """
+    Multiply the amount in a food string by ``ratio``, keeping the rest as written.
+
+    "150g chicken breast" scaled by 1.1 becomes "165g chicken breast".
+    Amounts are rounded to measurable steps, and a food without an amount
+    (one serving) gets an explicit serving count when the scaled amount
+    rounds to something other than one.
+    """
+    cleaned = text.lower().replace("(", " ").replace(")", " ")
+    offset = len(cleaned) - len(cleaned.lstrip())
+    stripped = cleaned.strip()
+    match = _LEADING_QUANTITY.match(stripped) or _TRAILING_QUANTITY.search(stripped)
+    if match is None:
+        servings = _round_quantity(ratio)
+        return text if servings == 1 else f"{servings:g} servings {text.strip()}"
+    quantity = _parse_quantity(match.group("qty"))
+    scaled = _round_quantity(quantity * ratio)
+    if scaled == quantity:
+        return text
+    start, end = match.span("qty")
+    return f"{text[:offset + start]}{scaled:g}{text[offset + end:]}"
+
+
+class FoodItem:
+    """Nutrition facts for one food, per 100 g."""
+
+    __slots__ = ("name", "kcal", "protein", "carbs", "fat", "serving_g", "cup_g", "piece_g", "category")
+
+    def __init__(self, name: str, kcal: float, protein: float, carbs: float, fat: float,
+                 serving_g: float, cup_g: Optional[float] = None, piece_g: Optional[float] = None,
+                 category: str = "Other"):
+        self.name = name
+        self.kcal = kcal
+        self.protein = protein
+        self.carbs = carbs
+        self.fat = fat
+        self.serving_g = serving_g
+        self.cup_g = cup_g
+        self.piece_g = piece_g
+        self.category = category
+
+    def grams_for(self, quantity: Optional[float], unit: Optional[str]) -> float:
+        """Convert a quantity and unit of this food to grams."""
+        if quantity is None:
+            return self.serving_g
+        if unit in _FIXED_UNIT_GRAMS:
+            return quantity * _FIXED_UNIT_GRAMS[unit]
+        kind = _FOOD_UNITS.get(unit, "piece")
+        if kind == "cup":
+            return quantity * (self.cup_g or 240)
+        if kind == "tbsp":
+            return quantity * (self.cup_g / 16 if self.cup_g else 15)
+        if kind == "tsp":
+            return quantity * (self.cup_g / 48 if self.cup_g else 5)
+        if kind == "piece" and self.piece_g:
+            return quantity * self.piece_g
+        return quantity * self.serving_g
+
+
+class FoodDatabase:
+    """Lazily loaded food table with exact, phrase and typo-tolerant lookup."""
+
+    def __init__(self, path: str = DEFAULT_FOOD_DB_PATH):
+        self.path = path
+        self._foods: Optional[Dict[str, FoodItem]] = None
+        self._sorted_names: List[str] = []
+        self._max_words = 1
+        self._cache: Dict[str, Optional[FoodItem]] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, FoodItem]:
+        with self._lock:
+            if self._foods is not None:
+                return self._foods
+            foods: Dict[str, FoodItem] = {}
+            with open(self.path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    item = FoodItem(
+                        row["name"],
+                        float(row["kcal"]),
+                        float(row["protein"]),
+                        float(row["carbs"]),
+                        float(row["fat"]),
+                        float(row["serving_g"]),
+                        float(row["cup_g"]) if row["cup_g"] else None,
+                        float(row["piece_g"]) if row["piece_g"] else None,
+                        row.get("category") or "Other"
+                    )
+                    for name in [row["name"], *filter(None, row["aliases"].split("|"))]:
+                        foods.setdefault(normalize_name(name), item)
+            self._sorted_names = sorted(foods)
+            self._max_words = max(len(name.split()) for name in foods)
+            self._foods = foods
+            return foods
+
+    def __len__(self) -> int:
+        return len({id(item) for item in self._load().values()})
+
+    def lookup(self, name: str, exact: bool = False) -> Optional[FoodItem]:
+        """
+        Find the food matching ``name``, or None when no match is confident.
+
+        Tries, in order: exact normalized name or alias, a known name
+        contained in the query whose other words are only preparation or
+        size words (or part of that food's own name), and finally a close
+        spelling match with the same number of words. With ``exact=True``
+        only the first step is tried.
+        """
+        foods = self._foods if self._foods is not None else self._load()
+        key = normalize_name(name)
+        item = foods.get(key)
+        if item is not None or not key or exact:
+            return item
+        if key in self._cache:
+            return self._cache[key]
+
+        item = self._phrase_match(key) or self._fuzzy_match(key)
+        if len(self._cache) >= _CACHE_LIMIT:
+            self._cache.clear()
+        self._cache[key] = item
+        return item
+
+    def _phrase_match(self, key: str) -> Optional[FoodItem]:
+        words = key.split()
+        for size in range(min(len(words), self._max_words), 0, -1):
+            for start in range(len(words) - size + 1):
+                item = self._foods.get(" ".join(words[start:start + size]))
+                if item is None:
+                    continue
+                # "apple pie" contains "apple", but "pie" makes it a different food
+                allowed = _MODIFIERS.union(normalize_name(item.name).split())
+                if all(word in allowed for word in words[:start] + words[start + size:]):
+                    return item
+        return None
+
+    def _fuzzy_match(self, key: str) -> Optional[FoodItem]:
+        size = len(key.split())
+        names = [name for name in self._sorted_names if len(name.split()) == size]
+        matches = difflib.get_close_matches(key, names, n=1, cutoff=_FUZZY_CUTOFF)
+        return self._foods[matches[0]] if matches else None
+
+    def estimate(self, text: str) -> Optional[Dict[str, Any]]:
+        """Estimate calories and macros for one food string, or None if unknown."""
+        name, quantity, unit = parse_food_item(text)
+        item = self.lookup(name)
+        if item is None:
+            return None
+        grams = item.grams_for(quantity, unit)
+        factor = grams / 100
+        return {
+            "input": text,
+            "food": item.name,
+            "grams": round(grams),
+            "calories": round(item.kcal * factor),
+            "protein_g": round(item.protein * factor, 1),
+            "carbs_g": round(item.carbs * factor, 1),
+            "fats_g": round(item.fat * factor, 1)
+        }
+
+    def estimate_meal(self, foods: List[str]) -> Dict[str, Any]:
+        """Estimate a meal's total calories and macros from its food strings."""
+        items = []
+        unresolved = []
+        for text in foods:
+            estimate = self.estimate(text) if text.strip() else None
+            if estimate is None:
+                if text.strip():
+                    unresolved.append(text)
+            else:
+                items.append(estimate)
+        return {
+            "calories": sum(item["calories"] for item in items),
+            "protein_g": round(sum(item["protein_g"] for item in items), 1),
+            "carbs_g": round(sum(item["carbs_g"] for item in items), 1),
+            "fats_g": round(sum(item["fats_g"] for item in items), 1),
+            "items": items,
+            "unresolved": unresolved
+        }
+
+
+# Shared database instance, loaded on first use
+food_database = FoodDatabase()
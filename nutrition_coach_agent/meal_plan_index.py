@@ -0,0 +1,254 @@
+"""Day x meal-slot index over a saved weekly meal plan.
+
+Meal plans arrive as free-form JSON from the planners. ``MealPlanIndex``
+normalizes a plan once, when it is saved, into ``{day: {slot: [meal, ...]}}``
+and precomputes calories and macros per slot, per day and for the week. Tools
+can then answer "what's Tuesday lunch" or "weekly protein total" with a
+lookup instead of handing the whole plan to the model.
+"""
+
+import re
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from nutrition_coach_agent.food_db import food_database
+
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+MEAL_SLOTS = ("breakfast", "lunch", "dinner", "snacks")
+MACROS = ("calories", "protein_g", "carbs_g", "fats_g")
+
+# Keys planners use for each value, on the meal itself or in a nested "macros" dict
+MACRO_ALIASES = {
+    "calories": ("calories", "kcal", "calories_kcal", "energy_kcal"),
+    "protein_g": ("protein_g", "protein"),
+    "carbs_g": ("carbs_g", "carbs", "carbohydrates_g", "carbohydrates"),
+    "fats_g": ("fats_g", "fats", "fat_g", "fat")
+}
+
+# Keys a plan's days may be nested under, e.g. {"plan": {"monday": ...}}
+PLAN_CONTAINER_KEYS = ("plan", "days", "week", "meal_plan", "weekly_plan")
+
+# Whole day names or their usual abbreviations, so keys like "monthly_notes" are not days
+_DAY_NAME = re.compile(r"^(mon|tues?|wed(?:nes)?|thu(?:rs?)?|fri|sat(?:ur)?|sun)(?:day)?\.?$")
+_DAY_NUMBER = re.compile(r"day[\s_-]*([1-7])\b")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        return float(match.group(0)) if match else None
+    return None
+
+
+def day_name(text: Any) -> Optional[str]:
+    """Map a day key such as "Monday", "tue" or "day 3" to a name from ``DAYS``."""
+    text = str(text).strip().lower()
+    match = _DAY_NAME.match(text)
+    if match:
+        return next(day for day in DAYS if day.startswith(match.group(1)[:3]))
+    match = _DAY_NUMBER.match(text)
+    return DAYS[int(match.group(1)) - 1] if match else None
+
+
+def slot_name(text: Any) -> Optional[str]:
+    """Map a meal key or type such as "Dinner" or "post_workout_snack" to a name from ``MEAL_SLOTS``."""
+    text = str(text).strip().lower()
+    if "breakfast" in text:
+        return "breakfast"
+    if "lunch" in text:
+        return "lunch"
+    if "dinner" in text or "supper" in text:
+        return "dinner"
+    if "snack" in text or "workout" in text:
+        return "snacks"
+    return None
+
+
+def resolve_day(text: str, today: Optional[date] = None) -> Optional[str]:
+    """Resolve "today", "tomorrow", "yesterday" or a weekday to a name from ``DAYS``."""
+    today = today or date.today()
+    offsets = {"today": 0, "tomorrow": 1, "yesterday": -1}
+    text = (text or "today").strip().lower()
+    if text in offsets:
+        return DAYS[(today + timedelta(days=offsets[text])).weekday()]
+    return day_name(text)
+
+
+def normalize_meal(meal: Any) -> Optional[Dict[str, Any]]:
+    """
+    Normalize one planned meal so it has ``name``, ``foods`` and every key in ``MACROS``.
+
+    Accepts a bare name, ``protein``/``protein_g`` style keys or a nested
+    ``macros`` dict. Values that are missing are estimated from ``foods`` with
+    the food database, or set to 0 when there are no foods. Other keys are
+    kept. Returns None for entries without a name.
+    """
+    if isinstance(meal, str):
+        meal = {"name": meal}
+    if not isinstance(meal, dict):
+        return None
+    name = meal.get("name") or meal.get("meal") or meal.get("title")
+    if not name:
+        return None
+
+    normalized = dict(meal)
+    foods = meal.get("foods") or meal.get("ingredients") or []
+    normalized["name"] = str(name).strip()
+    normalized["foods"] = [str(f).strip() for f in (foods.split(",") if isinstance(foods, str) else foods)]
+    macros = meal.get("macros") if isinstance(meal.get("macros"), dict) else {}
+    for macro, aliases in MACRO_ALIASES.items():
+        values = (_number(source.get(alias)) for alias in aliases for source in (meal, macros))
+        normalized[macro] = next((value for value in values if value is not None), None)
+
+    missing = [macro for macro in MACROS if normalized[macro] is None]
+    if missing and normalized["foods"]:
+        estimate = food_database.estimate_meal(normalized["foods"])
+        for macro in missing:
+            normalized[macro] = estimate[macro]
+    for macro in missing:
+        if normalized[macro] is None:
+            normalized[macro] = 0.0
+    return normalized
+
+
+def sum_macros(meals: Iterable[Dict[str, Any]]) -> Dict[str, float]:
+    """Total calories and macros of normalized meals."""
+    totals = {macro: 0.0 for macro in MACROS}
+    for meal in meals:
+        for macro in MACROS:
+            totals[macro] += meal[macro]
+    return {macro: round(value, 1) for macro, value in totals.items()}
+
+
+def _find_days(plan: Any) -> Dict[str, Any]:
+    """Locate the per-day entries of a plan, whatever container they are nested in."""
+    if isinstance(plan, list):
+        days = {}
+        for i, entry in enumerate(plan):
+            name = day_name(entry.get("day", "")) if isinstance(entry, dict) else None
+            if name is None and i < len(DAYS):
+                name = DAYS[i]
+            if name is not None:
+                days[name] = entry
+        return days
+    if not isinstance(plan, dict):
+        return {}
+    days = {name: value for key, value in plan.items() if (name := day_name(key)) is not None}
+    if days:
+        return days
+    for key in PLAN_CONTAINER_KEYS:
+        if key in plan:
+            days = _find_days(plan[key])
+            if days:
+                return days
+    return {}
+
+
+def _day_slots(day_plan: Any) -> Dict[str, List[Dict[str, Any]]]:
+    """Group a day's meals by slot, from either ``{slot: meal(s)}`` or a list of typed meals."""
+    if isinstance(day_plan, dict) and isinstance(day_plan.get("meals"), (list, dict)):
+        day_plan = day_plan["meals"]
+    if isinstance(day_plan, list):
+        entries = [
+            (entry.get("type") or entry.get("slot") or entry.get("meal_type") or "", entry)
+            for entry in day_plan if isinstance(entry, dict)
+        ]
+    elif isinstance(day_plan, dict):
+        entries = list(day_plan.items())
+    else:
+        entries = []
+
+    slots: Dict[str, List[Dict[str, Any]]] = {slot: [] for slot in MEAL_SLOTS}
+    for key, value in entries:
+        slot = slot_name(key)
+        if slot is None:
+            continue
+        for meal in value if isinstance(value, list) else [value]:
+            normalized = normalize_meal(meal)
+            if normalized is not None:
+                slots[slot].append(normalized)
+    return slots
+
+
+class MealPlanIndex:
+    """A meal plan indexed by day and meal slot, with totals precomputed.
+
+    Args:
+        plan: The plan as saved, in any of the shapes the planners produce
+    """
+
+    def __init__(self, plan: Any):
+        found = _find_days(plan)
+        self.meals: Dict[str, Dict[str, List[Dict[str, Any]]]] = {
+            day: _day_slots(found[day]) for day in DAYS if day in found
+        }
+        self.slot_totals: Dict[str, Dict[str, Dict[str, float]]] = {
+            day: {slot: sum_macros(meals) for slot, meals in slots.items()}
+            for day, slots in self.meals.items()
+        }
+        self.day_totals: Dict[str, Dict[str, float]] = {
+            day: {macro: round(sum(totals[macro] for totals in slots.values()), 1) for macro in MACROS}
+            for day, slots in self.slot_totals.items()
+        }
+        self.weekly_totals: Dict[str, float] = {
+            macro: round(sum(totals[macro] for totals in self.day_totals.values()), 1) for macro in MACROS
+        }
+
+    @property
+    def days(self) -> List[str]:
+        """Days that have an entry in the plan, in week order."""
+        return list(self.meals)
+
+    def meal(self, day: str, slot: str) -> Optional[Dict[str, Any]]:
+        """The meals planned for one slot of one day, with their totals."""
+        if day not in self.meals or slot not in MEAL_SLOTS:
+            return None
+        return {
+            "day": day,
+            "meal_type": slot,
+            "meals": self.meals[day][slot],
+            "totals": self.slot_totals[day][slot]
+        }
+
+    def remaining(self, day: str, logged_types: Iterable[str]) -> Optional[Dict[str, Any]]:
+        """
+        The meals of ``day`` not yet covered by logged meals.
+
+        A logged breakfast, lunch or dinner covers that slot; each logged
+        snack covers one planned snack.
+        """
+        if day not in self.meals:
+            return None
+        logged = [slot for slot in map(slot_name, logged_types) if slot is not None]
+        remaining = {}
+        for slot in MEAL_SLOTS:
+            meals = self.meals[day][slot]
+            skip = logged.count(slot) if slot == "snacks" else min(logged.count(slot), len(meals))
+            if meals[skip:]:
+                remaining[slot] = meals[skip:]
+        return {
+            "day": day,
+            "logged_meal_types": sorted(set(logged)),
+            "remaining": remaining,
+            "remaining_totals": sum_macros(meal for meals in remaining.values() for meal in meals)
+        }
+
+    def totals(self, day: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Planned totals for one day (with per-slot totals) or for the whole plan."""
+        if day is not None:
+            if day not in self.day_totals:
+                return None
+            return {"day": day, "totals": self.day_totals[day], "by_meal_type": self.slot_totals[day]}
+        count = len(self.day_totals)
+        return {
+            "days_planned": count,
+            "weekly_totals": self.weekly_totals,
+            "daily_average": {
+                macro: round(value / count, 1) if count else 0.0 for macro, value in self.weekly_totals.items()
+            }
+        }
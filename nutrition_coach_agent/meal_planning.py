@@ -0,0 +1,452 @@
+"""Weekly meal plans generated one day at a time, concurrently.
+
+Writing all seven days in one model generation is the slowest thing the
+coach does. The pipeline here splits it up:
+
+1. ``weekly_budget`` fixes each day's calorie and macro budget from the
+   user's targets, plus a main-protein rotation for variety and planned
+   leftovers (each lunch reuses the previous day's dinner protein).
+2. ``plan_days`` generates the days concurrently with bounded parallelism,
+   yielding each day as soon as it is ready and regenerating a day once if
+   it misses its calorie budget or its generation fails.
+3. ``review_week`` merges the days and checks budget adherence, variety and
+   leftovers reuse.
+
+``WeeklyMealPlanAgent`` runs the pipeline as an ADK agent: it streams each
+day to the user as an event, then saves the merged plan to memory.
+"""
+
+import asyncio
+import functools
+import json
+import re
+import uuid
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.adk.models.base_llm import BaseLlm
+from google.adk.plugins.base_plugin import BasePlugin
+from google.genai import types
+
+from nutrition_coach_agent.async_tools import tool_executor
+from nutrition_coach_agent.config import (
+    MEAL_PLAN_DAY_TOLERANCE,
+    MEAL_PLAN_MAX_PARALLEL_DAYS,
+    MEAL_PLAN_SLOT_SHARES
+)
+from nutrition_coach_agent.meal_plan_index import DAYS, MACROS, MEAL_SLOTS, normalize_meal
+from nutrition_coach_agent.tools import invocation_plugins, save_meal_plan_to_memory, user_memory
+
+# Main protein per day, rotated so no two consecutive days share one
+PROTEIN_ROTATION = {
+    "default": ["chicken", "salmon", "lean beef", "eggs", "turkey", "white fish", "tofu"],
+    "vegetarian": ["eggs", "lentils", "paneer", "greek yogurt", "chickpeas", "tofu", "cottage cheese"],
+    "vegan": ["tofu", "lentils", "tempeh", "chickpeas", "seitan", "black beans", "edamame"]
+}
+
+# Proteins of the rotations excluded by each allergen category
+ALLERGEN_PROTEINS = {
+    "fish": ("salmon", "white fish"),
+    "shellfish": ("shrimp", "prawns", "crab", "lobster"),
+    "soy": ("tofu", "tempeh", "edamame"),
+    "dairy": ("paneer", "greek yogurt", "cottage cheese"),
+    "gluten": ("seitan",),
+    "egg": ("eggs",),
+    "nut": ("peanuts", "almonds", "cashews")
+}
+# Words in a stated allergy that name an allergen category
+ALLERGEN_TERMS = {
+    "fish": ("fish",), "seafood": ("fish", "shellfish"), "shellfish": ("shellfish",), "shrimp": ("shellfish",),
+    "soy": ("soy",), "soya": ("soy",), "soybean": ("soy",), "soybeans": ("soy",),
+    "dairy": ("dairy",), "milk": ("dairy",), "lactose": ("dairy",), "casein": ("dairy",), "whey": ("dairy",),
+    "gluten": ("gluten",), "wheat": ("gluten",), "celiac": ("gluten",), "coeliac": ("gluten",),
+    "egg": ("egg",), "eggs": ("egg",),
+    "nut": ("nut",), "nuts": ("nut",), "peanut": ("nut",), "peanuts": ("nut",)
+}
+
+DayGenerator = Callable[[str, Dict[str, Any], Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+def excluded_proteins(allergies: List[str]) -> List[str]:
+    """Return the rotation proteins a user's allergies rule out.
+
+    An allergy excludes the proteins of every allergen category it names
+    ("soy", "lactose intolerance", "tree nuts") and any protein it names or
+    is part of ("salmon", "beef").
+    """
+    excluded = set()
+    for allergy in allergies:
+        allergy = (allergy or "").strip().lower()
+        if not allergy:
+            continue
+        for term, categories in ALLERGEN_TERMS.items():
+            if re.search(rf"\b{term}\b", allergy):
+                excluded.update(p for category in categories for p in ALLERGEN_PROTEINS[category])
+        for protein in {p for proteins in PROTEIN_ROTATION.values() for p in proteins}:
+            if re.search(rf"\b{re.escape(protein)}\b", allergy) or re.search(rf"\b{re.escape(allergy)}\b", protein):
+                excluded.add(protein)
+    return sorted(excluded)
+
+
+def _protein_rotation(restrictions: List[str], allergies: List[str]) -> List[str]:
+    restrictions = {r.lower() for r in restrictions}
+    kind = "vegan" if "vegan" in restrictions else "vegetarian" if "vegetarian" in restrictions else "default"
+    excluded = set(excluded_proteins(allergies))
+    return [p for p in PROTEIN_ROTATION[kind] if p not in excluded]
+
+
+def weekly_budget(targets: Dict[str, Any], profile: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fix the week's per-day and per-meal budgets before any day is generated.
+
+    Args:
+        targets: Daily targets from ``targets.compute_targets``
+        profile: The user's profile (restrictions and allergies are used)
+
+    Returns:
+        Dictionary with ``days`` (budget, slot budgets, main protein and the
+        protein to reuse at lunch for each day), ``weekly`` totals,
+        ``restrictions``, ``allergies`` and ``excluded_proteins``. The main
+        proteins are None when the allergies rule out the whole rotation.
+    """
+    restrictions = list(profile.get("dietary_restrictions") or [])
+    allergies = list(profile.get("allergies") or [])
+    proteins = _protein_rotation(restrictions, allergies)
+    daily = {macro: targets[macro] for macro in MACROS}
+
+    days = {}
+    for i, day in enumerate(DAYS):
+        days[day] = {
+            **daily,
+            "slots": {
+                slot: {macro: round(daily[macro] * share) for macro in MACROS}
+                for slot, share in MEAL_PLAN_SLOT_SHARES.items()
+            },
+            "main_protein": proteins[i % len(proteins)] if proteins else None,
+            "leftovers_from": DAYS[i - 1] if i > 0 else None,
+            "leftover_protein": proteins[(i - 1) % len(proteins)] if i > 0 and proteins else None
+        }
+    return {
+        "days": days,
+        "weekly": {macro: daily[macro] * len(DAYS) for macro in MACROS},
+        "restrictions": restrictions,
+        "allergies": allergies,
+        "excluded_proteins": excluded_proteins(allergies)
+    }
+
+
+def _meal_list(day_plan: Dict[str, Any], slot: str) -> List[Dict[str, Any]]:
+    meals = day_plan.get(slot) or []
+    return meals if isinstance(meals, list) else [meals]
+
+
+def normalize_day(day_plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill in missing meal calories/macros from the food database and drop unknown keys."""
+    normalized = {}
+    for slot in MEAL_SLOTS:
+        meals = [meal for meal in map(normalize_meal, _meal_list(day_plan, slot)) if meal is not None]
+        normalized[slot] = meals if slot == "snacks" else (meals[0] if meals else None)
+    return normalized
+
+
+def day_totals(day_plan: Dict[str, Any]) -> Dict[str, float]:
+    """Sum calories and macros over every meal of a (normalized) day."""
+    totals = {macro: 0.0 for macro in MACROS}
+    for slot in MEAL_SLOTS:
+        for meal in _meal_list(day_plan, slot):
+            for macro in MACROS:
+                totals[macro] += meal.get(macro) or 0
+    return {macro: round(value, 1) for macro, value in totals.items()}
+
+
+def day_problems(day_plan: Dict[str, Any], day_budget: Dict[str, Any],
+                 tolerance: float = MEAL_PLAN_DAY_TOLERANCE) -> List[str]:
+    """Return what is wrong with a generated day (missing meals, calories off budget)."""
+    problems = [f"missing {slot}" for slot in ("breakfast", "lunch", "dinner") if not day_plan.get(slot)]
+    calories = day_totals(day_plan)["calories"]
+    if abs(calories - day_budget["calories"]) > tolerance * day_budget["calories"]:
+        problems.append(f"{calories:.0f} kcal vs budget {day_budget['calories']:.0f} kcal")
+    return problems
+
+
+async def plan_days(
+        budget: Dict[str, Any],
+        generate_day: DayGenerator,
+        max_parallel: int = MEAL_PLAN_MAX_PARALLEL_DAYS,
+        retries: int = 1
+) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]], List[str]]]:
+    """
+    Generate every day concurrently and yield each as soon as it is ready.
+
+    A day whose generation raises is retried like a day that misses its
+    budget. The last generated plan is kept; a day that never generated
+    one is yielded with a None plan and the error as its problem.
+
+    Yields:
+        ``(day, normalized day plan or None, remaining problems)`` in
+        completion order
+    """
+    semaphore = asyncio.Semaphore(max_parallel)
+
+    async def one_day(day: str) -> Tuple[str, Optional[Dict[str, Any]], List[str]]:
+        day_budget = budget["days"][day]
+        day_plan = None
+        async with semaphore:
+            for _ in range(retries + 1):
+                try:
+                    generated = normalize_day(await generate_day(day, day_budget, budget))
+                except Exception as e:
+                    if day_plan is None:
+                        problems = [f"generation failed: {e}"]
+                    continue
+                day_plan, problems = generated, day_problems(generated, day_budget)
+                if not problems:
+                    break
+        return day, day_plan, problems
+
+    tasks = [asyncio.ensure_future(one_day(day)) for day in DAYS]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def review_week(plan: Dict[str, Dict[str, Any]], budget: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Check a merged week: budget adherence, variety and leftovers reuse.
+
+    Returns:
+        Dictionary with ``day_totals``, ``weekly_totals``, ``weekly_budget``,
+        ``unique_meals``, ``leftovers`` (days whose lunch reuses the previous
+        dinner) and ``issues``
+    """
+    totals = {day: day_totals(plan[day]) for day in DAYS if day in plan}
+    issues = [f"{day}: {problem}" for day in DAYS if day in plan
+              for problem in day_problems(plan[day], budget["days"][day])]
+    issues += [f"{day}: missing" for day in DAYS if day not in plan]
+
+    names = [meal["name"].strip().lower() for day_plan in plan.values()
+             for slot in MEAL_SLOTS for meal in _meal_list(day_plan, slot)]
+    leftovers = []
+    for previous, day in zip(DAYS, DAYS[1:]):
+        if previous not in plan or day not in plan:
+            continue
+        lunch, dinner = plan[day].get("lunch"), plan[previous].get("dinner")
+        if lunch and dinner and (
+                lunch["name"].strip().lower() == dinner["name"].strip().lower()
+                or "leftover" in lunch["name"].lower()
+        ):
+            leftovers.append(day)
+        for slot in ("breakfast", "dinner"):
+            a, b = plan[previous].get(slot), plan[day].get(slot)
+            if a and b and a["name"].strip().lower() == b["name"].strip().lower():
+                issues.append(f"{day}: same {slot} as {previous}")
+
+    return {
+        "day_totals": totals,
+        "weekly_totals": {macro: round(sum(t[macro] for t in totals.values()), 1) for macro in MACROS},
+        "weekly_budget": budget["weekly"],
+        "unique_meals": len(set(names)),
+        "leftovers": leftovers,
+        "issues": issues
+    }
+
+
+def format_day(day: str, day_plan: Dict[str, Any]) -> str:
+    """Render one day of the plan as short markdown."""
+    totals = day_totals(day_plan)
+    lines = [f"**{day.capitalize()}** - {totals['calories']:.0f} kcal, protein {totals['protein_g']:.0f}g, "
+             f"carbs {totals['carbs_g']:.0f}g, fats {totals['fats_g']:.0f}g"]
+    for slot in MEAL_SLOTS:
+        meals = _meal_list(day_plan, slot)
+        if meals:
+            described = "; ".join(f"{m['name']} ({m['calories']:.0f} kcal, {m['protein_g']:.0f}g protein)"
+                                  for m in meals)
+            lines.append(f"- {slot.capitalize()}: {described}")
+    return "\n".join(lines)
+
+
+def _parse_json(text: str) -> Dict[str, Any]:
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if match is None:
+        raise ValueError(f"No JSON object in day plan response: {text[:200]!r}")
+    return json.loads(match.group(0))
+
+
+class LlmDayPlanner:
+    """Generates one day of meals with a small dedicated ADK agent.
+
+    Each call runs in its own throwaway session, so days can be generated
+    concurrently without seeing each other's conversation. Calls made with
+    the caller's ``plugins`` (as ``WeeklyMealPlanAgent`` does) are recorded,
+    replayed and traced like the rest of the turn.
+    """
+
+    APP_NAME = "day_meal_planner"
+    INSTRUCTION = (
+        "You plan one day of meals. Reply with ONLY a JSON object with keys breakfast, lunch, dinner "
+        "(each an object) and snacks (a list of objects). Every meal object has name, foods (list of "
+        "foods with amounts, e.g. \"chicken breast 150g\"), calories, protein_g, carbs_g and fats_g. "
+        "Hit the given calorie and macro budgets per meal as closely as possible, respect all dietary "
+        "restrictions and never use allergens."
+    )
+
+    def __init__(self, model: Union[str, BaseLlm]):
+        self.model = model
+        self._agent = None
+        self._session_service = None
+        self._runners: Dict[Tuple[int, ...], Any] = {}
+
+    def _get_runner(self, plugins: Optional[List[BasePlugin]] = None):
+        # One runner per plugin set; the runner keeps its plugins alive, so ids are not reused
+        key = tuple(id(plugin) for plugin in plugins or [])
+        if key not in self._runners:
+            from google.adk.agents import Agent
+            from google.adk.apps import App
+            from google.adk.runners import Runner
+            from google.adk.sessions import InMemorySessionService
+
+            if self._agent is None:
+                self._agent = Agent(
+                    model=self.model,
+                    name="day_meal_planner",
+                    instruction=self.INSTRUCTION,
+                    generate_content_config=types.GenerateContentConfig(response_mime_type="application/json")
+                )
+                self._session_service = InMemorySessionService()
+            self._runners[key] = Runner(
+                app=App(name=self.APP_NAME, root_agent=self._agent, plugins=list(plugins or [])),
+                session_service=self._session_service
+            )
+        return self._runners[key]
+
+    @staticmethod
+    def prompt(day: str, day_budget: Dict[str, Any], budget: Dict[str, Any]) -> str:
+        slots = ", ".join(f"{slot}: {b['calories']} kcal / {b['protein_g']}g protein / {b['carbs_g']}g carbs / "
+                          f"{b['fats_g']}g fats" for slot, b in day_budget["slots"].items())
+        lines = [
+            f"Day: {day.capitalize()}.",
+            f"Daily budget: {day_budget['calories']} kcal, {day_budget['protein_g']}g protein, "
+            f"{day_budget['carbs_g']}g carbs, {day_budget['fats_g']}g fats.",
+            f"Per meal: {slots}.",
+        ]
+        if day_budget["main_protein"]:
+            lines.append(f"Dinner is built around {day_budget['main_protein']}; "
+                         f"cook an extra portion for tomorrow's lunch.")
+        else:
+            lines.append("Cook an extra portion of dinner for tomorrow's lunch.")
+        if day_budget["leftover_protein"]:
+            lines.append(f"Lunch is leftovers of yesterday's {day_budget['leftover_protein']} dinner; "
+                         f"name it \"Leftover ...\".")
+        elif day_budget["leftovers_from"]:
+            lines.append("Lunch is leftovers of yesterday's dinner; name it \"Leftover ...\".")
+        if budget["restrictions"]:
+            lines.append(f"Dietary restrictions: {', '.join(budget['restrictions'])}.")
+        if budget["allergies"]:
+            lines.append(f"Allergies (never use): {', '.join(budget['allergies'])}.")
+        if budget.get("excluded_proteins"):
+            lines.append(f"Because of these allergies never use: {', '.join(budget['excluded_proteins'])}.")
+        return "\n".join(lines)
+
+    async def __call__(self, day: str, day_budget: Dict[str, Any], budget: Dict[str, Any],
+                       plugins: Optional[List[BasePlugin]] = None) -> Dict[str, Any]:
+        runner = self._get_runner(plugins)
+        user_id = "meal_planner"
+        session = await runner.session_service.create_session(
+            app_name=self.APP_NAME, user_id=user_id, session_id=f"{day}-{uuid.uuid4().hex}"
+        )
+        message = types.Content(role="user", parts=[types.Part(text=self.prompt(day, day_budget, budget))])
+        response_text = ""
+        try:
+            async for event in runner.run_async(user_id=user_id, session_id=session.id, new_message=message):
+                if event.content and event.content.parts:
+                    response_text += "".join(part.text or "" for part in event.content.parts)
+        finally:
+            await runner.session_service.delete_session(
+                app_name=self.APP_NAME, user_id=user_id, session_id=session.id
+            )
+        return _parse_json(response_text)
+
+
+def _save_plan(ctx: InvocationContext, plan: Dict[str, Dict[str, Any]]) -> str:
+    if len(plan) == len(DAYS):
+        return save_meal_plan_to_memory(json.dumps(plan), tool_context=ctx)
+    # An incomplete week is kept for this user only, not shared through the meal plan cache
+    with user_memory(ctx) as memory:
+        return memory.save_meal_plan(plan)
+
+
+def _profile_and_targets(ctx: InvocationContext) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    with user_memory(ctx) as memory:
+        return memory.user_profile, memory.get_targets()
+
+
+class WeeklyMealPlanAgent(BaseAgent):
+    """Agent that builds a 7-day meal plan day by day, streaming each day as it is ready.
+
+    The finished plan is reviewed and saved with ``save_meal_plan_to_memory``
+    (which also shares it through the meal plan cache). Days that could not
+    be generated are reported and left out; the rest of the week is still
+    reviewed and saved, for this user only.
+    """
+
+    generate_day: Any = None
+    max_parallel_days: int = MEAL_PLAN_MAX_PARALLEL_DAYS
+
+    def _message(self, ctx: InvocationContext, text: str) -> Event:
+        return Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=text)])
+        )
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        profile, targets = await tool_executor.run(_profile_and_targets, ctx)
+        if profile is None or targets is None:
+            yield self._message(ctx, "I need your profile (age, weight, height, goal, activity level) "
+                                     "before I can plan your week.")
+            return
+
+        budget = weekly_budget(targets, profile)
+        yield self._message(
+            ctx,
+            f"Planning your week at {targets['calories']} kcal/day (protein {targets['protein_g']}g, "
+            f"carbs {targets['carbs_g']}g, fats {targets['fats_g']}g). Days will appear as they are ready."
+        )
+
+        generate_day = self.generate_day
+        if isinstance(generate_day, LlmDayPlanner):
+            generate_day = functools.partial(generate_day, plugins=invocation_plugins(ctx))
+
+        plan: Dict[str, Dict[str, Any]] = {}
+        async for day, day_plan, problems in plan_days(budget, generate_day, self.max_parallel_days):
+            if day_plan is None:
+                yield self._message(ctx, f"**{day.capitalize()}** could not be planned ({'; '.join(problems)}).")
+                continue
+            plan[day] = day_plan
+            yield self._message(ctx, format_day(day, day_plan))
+
+        if not plan:
+            yield self._message(ctx, "None of the days could be planned, so nothing was saved. Please try again.")
+            return
+
+        plan = {day: plan[day] for day in DAYS if day in plan}
+        review = review_week(plan, budget)
+        saved = await tool_executor.run(_save_plan, ctx, plan)
+
+        weekly = review["weekly_totals"]
+        lines = [
+            f"Weekly totals: {weekly['calories']:.0f} kcal (budget {budget['weekly']['calories']:.0f}), "
+            f"protein {weekly['protein_g']:.0f}g, carbs {weekly['carbs_g']:.0f}g, fats {weekly['fats_g']:.0f}g.",
+            f"{review['unique_meals']} different meals; lunch reuses the previous dinner on "
+            f"{len(review['leftovers'])} days to cut cooking time."
+        ]
+        if review["issues"]:
+            lines.append("Worth adjusting: " + "; ".join(review["issues"]))
+        lines.append(saved + ".")
+        yield self._message(ctx, "\n".join(lines))
@@ -0,0 +1,348 @@
+"""Shared scheduler in front of every model call.
+
+All agents share one ``ModelScheduler``. Their models are wrapped in
+``ScheduledLlm``, so a burst of sessions is paced to the quota and does not
+fail all at once. Each model call:
+
+1. is coalesced with an identical request already in flight (same model,
+   contents and config), which then answers both callers;
+2. waits for a token from the model's token bucket, with interactive turns
+   served before background work such as weekly meal-plan days;
+3. is retried on 429 and 5xx errors with jittered exponential backoff, up to
+   ``MAX_RETRIES`` times. A 429 also empties the model's bucket, so the
+   other queued calls slow down as well.
+"""
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from nutrition_coach_agent.config import (
+    MAX_RETRIES,
+    MODEL_BURST,
+    MODEL_RATE_LIMITS,
+    MODEL_REQUESTS_PER_MINUTE,
+    MODEL_RETRY_BASE_DELAY_S,
+    MODEL_RETRY_MAX_DELAY_S
+)
+from nutrition_coach_agent.tracing import LatencyHistogram
+
+# Lower numbers are served first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of a model error (``google.genai`` errors carry it as ``code``)."""
+    for attribute in ("code", "status_code"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    return status_code(error) in RETRYABLE_STATUS_CODES
+
+
+class TokenBucket:
+    """Token bucket with a priority queue of waiters.
+
+    Tokens refill continuously at ``rate_per_s`` up to ``capacity``. Waiters
+    are served strictly in (priority, arrival) order. The bucket does not
+    belong to an event loop, so it can be shared by several runners.
+
+    Args:
+        rate_per_s: Tokens added per second
+        capacity: Maximum burst size
+    """
+
+    def __init__(self, rate_per_s: float, capacity: float):
+        self.rate_per_s = rate_per_s
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._waiters: List[List[int]] = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate_per_s)
+        self._updated = now
+
+    def _try_take(self, entry: List[int]) -> Optional[float]:
+        """Take a token if ``entry`` is first in line; otherwise return how long to wait."""
+        with self._lock:
+            self._refill()
+            if self._waiters[0] is entry and self.tokens >= 1:
+                heapq.heappop(self._waiters)
+                self.tokens -= 1
+                return None
+            return max((1 - self.tokens) / self.rate_per_s, 0.001)
+
+    async def acquire(self, priority: int = INTERACTIVE) -> float:
+        """Wait for a token; returns the seconds spent waiting."""
+        start = time.monotonic()
+        entry = [priority, next(self._order)]
+        with self._lock:
+            heapq.heappush(self._waiters, entry)
+        try:
+            while True:
+                wait = self._try_take(entry)
+                if wait is None:
+                    return time.monotonic() - start
+                # Re-check at least every token interval, so a higher-priority arrival is noticed
+                await asyncio.sleep(min(wait, 1 / self.rate_per_s))
+        except BaseException:
+            with self._lock:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+            raise
+
+    def drain(self) -> None:
+        """Drop the tokens left, e.g. after the quota was exceeded anyway."""
+        with self._lock:
+            self._refill()
+            self.tokens = 0.0
+
+
+class _ModelStats:
+    def __init__(self):
+        self.requests = 0
+        self.attempts = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.queue_wait = LatencyHistogram()
+
+    def summary(self) -> Dict[str, Any]:
+        wait = self.queue_wait.summary()
+        return {
+            "requests": self.requests,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "queue_wait_p50_ms": wait["p50_ms"],
+            "queue_wait_p99_ms": wait["p99_ms"]
+        }
+
+
+class ModelScheduler:
+    """Rate limits, prioritizes, retries and coalesces model calls.
+
+    Args:
+        requests_per_minute: Default rate for models without an entry in ``rate_limits``
+        burst: Default bucket size
+        rate_limits: Per-model ``(requests_per_minute, burst)`` overrides
+        max_retries: Retries after the first attempt before an error is raised
+        base_delay_s: Backoff before the first retry; doubles with each retry
+        max_delay_s: Upper bound on a single backoff
+    """
+
+    def __init__(self, requests_per_minute: float = MODEL_REQUESTS_PER_MINUTE, burst: float = MODEL_BURST,
+                 rate_limits: Optional[Dict[str, Tuple[float, float]]] = None, max_retries: int = MAX_RETRIES,
+                 base_delay_s: float = MODEL_RETRY_BASE_DELAY_S, max_delay_s: float = MODEL_RETRY_MAX_DELAY_S):
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.rate_limits = dict(MODEL_RATE_LIMITS if rate_limits is None else rate_limits)
+        self.max_retries = max_retries
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._inflight: Dict[Tuple[int, str], asyncio.Future] = {}
+        self._stats: Dict[str, _ModelStats] = defaultdict(_ModelStats)
+        self._lock = threading.Lock()
+
+    def bucket(self, model: str) -> TokenBucket:
+        with self._lock:
+            if model not in self._buckets:
+                rpm, burst = self.rate_limits.get(model, (self.requests_per_minute, self.burst))
+                self._buckets[model] = TokenBucket(rpm / 60, burst)
+            return self._buckets[model]
+
+    def backoff_s(self, retry: int) -> float:
+        """Full-jitter exponential backoff before retry number ``retry`` (0-based)."""
+        return random.uniform(0, min(self.max_delay_s, self.base_delay_s * 2 ** retry))
+
+    @staticmethod
+    def request_key(llm_request: LlmRequest) -> Optional[str]:
+        """Identity of a request for coalescing, or None when it cannot be serialized."""
+        try:
+            body = llm_request.model_dump_json(include={"model", "contents", "config"})
+        except Exception:
+            return None
+        return hashlib.sha256(body.encode()).hexdigest()
+
+    async def _acquire(self, model: str, priority: int) -> None:
+        stats = self._stats[model]
+        stats.queue_wait.record(await self.bucket(model).acquire(priority) * 1000)
+        stats.attempts += 1
+
+    def _should_retry(self, model: str, error: Exception, retry: int) -> bool:
+        """Count a failed attempt and decide whether it is retried."""
+        stats = self._stats[model]
+        if status_code(error) == 429:
+            stats.rate_limited += 1
+            self.bucket(model).drain()
+        if not is_retryable(error) or retry >= self.max_retries:
+            stats.failures += 1
+            return False
+        stats.retries += 1
+        return True
+
+    async def _attempts(self, model: str, priority: int, call: Callable[[], Awaitable[Any]],
+                        on_attempt: Optional[Callable[[float], None]] = None) -> Any:
+        """Run ``call`` after taking a token, retrying retryable errors.
+
+        ``on_attempt`` gets the duration in ms of every attempt, without the
+        queue wait before it or the backoff after it.
+        """
+        for retry in itertools.count():
+            await self._acquire(model, priority)
+            start = time.perf_counter()
+            try:
+                return await call()
+            except Exception as error:
+                if not self._should_retry(model, error, retry):
+                    raise
+            finally:
+                if on_attempt is not None:
+                    on_attempt((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(self.backoff_s(retry))
+
+    async def _coalesce(self, key: Optional[str], model: str,
+                        produce: Callable[[], Awaitable[List[LlmResponse]]]) -> List[LlmResponse]:
+        """Share one in-flight result between identical requests on the same loop."""
+        if key is None:
+            return await produce()
+        key = (id(asyncio.get_running_loop()), key)
+        while key in self._inflight:
+            leader = self._inflight[key]
+            try:
+                responses = await asyncio.shield(leader)
+            except asyncio.CancelledError:
+                if not leader.cancelled():
+                    raise
+                # The first caller was cancelled; take over (or follow whoever did)
+                continue
+            self._stats[model].coalesced += 1
+            return [response.model_copy(deep=True) for response in responses]
+
+        future = asyncio.get_running_loop().create_future()
+        # Followers may not exist; mark a failure as seen so it is not logged as unretrieved
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            responses = await produce()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(responses)
+            return responses
+        finally:
+            del self._inflight[key]
+
+    async def generate(self, llm: BaseLlm, llm_request: LlmRequest, stream: bool = False,
+                       priority: int = INTERACTIVE,
+                       on_attempt: Optional[Callable[[float], None]] = None) -> AsyncGenerator[LlmResponse, None]:
+        """Generate through ``llm`` under the scheduler's limits.
+
+        ``on_attempt`` gets the duration in ms of each call made to ``llm``
+        (see ``_attempts``); a request served by coalescing makes none.
+        """
+        model = llm.model
+        self._stats[model].requests += 1
+
+        if stream:
+            # Partial responses go straight to the caller, so only a failure before the first one is retried
+            for retry in itertools.count():
+                await self._acquire(model, priority)
+                start = time.perf_counter()
+                started = False
+                try:
+                    async for response in llm.generate_content_async(llm_request, stream=True):
+                        started = True
+                        yield response
+                    return
+                except Exception as error:
+                    if started:
+                        self._stats[model].failures += 1
+                        raise
+                    if not self._should_retry(model, error, retry):
+                        raise
+                finally:
+                    if on_attempt is not None:
+                        on_attempt((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(self.backoff_s(retry))
+
+        async def collect() -> List[LlmResponse]:
+            return [response async for response in llm.generate_content_async(llm_request, stream=False)]
+
+        async def produce() -> List[LlmResponse]:
+            return await self._attempts(model, priority, collect, on_attempt)
+
+        for response in await self._coalesce(self.request_key(llm_request), model, produce):
+            yield response
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model request, retry, 429, coalescing and queue-wait counts."""
+        return {model: stats.summary() for model, stats in self._stats.items()}
+
+
+# Shared by every agent, so all sessions draw on the same quota
+model_scheduler = ModelScheduler()
+
+
+class ScheduledLlm(BaseLlm):
+    """A model whose calls go through a ``ModelScheduler``.
+
+    Keeps the wrapped model's name, so tracing, record/replay and built-in
+    tools that check the model name see no difference.
+    """
+
+    llm: BaseLlm
+    priority: int = INTERACTIVE
+    scheduler: Any = None
+
+    async def generate_content_async(
+            self, llm_request: LlmRequest, stream: bool = False,
+            on_attempt: Optional[Callable[[float], None]] = None
+    ) -> AsyncGenerator[LlmResponse, None]:
+        scheduler = self.scheduler or model_scheduler
+        async for response in scheduler.generate(self.llm, llm_request, stream=stream, priority=self.priority,
+                                                 on_attempt=on_attempt):
+            yield response
+
+    def connect(self, llm_request: LlmRequest):
+        return self.llm.connect(llm_request)
+
+
+def scheduled_model(model: Union[str, BaseLlm], priority: int = INTERACTIVE,
+                    scheduler: Optional[ModelScheduler] = None) -> ScheduledLlm:
+    """Wrap a model (or model name) so its calls go through the scheduler."""
+    if isinstance(model, str):
+        from google.adk.models.registry import LLMRegistry
+
+        model = LLMRegistry.new_llm(model)
+    return ScheduledLlm(model=model.model, llm=model, priority=priority, scheduler=scheduler)
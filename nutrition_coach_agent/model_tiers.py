@@ -0,0 +1,234 @@
+"""Latency-aware model tiering per agent.
+
+Each agent may use a range of model tiers (``AGENT_MODEL_TIERS``): logging
+turns on ``progress_tracker`` can go to a small, fast model, while plan
+generation on ``nutrition_planner`` gets a bigger one. ``TieredLlm`` picks a
+tier for every model call:
+
+1. ``estimate_complexity`` scores the turn's user message from 0 to 1
+   (planning language, length, several questions, structured output) and
+   the score picks a tier from the agent's range;
+2. if that tier's model has a rolling p95 latency above the tier's budget
+   (``MODEL_TIER_P95_BUDGET_MS``), the nearest tier within budget is used
+   instead, preferring faster tiers;
+3. if the call still fails after the scheduler's retries, it is tried once
+   on the next tier.
+
+Every decision is counted in ``ModelTiering.stats()``.
+"""
+
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from typing import Any, AsyncGenerator, Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from nutrition_coach_agent.config import (
+    AGENT_MODEL_TIERS,
+    MODEL_LATENCY_MIN_SAMPLES,
+    MODEL_LATENCY_WINDOW_S,
+    MODEL_TIER_P95_BUDGET_MS,
+    MODEL_TIERING_ENABLED,
+    MODEL_TIERS
+)
+from nutrition_coach_agent.model_scheduler import INTERACTIVE, ScheduledLlm, is_retryable, scheduled_model
+
+_PLANNING = re.compile(r"\b(plans?|planning|program(?:me)?s?|schedule|week|weekly|routine|design|create|build)\b",
+                       re.IGNORECASE)
+_LOGGING = re.compile(r"\b(log|logged|drank|ate|had|did|finished|completed)\b", re.IGNORECASE)
+
+
+def _user_text(llm_request: LlmRequest) -> str:
+    """Text of the latest user message, skipping tool results sent back as user content."""
+    for content in reversed(llm_request.contents or []):
+        if content.role != "user" or not content.parts:
+            continue
+        text = " ".join(part.text for part in content.parts if part.text)
+        if text.strip():
+            return text
+    return ""
+
+
+def estimate_complexity(llm_request: LlmRequest) -> float:
+    """
+    Score how demanding a model call is, from 0 (quick log) to 1 (plan generation).
+
+    The score comes from the turn's user message, so every model call of a
+    turn (including the follow-ups after tool calls) gets the same tier.
+    """
+    text = _user_text(llm_request)
+    planning = _PLANNING.search(text) is not None
+    score = min(len(text.split()) / 120, 0.4)
+    if planning:
+        score += 0.5
+    elif _LOGGING.search(text):
+        score *= 0.5
+    score += 0.1 * min(max(text.count("?") - 1, 0), 2)
+    config = llm_request.config
+    if config is not None and config.response_mime_type == "application/json":
+        score += 0.2
+    return round(min(score, 1.0), 3)
+
+
+class RollingLatency:
+    """Latency samples of one model over a sliding time window."""
+
+    def __init__(self, window_s: float = MODEL_LATENCY_WINDOW_S, max_samples: int = 200):
+        self.window_s = window_s
+        self._samples: Deque[Tuple[float, float]] = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def record(self, duration_ms: float) -> None:
+        with self._lock:
+            self._samples.append((time.monotonic(), duration_ms))
+
+    def _recent(self) -> List[float]:
+        cutoff = time.monotonic() - self.window_s
+        with self._lock:
+            while self._samples and self._samples[0][0] < cutoff:
+                self._samples.popleft()
+            return sorted(duration for _, duration in self._samples)
+
+    def p95(self) -> Tuple[Optional[float], int]:
+        """95th percentile in ms (None without samples) and the number of samples."""
+        samples = self._recent()
+        if not samples:
+            return None, 0
+        return samples[min(int(0.95 * len(samples)), len(samples) - 1)], len(samples)
+
+
+class ModelTiering:
+    """Chooses tiers and keeps the latency and decision metrics they are based on.
+
+    Args:
+        budgets_ms: Per-tier p95 latency above which a tier counts as slow
+        min_samples: Samples a model needs before it can count as slow
+        window_s: How long latency samples are kept
+    """
+
+    def __init__(self, budgets_ms: Optional[Dict[str, float]] = None,
+                 min_samples: int = MODEL_LATENCY_MIN_SAMPLES, window_s: float = MODEL_LATENCY_WINDOW_S):
+        self.budgets_ms = dict(MODEL_TIER_P95_BUDGET_MS if budgets_ms is None else budgets_ms)
+        self.min_samples = min_samples
+        self.window_s = window_s
+        self.latency: Dict[str, RollingLatency] = defaultdict(lambda: RollingLatency(self.window_s))
+        self.decisions: Dict[str, Counter] = defaultdict(Counter)
+        self.fallbacks: Counter = Counter()
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=50)
+        self._lock = threading.Lock()
+
+    def is_slow(self, tier: str, model: str) -> bool:
+        p95, samples = self.latency[model].p95()
+        return samples >= self.min_samples and p95 > self.budgets_ms.get(tier, float("inf"))
+
+    def choose(self, tiers: Sequence[Tuple[str, str]], complexity: float) -> Tuple[int, str]:
+        """
+        Pick one of ``tiers`` (``(tier, model)`` pairs, cheapest first) for a call.
+
+        Returns the index of the tier and the reason: "complexity", or
+        "slow_fallback" when the tier the complexity asked for was slow.
+        """
+        wanted = min(int(complexity * len(tiers)), len(tiers) - 1)
+        if not self.is_slow(*tiers[wanted]):
+            return wanted, "complexity"
+        # Nearest tier within budget, faster tiers first at equal distance
+        for index in sorted(range(len(tiers)), key=lambda i: (abs(i - wanted), i)):
+            if index != wanted and not self.is_slow(*tiers[index]):
+                return index, "slow_fallback"
+        return wanted, "complexity"
+
+    def record_decision(self, agent: str, tier: str, model: str, complexity: float, reason: str) -> None:
+        with self._lock:
+            self.decisions[agent][tier] += 1
+            if reason != "complexity":
+                self.fallbacks[reason] += 1
+            self.recent.append({"agent": agent, "tier": tier, "model": model,
+                                "complexity": complexity, "reason": reason})
+
+    def stats(self) -> Dict[str, Any]:
+        """Decisions per agent and tier, fallback counts and each model's rolling p95."""
+        models = {}
+        for model, latency in list(self.latency.items()):
+            p95, samples = latency.p95()
+            models[model] = {"p95_ms": round(p95, 1) if p95 is not None else None, "samples": samples}
+        with self._lock:
+            return {
+                "decisions": {agent: dict(counts) for agent, counts in self.decisions.items()},
+                "fallbacks": dict(self.fallbacks),
+                "models": models,
+                "recent": list(self.recent)
+            }
+
+
+# Shared by every agent, so latency seen by one agent informs the others
+model_tiering = ModelTiering()
+
+
+class TieredLlm(BaseLlm):
+    """A model that routes each call to one of several tiers.
+
+    ``model`` is the name reported before the tier is chosen (e.g. to
+    tracing); the request sent to a tier carries that tier's model name.
+    """
+
+    agent: str
+    tiers: List[Tuple[str, BaseLlm]]
+    tiering: Any = None
+
+    async def generate_content_async(
+            self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        tiering = self.tiering or model_tiering
+        names = [(tier, llm.model) for tier, llm in self.tiers]
+        complexity = estimate_complexity(llm_request)
+        index, reason = tiering.choose(names, complexity)
+
+        while True:
+            tier, llm = self.tiers[index]
+            tiering.record_decision(self.agent, tier, llm.model, complexity, reason)
+            llm_request.model = llm.model
+            latency = tiering.latency[llm.model]
+            scheduled = isinstance(llm, ScheduledLlm)
+            if scheduled:
+                # Time each attempt at the model, not the scheduler's queue wait or retry backoff
+                responses = llm.generate_content_async(llm_request, stream=stream, on_attempt=latency.record)
+            else:
+                responses = llm.generate_content_async(llm_request, stream=stream)
+            start = time.perf_counter()
+            started = False
+            try:
+                async for response in responses:
+                    started = True
+                    yield response
+            except Exception as error:
+                if not scheduled:
+                    latency.record((time.perf_counter() - start) * 1000)
+                if started or not is_retryable(error) or reason == "error_fallback" or len(self.tiers) == 1:
+                    raise
+                index, reason = (index + 1) % len(self.tiers), "error_fallback"
+                continue
+            if not scheduled:
+                latency.record((time.perf_counter() - start) * 1000)
+            return
+
+    def connect(self, llm_request: LlmRequest):
+        return self.tiers[0][1].connect(llm_request)
+
+
+def tiered_model(agent: str, default_model: Union[str, BaseLlm], priority: int = INTERACTIVE,
+                 tiers: Optional[Sequence[str]] = None) -> BaseLlm:
+    """
+    The model for ``agent``: tiered when enabled and configured, else ``default_model``.
+
+    All tiers go through the model scheduler at ``priority``.
+    """
+    tiers = tiers if tiers is not None else AGENT_MODEL_TIERS.get(agent)
+    if not MODEL_TIERING_ENABLED or not tiers:
+        return scheduled_model(default_model, priority=priority)
+    models = [(tier, scheduled_model(MODEL_TIERS[tier], priority=priority)) for tier in tiers]
+    name = default_model if isinstance(default_model, str) else default_model.model
+    return TieredLlm(model=name, agent=agent, tiers=models)
@@ -0,0 +1,142 @@
+"""Shared cache of weekly meal plans keyed by a normalized profile signature.
+
+Users with the same goal, dietary restrictions, allergies and (bucketed)
+calorie target can be served the same plan instead of generating a new one.
+When there is no plan for the exact calorie bucket, the closest cached plan
+for the same goal/restrictions/allergies is adapted by scaling its food
+amounts together with its calorie and macro numbers.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from nutrition_coach_agent.food_db import scale_food_item
+
+# Numeric fields scaled when a plan is adapted to a different calorie target
+_SCALED_KEYS = frozenset({
+    "calories", "kcal", "protein", "carbs", "fats", "fat",
+    "protein_g", "carbs_g", "fats_g", "fat_g"
+})
+
+
+def profile_signature(profile: Optional[Dict[str, Any]], bucket_kcal: int = 100) -> Optional[Tuple]:
+    """
+    Canonical cache key for a profile.
+
+    Returns:
+        Tuple of (goal, restrictions, allergies, calorie bucket), or None if
+        the profile has no calorie target to bucket (or it rounds to 0).
+    """
+    if not profile:
+        return None
+    calories = profile.get("daily_calories") or (profile.get("targets") or {}).get("calories")
+    if not calories:
+        return None
+    bucket = int(round(calories / bucket_kcal)) * bucket_kcal
+    if bucket <= 0:
+        return None
+    return (
+        (profile.get("fitness_goal") or "").strip().lower(),
+        tuple(sorted({r.strip().lower() for r in profile.get("dietary_restrictions") or [] if r.strip()})),
+        tuple(sorted({a.strip().lower() for a in profile.get("allergies") or [] if a.strip()})),
+        bucket
+    )
+
+
+def _scale_foods(foods: Any, ratio: float) -> Any:
+    """Scale the amounts of a meal's ``foods`` (a list of strings or one comma-separated string)."""
+    if isinstance(foods, str):
+        return ", ".join(scale_food_item(food.strip(), ratio) for food in foods.split(",") if food.strip())
+    if isinstance(foods, list):
+        return [scale_food_item(food, ratio) if isinstance(food, str) else food for food in foods]
+    return foods
+
+
+def scale_plan(plan: Any, ratio: float) -> Any:
+    """
+    Return a copy of ``plan`` with calorie and macro numbers and food amounts multiplied by ``ratio``.
+
+    Food amounts are rounded to measurable steps (see ``scale_food_item``),
+    so the scaled ingredients add up to the scaled totals only approximately.
+    """
+    if isinstance(plan, dict):
+        scaled = {}
+        for key, value in plan.items():
+            if key in _SCALED_KEYS and isinstance(value, (int, float)) and not isinstance(value, bool):
+                scaled[key] = round(value * ratio)
+            elif key == "foods":
+                scaled[key] = _scale_foods(value, ratio)
+            else:
+                scaled[key] = scale_plan(value, ratio)
+        return scaled
+    if isinstance(plan, list):
+        return [scale_plan(item, ratio) for item in plan]
+    return plan
+
+
+class MealPlanCache:
+    """LRU cache of meal plans with hit-rate counters."""
+
+    def __init__(self, max_entries: int = 512, max_adapt_kcal: int = 300):
+        self.max_entries = max_entries
+        self.max_adapt_kcal = max_adapt_kcal
+        self._plans: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.adapted_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def put(self, signature: Tuple, plan: Dict[str, Any]) -> None:
+        """Cache ``plan`` under ``signature``."""
+        with self._lock:
+            self._plans[signature] = copy.deepcopy(plan)
+            self._plans.move_to_end(signature)
+            if len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, signature: Tuple) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """
+        Look up a plan for ``signature``.
+
+        Returns:
+            Tuple of (plan copy, adapted flag), or None on a miss. ``adapted``
+            is True when the plan was scaled from a nearby calorie bucket.
+        """
+        with self._lock:
+            plan = self._plans.get(signature)
+            if plan is not None:
+                self._plans.move_to_end(signature)
+                self.hits += 1
+                return copy.deepcopy(plan), False
+
+            target = signature[3]
+            nearest = None
+            for candidate in self._plans:
+                distance = abs(candidate[3] - target)
+                # A plan cannot be scaled from or to a zero calorie bucket
+                if candidate[:3] == signature[:3] and distance <= self.max_adapt_kcal and min(candidate[3], target) > 0:
+                    if nearest is None or distance < abs(nearest[3] - target):
+                        nearest = candidate
+            if nearest is None:
+                self.misses += 1
+                return None
+
+            self._plans.move_to_end(nearest)
+            self.adapted_hits += 1
+            return scale_plan(self._plans[nearest], target / nearest[3]), True
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry count, hit/miss counters and hit rate."""
+        lookups = self.hits + self.adapted_hits + self.misses
+        return {
+            "entries": len(self._plans),
+            "hits": self.hits,
+            "adapted_hits": self.adapted_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.adapted_hits) / lookups if lookups else 0.0
+        }
@@ -0,0 +1,266 @@
+"""Record/replay of model calls so the agent tree can run offline.
+
+``RecordReplayPlugin`` is an ADK plugin. In ``record`` mode it lets every
+model call (and tool call) go through and writes the requests, responses
+and their latencies to a JSON cassette. In ``replay`` mode it answers model
+calls from the cassette instead of calling Gemini, optionally sleeping for
+the recorded (or a fixed) latency. Local tools still run for real during
+replay, so routing, tool execution, session handling and serialization are
+all measured; tools that need the network (``web_search``) are replayed too.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+MODES = ("record", "replay")
+CASSETTE_VERSION = 1
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when the cassette has no response for a model call."""
+
+
+def _parts_signature(llm_request: LlmRequest) -> List[list]:
+    """Conversation content relevant for matching, without call ids."""
+    signature = []
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            if part.text:
+                signature.append([content.role, "text", part.text])
+            elif part.function_call:
+                signature.append([content.role, "call", part.function_call.name, part.function_call.args])
+            elif part.function_response:
+                signature.append([content.role, "response", part.function_response.name,
+                                  part.function_response.response])
+    return signature
+
+
+def request_key(agent_name: str, llm_request: LlmRequest) -> str:
+    """Stable hash identifying a model request within a cassette."""
+    payload = json.dumps(
+        [agent_name, llm_request.model, _parts_signature(llm_request)],
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def tool_key(tool_name: str, tool_args: Dict[str, Any]) -> str:
+    """Stable key identifying a tool call within a cassette."""
+    return f"{tool_name}:{json.dumps(tool_args, sort_keys=True, default=str)}"
+
+
+class Cassette:
+    """Recorded model and tool calls, stored as JSON.
+
+    Replay looks calls up by exact key first. If the conversation drifted
+    (e.g. a tool result contains today's date), it falls back to the next
+    unused recording for the same agent or tool, in recorded order.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.model_calls: List[Dict[str, Any]] = []
+        self.tool_calls: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._model_by_key: Dict[str, Deque[int]] = defaultdict(deque)
+        self._model_by_agent: Dict[str, Deque[int]] = defaultdict(deque)
+        self._tool_by_key: Dict[str, Deque[int]] = defaultdict(deque)
+        self._tool_by_name: Dict[str, Deque[int]] = defaultdict(deque)
+        self._used_model: set = set()
+        self._used_tool: set = set()
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        cassette = cls(path)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for entry in data.get("model_calls", []):
+            cassette._index_model(entry)
+        for entry in data.get("tool_calls", []):
+            cassette._index_tool(entry)
+        return cassette
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            data = {
+                "version": CASSETTE_VERSION,
+                "model_calls": list(self.model_calls),
+                "tool_calls": list(self.tool_calls)
+            }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def _index_model(self, entry: Dict[str, Any]) -> None:
+        index = len(self.model_calls)
+        self.model_calls.append(entry)
+        self._model_by_key[entry["key"]].append(index)
+        self._model_by_agent[entry["agent"]].append(index)
+
+    def _index_tool(self, entry: Dict[str, Any]) -> None:
+        index = len(self.tool_calls)
+        self.tool_calls.append(entry)
+        self._tool_by_key[entry["key"]].append(index)
+        self._tool_by_name[entry["tool"]].append(index)
+
+    def record_model_call(self, agent: str, key: str, response: Dict[str, Any], latency_s: float) -> None:
+        with self._lock:
+            self._index_model({"agent": agent, "key": key, "response": response, "latency_s": latency_s})
+
+    def record_tool_call(self, tool: str, key: str, args: Dict[str, Any], result: Any, latency_s: float) -> None:
+        with self._lock:
+            self._index_tool({"tool": tool, "key": key, "args": args, "result": result, "latency_s": latency_s})
+
+    @staticmethod
+    def _take(queues: Iterable[Deque[int]], used: set) -> Optional[int]:
+        for queue in queues:
+            while queue:
+                index = queue.popleft()
+                if index not in used:
+                    used.add(index)
+                    return index
+        return None
+
+    def next_model_call(self, agent: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            index = self._take([self._model_by_key[key], self._model_by_agent[agent]], self._used_model)
+            return None if index is None else self.model_calls[index]
+
+    def next_tool_call(self, tool: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            index = self._take([self._tool_by_key[key], self._tool_by_name[tool]], self._used_tool)
+            return None if index is None else self.tool_calls[index]
+
+
+class RecordReplayPlugin(BasePlugin):
+    """ADK plugin that records model/tool calls to a cassette or replays them.
+
+    Args:
+        cassette_path: JSON file to write (record) or read (replay)
+        mode: "record" or "replay"
+        replay_tools: Tool names whose results are also served from the
+            cassette during replay (tools that would need the network)
+        latency_scale: During replay, sleep for the recorded latency times
+            this factor (0 disables simulated latency)
+        fixed_latency_s: During replay, sleep this long per model call
+            instead of the recorded latency
+    """
+
+    def __init__(
+            self,
+            cassette_path: str,
+            mode: str = "replay",
+            replay_tools: Iterable[str] = ("web_search",),
+            latency_scale: float = 0.0,
+            fixed_latency_s: Optional[float] = None
+    ):
+        super().__init__(name="record_replay")
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        self.mode = mode
+        self.replay_tools = frozenset(replay_tools)
+        self.latency_scale = latency_scale
+        self.fixed_latency_s = fixed_latency_s
+        self.cassette = Cassette.load(cassette_path) if mode == "replay" else Cassette(cassette_path)
+        self._pending: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self.replayed_model_calls = 0
+        self.replayed_tool_calls = 0
+
+    async def _simulate_latency(self, recorded_s: float) -> None:
+        delay = self.fixed_latency_s if self.fixed_latency_s is not None else recorded_s * self.latency_scale
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def before_model_callback(
+            self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        agent = callback_context.agent_name
+        key = request_key(agent, llm_request)
+        if self.mode == "record":
+            self._pending[(callback_context.invocation_id, agent)] = (key, time.perf_counter())
+            return None
+
+        entry = self.cassette.next_model_call(agent, key)
+        if entry is None:
+            raise CassetteMissError(f"No recorded model response for agent {agent!r} in {self.cassette.path}")
+        await self._simulate_latency(entry["latency_s"])
+        self.replayed_model_calls += 1
+        return LlmResponse.model_validate(entry["response"])
+
+    async def after_model_callback(
+            self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        if self.mode != "record" or llm_response.partial:
+            return None
+        agent = callback_context.agent_name
+        pending = self._pending.pop((callback_context.invocation_id, agent), None)
+        if pending is not None:
+            key, start = pending
+            self.cassette.record_model_call(
+                agent,
+                key,
+                llm_response.model_dump(mode="json", exclude_none=True),
+                time.perf_counter() - start
+            )
+        return None
+
+    async def before_tool_callback(
+            self, *, tool: BaseTool, tool_args: Dict[str, Any], tool_context: ToolContext
+    ) -> Optional[dict]:
+        key = tool_key(tool.name, tool_args)
+        if self.mode == "record":
+            self._pending[(tool_context.function_call_id or key, tool.name)] = (key, time.perf_counter())
+            return None
+        if tool.name not in self.replay_tools:
+            return None
+        entry = self.cassette.next_tool_call(tool.name, key)
+        if entry is None:
+            return None
+        await self._simulate_latency(entry["latency_s"])
+        self.replayed_tool_calls += 1
+        result = entry["result"]
+        # Plain tool return values are wrapped by ADK; keep the same shape
+        return result if isinstance(result, dict) else {"result": result}
+
+    async def after_tool_callback(
+            self, *, tool: BaseTool, tool_args: Dict[str, Any], tool_context: ToolContext, result: dict
+    ) -> Optional[dict]:
+        if self.mode != "record":
+            return None
+        pending = self._pending.pop((tool_context.function_call_id or tool_key(tool.name, tool_args), tool.name), None)
+        if pending is not None:
+            key, start = pending
+            self.cassette.record_tool_call(
+                tool.name,
+                key,
+                tool_args,
+                json.loads(json.dumps(result, default=str)),
+                time.perf_counter() - start
+            )
+        return None
+
+    def save(self) -> None:
+        """Write the cassette (record mode only)."""
+        if self.mode == "record":
+            self.cassette.save()
+
+    async def close(self) -> None:
+        self.save()
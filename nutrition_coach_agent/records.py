@@ -0,0 +1,190 @@
+"""Compact log records for SessionMemory.
+
+Each record keeps its fields in ``__slots__`` with an epoch-seconds
+timestamp, and interns repeated strings (food and exercise names, meal types,
+intensities), so a long log history costs far less memory than nested dicts
+with ISO timestamp strings. The dict shape returned by the tools is built on
+demand with ``to_dict``.
+"""
+
+import sys
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _intern_all(values) -> Tuple[str, ...]:
+    return tuple(sys.intern(v) for v in values or ())
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts).isoformat()
+
+
+def _epoch(timestamp: str) -> float:
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+def _compact(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop empty fields (None, "", empty lists) from a compact entry."""
+    return {key: value for key, value in entry.items() if value is not None and value != "" and value != []}
+
+
+def _when(ts: float, with_date: bool) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M" if with_date else "%H:%M")
+
+
+class WorkoutRecord:
+    """One logged workout session."""
+
+    __slots__ = ("ts", "type", "duration", "intensity", "exercises", "notes")
+
+    def __init__(self, ts: float, type: Optional[str], duration: Optional[int], intensity: Optional[str],
+                 exercises: Tuple[str, ...] = (), notes: str = ""):
+        self.ts = ts
+        self.type = _intern(type)
+        self.duration = duration
+        self.intensity = _intern(intensity)
+        self.exercises = exercises
+        self.notes = notes
+
+    @classmethod
+    def from_data(cls, workout_data: Dict[str, Any], ts: float) -> "WorkoutRecord":
+        """Build a record from the ``workout_data`` dict passed to ``log_workout``."""
+        return cls(
+            ts,
+            workout_data.get("type"),
+            workout_data.get("duration"),
+            workout_data.get("intensity"),
+            _intern_all(workout_data.get("exercises")),
+            workout_data.get("notes", "")
+        )
+
+    @classmethod
+    def from_dict(cls, entry: Dict[str, Any]) -> "WorkoutRecord":
+        """Build a record from the dict produced by ``to_dict``."""
+        return cls.from_data(entry["data"], _epoch(entry["timestamp"]))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timestamp": _iso(self.ts),
+            "data": {
+                "type": self.type,
+                "duration": self.duration,
+                "intensity": self.intensity,
+                "exercises": list(self.exercises),
+                "notes": self.notes
+            }
+        }
+
+    def to_compact(self, with_date: bool = False) -> Dict[str, Any]:
+        """Flat, token-light dict for tool results (empty fields omitted)."""
+        return _compact({
+            "kind": "workout",
+            "time": _when(self.ts, with_date),
+            "type": self.type,
+            "minutes": self.duration,
+            "intensity": self.intensity,
+            "exercises": list(self.exercises),
+            "notes": self.notes
+        })
+
+
+class MealRecord:
+    """One logged meal."""
+
+    __slots__ = ("ts", "name", "type", "foods", "calories", "protein", "carbs", "fats", "notes")
+
+    def __init__(self, ts: float, name: Optional[str], type: Optional[str], foods: Tuple[str, ...] = (),
+                 calories: Optional[float] = None, protein: Optional[float] = None,
+                 carbs: Optional[float] = None, fats: Optional[float] = None, notes: str = ""):
+        self.ts = ts
+        self.name = name
+        self.type = _intern(type)
+        self.foods = foods
+        self.calories = calories
+        self.protein = protein
+        self.carbs = carbs
+        self.fats = fats
+        self.notes = notes
+
+    @classmethod
+    def from_data(cls, meal_data: Dict[str, Any], ts: float) -> "MealRecord":
+        """Build a record from the ``meal_data`` dict passed to ``log_meal``."""
+        macros = meal_data.get("macros") or {}
+        return cls(
+            ts,
+            meal_data.get("name"),
+            meal_data.get("type"),
+            _intern_all(meal_data.get("foods")),
+            meal_data.get("calories"),
+            macros.get("protein"),
+            macros.get("carbs"),
+            macros.get("fats"),
+            meal_data.get("notes", "")
+        )
+
+    @classmethod
+    def from_dict(cls, entry: Dict[str, Any]) -> "MealRecord":
+        """Build a record from the dict produced by ``to_dict``."""
+        return cls.from_data(entry["data"], _epoch(entry["timestamp"]))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timestamp": _iso(self.ts),
+            "data": {
+                "name": self.name,
+                "type": self.type,
+                "foods": list(self.foods),
+                "calories": self.calories,
+                "macros": {
+                    "protein": self.protein,
+                    "carbs": self.carbs,
+                    "fats": self.fats
+                },
+                "notes": self.notes
+            }
+        }
+
+    def to_compact(self, with_date: bool = False) -> Dict[str, Any]:
+        """Flat, token-light dict for tool results (empty fields omitted)."""
+        return _compact({
+            "kind": "meal",
+            "time": _when(self.ts, with_date),
+            "name": self.name,
+            "type": self.type,
+            "foods": list(self.foods),
+            "calories": self.calories,
+            "protein_g": self.protein,
+            "carbs_g": self.carbs,
+            "fats_g": self.fats,
+            "notes": self.notes
+        })
+
+
+class HydrationRecord:
+    """One logged glass (or bottle) of water."""
+
+    __slots__ = ("ts", "amount_ml")
+
+    def __init__(self, ts: float, amount_ml: int):
+        self.ts = ts
+        self.amount_ml = amount_ml
+
+    @classmethod
+    def from_dict(cls, entry: Dict[str, Any]) -> "HydrationRecord":
+        """Build a record from the dict produced by ``to_dict``."""
+        return cls(_epoch(entry["timestamp"]), entry["amount_ml"])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timestamp": _iso(self.ts),
+            "amount_ml": self.amount_ml
+        }
+
+    def to_compact(self, with_date: bool = False) -> Dict[str, Any]:
+        """Flat, token-light dict for tool results."""
+        return {"kind": "water", "time": _when(self.ts, with_date), "amount_ml": self.amount_ml}
@@ -0,0 +1,209 @@
+"""Cached web search shared by all sub-agents.
+
+Queries are normalized so near-identical phrasings share one cache entry.
+Results are served from an in-memory LRU first, then from a persistent
+SQLite store, and only on a miss from the search backend. Every entry
+expires after a TTL.
+"""
+
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+_NON_WORD = re.compile(r"[^a-z0-9%]+")
+_STOPWORDS = frozenset({
+    "a", "an", "the", "for", "of", "to", "in", "on", "and", "or", "with",
+    "what", "is", "are", "best", "good", "some", "me", "my", "how", "much"
+})
+
+
+def normalize_query(query: str) -> str:
+    """Canonical cache key: lowercase words without punctuation or stopwords, sorted."""
+    words = set(_NON_WORD.sub(" ", query.lower()).split())
+    return " ".join(sorted(words - _STOPWORDS)) or query.strip().lower()
+
+
+class SearchCache:
+    """Two-level TTL cache: in-memory LRU in front of a SQLite file."""
+
+    def __init__(self, path: Optional[str], ttl_seconds: float = 7 * 24 * 3600, max_memory_entries: int = 1024):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _disk(self) -> Optional[sqlite3.Connection]:
+        """Open the on-disk store on first use (None when running memory-only)."""
+        if self._conn is None and self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, query TEXT NOT NULL, result TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+        return self._conn
+
+    def _remember(self, key: str, expires_at: float, result: str) -> None:
+        self._memory[key] = (expires_at, result)
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, query: str) -> Optional[str]:
+        """Return the cached result for ``query``, or None on a miss."""
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                if cached[0] > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return cached[1]
+                del self._memory[key]
+
+            conn = self._disk()
+            if conn is not None:
+                row = conn.execute(
+                    "SELECT result, expires_at FROM search_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if row[1] > now:
+                        self._remember(key, row[1], row[0])
+                        self.disk_hits += 1
+                        return row[0]
+                    with conn:
+                        conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+
+            self.misses += 1
+            return None
+
+    def put(self, query: str, result: str) -> None:
+        """Cache ``result`` for ``query`` until the TTL runs out."""
+        key = normalize_query(query)
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, result)
+            conn = self._disk()
+            if conn is not None:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO search_cache (key, query, result, expires_at) VALUES (?, ?, ?, ?)",
+                        (key, query, result, expires_at)
+                    )
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and the overall hit rate."""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class FakeSearchBackend:
+    """Local search backend returning canned results, for tests and offline runs."""
+
+    def __init__(self, results: Optional[Dict[str, str]] = None, default: str = "No results found."):
+        self.results = results or {}
+        self.default = default
+        self.calls = 0
+
+    async def search(self, query: str) -> str:
+        self.calls += 1
+        return self.results.get(query, self.default)
+
+
+class GoogleSearchBackend:
+    """Runs a minimal ADK agent with the built-in google_search tool.
+
+    The agent is built on first use so importing this module does not pull
+    in ADK.
+    """
+
+    APP_NAME = "web_search"
+    INSTRUCTION = (
+        "Search the web for the user's query and reply with a concise, factual summary "
+        "of the most relevant results, including key numbers and source names."
+    )
+
+    def __init__(self, model: str):
+        self.model = model
+        self._runner = None
+
+    def _get_runner(self):
+        if self._runner is None:
+            from google.adk.agents import Agent
+            from google.adk.runners import InMemoryRunner
+            from google.adk.tools import google_search
+            from nutrition_coach_agent.model_scheduler import scheduled_model
+
+            agent = Agent(
+                model=scheduled_model(self.model),
+                name="web_search_agent",
+                instruction=self.INSTRUCTION,
+                tools=[google_search]
+            )
+            self._runner = InMemoryRunner(agent=agent, app_name=self.APP_NAME)
+        return self._runner
+
+    async def search(self, query: str) -> str:
+        from google.genai import types
+
+        runner = self._get_runner()
+        session = await runner.session_service.create_session(app_name=self.APP_NAME, user_id="search")
+        message = types.Content(role="user", parts=[types.Part(text=query)])
+        response_text = ""
+        try:
+            async for event in runner.run_async(user_id="search", session_id=session.id, new_message=message):
+                if event.content and event.content.parts:
+                    response_text += "".join(part.text or "" for part in event.content.parts)
+        finally:
+            # One throwaway session per search; keeping them would grow the session service forever
+            await runner.session_service.delete_session(
+                app_name=self.APP_NAME, user_id="search", session_id=session.id
+            )
+        return response_text
+
+
+class CachedSearch:
+    """Search backend wrapped with a SearchCache.
+
+    The cache's SQLite reads and writes run in a worker thread, so they do
+    not hold up the event loop.
+    """
+
+    def __init__(self, backend, cache: SearchCache):
+        self.backend = backend
+        self.cache = cache
+
+    async def search(self, query: str) -> str:
+        cached = await asyncio.to_thread(self.cache.get, query)
+        if cached is not None:
+            return cached
+        result = await self.backend.search(query)
+        if result:
+            await asyncio.to_thread(self.cache.put, query, result)
+        return result
@@ -0,0 +1,26 @@
+"""Compact JSON for tool results.
+
+Tool results go straight into the model's context, so they are serialized
+without indentation or spaces. ``orjson`` is used when it is installed
+(``pip install orjson``); otherwise the standard library encoder is used
+with the same compact output.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj: Any) -> str:
+    """Serialize ``obj`` to compact JSON."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            # e.g. integers wider than 64 bits, which the standard encoder handles
+            pass
+    return json.dumps(obj, separators=(",", ":"))
@@ -0,0 +1,92 @@
+"""Per-user session storage with lock striping and LRU eviction."""
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class _Stripe:
+    """One shard of the store: a lock and an LRU-ordered map of user state."""
+
+    __slots__ = ("lock", "entries", "evictions")
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.entries: "OrderedDict[str, Any]" = OrderedDict()
+        self.evictions = 0
+
+
+class SessionStore:
+    """Multi-tenant store holding one state object per user.
+
+    ``factory`` is called with the user's key to create their state the
+    first time it is requested (or again after it was evicted).
+
+    Users are spread over ``num_stripes`` independently locked shards, so
+    sessions for different users rarely share a lock. Each shard keeps its
+    users in LRU order and evicts the least recently used one once it holds
+    more than its share of ``max_users``. Eviction is only safe when
+    ``factory`` can rebuild a user's state (e.g. from durable storage); with
+    ``max_users=None`` nothing is ever evicted.
+    """
+
+    def __init__(self, factory: Callable[[str], Any], num_stripes: int = 16, max_users: Optional[int] = 10_000):
+        if num_stripes < 1:
+            raise ValueError("num_stripes must be at least 1")
+        if max_users is not None and max_users < num_stripes:
+            raise ValueError("max_users must be at least num_stripes")
+        self._factory = factory
+        self._stripes: List[_Stripe] = [_Stripe() for _ in range(num_stripes)]
+        self._stripe_capacity = -(-max_users // num_stripes) if max_users is not None else None
+
+    def _stripe(self, key: str) -> _Stripe:
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def _get_locked(self, stripe: _Stripe, key: str) -> Any:
+        """Return the state for ``key``; the caller must hold ``stripe.lock``."""
+        entries = stripe.entries
+        state = entries.get(key)
+        if state is None:
+            state = entries[key] = self._factory(key)
+            if self._stripe_capacity is not None and len(entries) > self._stripe_capacity:
+                entries.popitem(last=False)
+                stripe.evictions += 1
+        else:
+            entries.move_to_end(key)
+        return state
+
+    def get(self, key: str) -> Any:
+        """Return the state for ``key``, creating it on first use."""
+        stripe = self._stripe(key)
+        with stripe.lock:
+            return self._get_locked(stripe, key)
+
+    @contextmanager
+    def lease(self, key: str) -> Iterator[Any]:
+        """Hold the user's shard lock while the caller works on their state."""
+        stripe = self._stripe(key)
+        with stripe.lock:
+            yield self._get_locked(stripe, key)
+
+    def evict(self, key: str) -> bool:
+        """Drop the state for ``key``. Returns True if it was present."""
+        stripe = self._stripe(key)
+        with stripe.lock:
+            return stripe.entries.pop(key, None) is not None
+
+    def __contains__(self, key: str) -> bool:
+        stripe = self._stripe(key)
+        with stripe.lock:
+            return key in stripe.entries
+
+    def __len__(self) -> int:
+        return sum(len(stripe.entries) for stripe in self._stripes)
+
+    def stats(self) -> Dict[str, int]:
+        """Return occupancy and eviction counters."""
+        return {
+            "users": len(self),
+            "stripes": len(self._stripes),
+            "evictions": sum(stripe.evictions for stripe in self._stripes)
+        }
@@ -0,0 +1,154 @@
+"""Shopping lists aggregated locally from the saved meal plan.
+
+Every food string of the planned meals ("150g chicken breast", "rice 1 cup",
+"2 eggs") is parsed, matched against the food database (confident matches
+only, see ``FoodDatabase.lookup``) and converted to one unit per food:
+grams, millilitres for foods that are about as dense as water (milk, juice,
+yogurt, oil), or pieces when the food was only ever counted. Amounts are
+summed over the selected days and grouped by the food's shopping category,
+so the list is exact and costs no model tokens.
+"""
+
+import math
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from nutrition_coach_agent.food_db import FoodItem, food_database, normalize_name, parse_food_item
+from nutrition_coach_agent.meal_plan_index import DAYS, MEAL_SLOTS, MealPlanIndex
+
+MASS_UNITS_G = {
+    "g": 1, "gram": 1, "grams": 1, "kg": 1000,
+    "oz": 28.35, "ounce": 28.35, "ounces": 28.35, "lb": 453.6, "lbs": 453.6
+}
+VOLUME_UNITS_ML = {
+    "ml": 1, "l": 1000, "liter": 1000, "litre": 1000,
+    "cup": 240, "cups": 240, "glass": 240, "glasses": 240,
+    "tbsp": 15, "tablespoon": 15, "tablespoons": 15, "tsp": 5, "teaspoon": 5, "teaspoons": 5
+}
+COUNT_UNITS = {None, "piece", "pieces", "slice", "slices"}
+CUP_ML = 240
+
+# Foods whose cup weighs this many grams per ml are listed by volume
+LIQUID_DENSITY = (0.85, 1.1)
+
+CATEGORY_ORDER = (
+    "Vegetables", "Fruit", "Meat & Fish", "Dairy & Eggs", "Legumes & Plant Protein",
+    "Grains & Bread", "Nuts, Seeds & Oils", "Pantry", "Frozen & Prepared", "Other"
+)
+
+
+def _measure(quantity: Optional[float], unit: Optional[str]) -> tuple:
+    """Split a parsed quantity into ``(dimension, amount)``, dimension one of g, ml, pieces, servings."""
+    if quantity is None:
+        return "servings", 1.0
+    if unit in MASS_UNITS_G:
+        return "g", quantity * MASS_UNITS_G[unit]
+    if unit in VOLUME_UNITS_ML:
+        return "ml", quantity * VOLUME_UNITS_ML[unit]
+    if unit in COUNT_UNITS:
+        return "pieces", quantity
+    return "servings", quantity
+
+
+def _is_liquid(item: FoodItem) -> bool:
+    return item.cup_g is not None and LIQUID_DENSITY[0] <= item.cup_g / CUP_ML <= LIQUID_DENSITY[1]
+
+
+def _to_grams(item: FoodItem, amounts: Dict[str, float]) -> float:
+    grams = amounts.get("g", 0.0)
+    if amounts.get("ml"):
+        grams += item.grams_for(amounts["ml"] / CUP_ML, "cup")
+    if amounts.get("pieces"):
+        grams += item.grams_for(amounts["pieces"], "piece")
+    if amounts.get("servings"):
+        grams += item.grams_for(amounts["servings"], "serving")
+    return grams
+
+
+def _resolve(item: FoodItem, amounts: Dict[str, float]) -> tuple:
+    """Pick the single unit a known food is listed in; returns ``(unit, amount)``."""
+    if set(amounts) == {"pieces"} and item.piece_g:
+        return "pieces", amounts["pieces"]
+    grams = _to_grams(item, amounts)
+    if _is_liquid(item) and "g" not in amounts:
+        return "ml", grams / (item.cup_g / CUP_ML)
+    return "g", grams
+
+
+def format_amount(amount: float, unit: str) -> str:
+    """Human-readable amount, e.g. "1.25 kg", "500 ml", "6 pieces"."""
+    if unit in ("pieces", "servings"):
+        count = math.ceil(amount - 1e-9)
+        return f"{count} {unit if count != 1 else unit[:-1]}"
+    large, factor = ("kg", 1000) if unit == "g" else ("l", 1000)
+    if amount >= factor:
+        return f"{round(amount / factor, 2):g} {large}"
+    return f"{round(amount):g} {unit}"
+
+
+def build_shopping_list(index: MealPlanIndex, days: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Aggregate the foods of the planned meals into a categorized shopping list.
+
+    Args:
+        index: The saved meal plan's index
+        days: Days to shop for (defaults to every planned day)
+
+    Returns:
+        Dictionary with ``days``, ``item_count``, ``categories`` (category ->
+        items with ``item``, ``amount``, ``unit``, ``display`` and ``meals``)
+        and ``unmatched`` (the plan's original text of every food without a
+        food database match; these are listed under Other as written)
+    """
+    selected = [day for day in DAYS if day in index.meals and (days is None or day in days)]
+    amounts: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    items: Dict[str, Optional[FoodItem]] = {}
+    labels: Dict[str, str] = {}
+    meals: Dict[str, int] = defaultdict(int)
+    unmatched: Dict[str, None] = {}
+
+    for day in selected:
+        for slot in MEAL_SLOTS:
+            for meal in index.meals[day][slot]:
+                for text in meal["foods"]:
+                    if not text:
+                        continue
+                    name, quantity, unit = parse_food_item(text)
+                    item = food_database.lookup(name) if name else None
+                    key = item.name if item is not None else normalize_name(name or text)
+                    if not key:
+                        continue
+                    items[key] = item
+                    if item is None:
+                        labels.setdefault(key, name or text.strip())
+                        unmatched.setdefault(text.strip())
+                    dimension, amount = _measure(quantity, unit)
+                    amounts[key][dimension] += amount
+                    meals[key] += 1
+
+    categories: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for key in sorted(amounts):
+        item = items[key]
+        if item is None:
+            # Unknown foods cannot be converted between units; list each unit used
+            lines = list(amounts[key].items())
+            category = "Other"
+        else:
+            lines = [_resolve(item, amounts[key])]
+            category = item.category
+        for unit, amount in lines:
+            amount = math.ceil(amount - 1e-9) if unit in ("pieces", "servings") else round(amount)
+            categories[category].append({
+                "item": labels.get(key, key),
+                "amount": amount,
+                "unit": unit,
+                "display": format_amount(amount, unit),
+                "meals": meals[key]
+            })
+
+    return {
+        "days": selected,
+        "item_count": len(amounts),
+        "categories": {category: categories[category] for category in CATEGORY_ORDER if category in categories},
+        "unmatched": sorted(unmatched)
+    }
@@ -0,0 +1,312 @@
+"""Pluggable durable storage backends for SessionMemory."""
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Log kinds persisted by the backends, matching the SessionMemory log lists
+LOG_KINDS = ("workout", "meal", "hydration")
+
+# Queue marker that makes the flusher retry failed writes without new ones
+_RETRY = object()
+
+
+class StorageBackend:
+    """Durable store behind SessionMemory.
+
+    SessionMemory keeps the working set in memory and reports every change
+    here; the backend only has to persist changes and replay a user's state
+    when their memory is (re)created. The base class persists nothing.
+    """
+
+    # Whether a user's state can be rebuilt with ``load_user`` after their memory is dropped
+    durable = False
+
+    def save_profile(self, user_id: str, profile: Dict[str, Any]) -> None:
+        """Persist a user's profile, replacing any previous one."""
+
+    def append_log(self, user_id: str, kind: str, timestamp: datetime, entry: Dict[str, Any]) -> None:
+        """Persist one workout, meal or hydration log entry."""
+
+    def append_logs(self, user_id: str, logs: List[Tuple[str, datetime, Dict[str, Any]]]) -> None:
+        """Persist several ``(kind, timestamp, entry)`` log entries together."""
+        for kind, timestamp, entry in logs:
+            self.append_log(user_id, kind, timestamp, entry)
+
+    def save_meal_plan(self, user_id: str, meal_plan: Dict[str, Any]) -> None:
+        """Persist a user's meal plan, replacing any previous one."""
+
+    def load_user(self, user_id: str) -> Dict[str, Any]:
+        """Return everything stored for a user.
+
+        Returns:
+            Dictionary with ``profile``, ``meal_plan`` and ``logs``, where
+            ``logs`` is a chronological list of ``(kind, timestamp, entry)``.
+        """
+        return {"profile": None, "meal_plan": None, "logs": []}
+
+    def logs_between(self, user_id: str, kind: str, start: date, end: date) -> List[Dict[str, Any]]:
+        """Return a user's entries of one kind from ``start`` (inclusive) to ``end`` (exclusive)."""
+        return []
+
+    def flush(self, user_id: Optional[str] = None) -> None:
+        """Block until every accepted write (of ``user_id``, or of everyone) is durable."""
+
+    def close(self) -> None:
+        """Flush pending writes and release resources."""
+
+
+class SQLiteBackend(StorageBackend):
+    """SQLite storage in WAL mode with batched write-behind commits.
+
+    Writes are queued and committed by a background flusher thread, which
+    groups up to ``batch_size`` queued writes into a single transaction. A
+    partial batch is committed once no new write arrives within
+    ``flush_interval`` seconds. Reads go through their own connection and
+    flush pending writes first, so a user always reads their own writes.
+
+    A batch that fails is retried ``write_retries`` times with backoff, then
+    committed write by write. Writes that still fail are kept and retried
+    with later batches instead of being dropped; their error is logged and
+    kept per user in ``errors``, and only that user's reads and flushes
+    raise it.
+    """
+
+    durable = True
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS profiles (
+            user_id TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meal_plans (
+            user_id TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            day TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS logs_user_day ON logs (user_id, day);
+    """
+
+    _UPSERT_PROFILE = "INSERT OR REPLACE INTO profiles (user_id, data) VALUES (?, ?)"
+    _UPSERT_MEAL_PLAN = "INSERT OR REPLACE INTO meal_plans (user_id, data) VALUES (?, ?)"
+    _INSERT_LOG = "INSERT INTO logs (user_id, kind, day, timestamp, data) VALUES (?, ?, ?, ?, ?)"
+
+    def __init__(self, path: str, batch_size: int = 256, flush_interval: float = 0.05, write_retries: int = 3):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.write_retries = write_retries
+        self.batches_committed = 0
+        # Latest write error of each user who still has failed writes
+        self.errors: Dict[str, BaseException] = {}
+
+        # Writes that failed, retried before each new batch (flusher thread only)
+        self._failed: List[Tuple[str, Any, bool]] = []
+        self._errors_lock = threading.Lock()
+
+        self._queue: "queue.Queue[Optional[Tuple[str, tuple]]]" = queue.Queue()
+        self._local = threading.local()
+        self._closed = False
+
+        with self._connect() as conn:
+            conn.executescript(self._SCHEMA)
+
+        self._flusher = threading.Thread(target=self._run_flusher, name="sqlite-flusher", daemon=True)
+        self._flusher.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        """Return this thread's read connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _enqueue(self, sql: str, params: Any, many: bool = False) -> None:
+        if self._closed:
+            raise RuntimeError("SQLiteBackend is closed")
+        self._queue.put((sql, params, many))
+
+    @staticmethod
+    def _users(item: Tuple[str, Any, bool]) -> Set[str]:
+        _, params, many = item
+        return {row[0] for row in params} if many else {params[0]}
+
+    @staticmethod
+    def _commit(conn: sqlite3.Connection, items: List[Tuple[str, Any, bool]]) -> None:
+        with conn:
+            for sql, params, many in items:
+                if many:
+                    conn.executemany(sql, params)
+                else:
+                    conn.execute(sql, params)
+
+    def _write(self, conn: sqlite3.Connection, items: List[Tuple[str, Any, bool]]) -> None:
+        """Commit ``items``, keeping the ones that cannot be written in ``_failed``."""
+        for attempt in range(self.write_retries + 1):
+            try:
+                self._commit(conn, items)
+            except sqlite3.Error:
+                if attempt < self.write_retries:
+                    time.sleep(self.flush_interval * 2 ** attempt)
+                continue
+            self.batches_committed += 1
+            self._resolved(items)
+            return
+
+        # Commit write by write, so one bad write does not hold back the rest
+        for item in items:
+            try:
+                self._commit(conn, [item])
+            except sqlite3.Error as e:
+                self._failed.append(item)
+                with self._errors_lock:
+                    for user_id in self._users(item):
+                        self.errors[user_id] = e
+                logger.error("SQLite write for %s failed, will retry: %s", ", ".join(sorted(self._users(item))), e)
+            else:
+                self._resolved([item])
+
+    def _resolved(self, items: List[Tuple[str, Any, bool]]) -> None:
+        """Clear the errors of users who no longer have failed writes."""
+        if not self.errors:
+            return
+        still_failing = set().union(*(self._users(item) for item in self._failed))
+        with self._errors_lock:
+            for item in items:
+                for user_id in self._users(item) - still_failing:
+                    self.errors.pop(user_id, None)
+
+    def _run_flusher(self) -> None:
+        conn = self._connect()
+        try:
+            stop = False
+            while not stop:
+                taken = [self._queue.get()]
+                while taken[-1] is not None and len(taken) < self.batch_size:
+                    try:
+                        taken.append(self._queue.get(timeout=self.flush_interval))
+                    except queue.Empty:
+                        break
+                stop = taken[-1] is None
+                batch = [item for item in taken if item is not None and item is not _RETRY]
+                try:
+                    if self._failed:
+                        failed, self._failed = self._failed, []
+                        self._write(conn, failed)
+                    if batch:
+                        self._write(conn, batch)
+                finally:
+                    for _ in taken:
+                        self._queue.task_done()
+            if self._failed:
+                logger.error("SQLite backend closed with %d writes it could not commit", len(self._failed))
+        finally:
+            conn.close()
+
+    def save_profile(self, user_id: str, profile: Dict[str, Any]) -> None:
+        self._enqueue(self._UPSERT_PROFILE, (user_id, json.dumps(profile)))
+
+    def append_log(self, user_id: str, kind: str, timestamp: datetime, entry: Dict[str, Any]) -> None:
+        if kind not in LOG_KINDS:
+            raise ValueError(f"Unknown log kind: {kind}")
+        self._enqueue(
+            self._INSERT_LOG,
+            (user_id, kind, timestamp.date().isoformat(), timestamp.isoformat(), json.dumps(entry))
+        )
+
+    def append_logs(self, user_id: str, logs: List[Tuple[str, datetime, Dict[str, Any]]]) -> None:
+        # One queue item, so the entries are committed in the same transaction
+        rows = []
+        for kind, timestamp, entry in logs:
+            if kind not in LOG_KINDS:
+                raise ValueError(f"Unknown log kind: {kind}")
+            rows.append((user_id, kind, timestamp.date().isoformat(), timestamp.isoformat(), json.dumps(entry)))
+        if rows:
+            self._enqueue(self._INSERT_LOG, rows, many=True)
+
+    def save_meal_plan(self, user_id: str, meal_plan: Dict[str, Any]) -> None:
+        self._enqueue(self._UPSERT_MEAL_PLAN, (user_id, json.dumps(meal_plan)))
+
+    def load_user(self, user_id: str) -> Dict[str, Any]:
+        self.flush(user_id)
+        conn = self._reader()
+        profile = conn.execute("SELECT data FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+        meal_plan = conn.execute("SELECT data FROM meal_plans WHERE user_id = ?", (user_id,)).fetchone()
+        rows = conn.execute(
+            "SELECT kind, timestamp, data FROM logs WHERE user_id = ? ORDER BY day, id",
+            (user_id,)
+        )
+        return {
+            "profile": json.loads(profile[0]) if profile else None,
+            "meal_plan": json.loads(meal_plan[0]) if meal_plan else None,
+            "logs": [
+                (kind, datetime.fromisoformat(timestamp), json.loads(data))
+                for kind, timestamp, data in rows
+            ]
+        }
+
+    def logs_between(self, user_id: str, kind: str, start: date, end: date) -> List[Dict[str, Any]]:
+        self.flush(user_id)
+        rows = self._reader().execute(
+            "SELECT data FROM logs WHERE user_id = ? AND day >= ? AND day < ? AND kind = ? ORDER BY day, id",
+            (user_id, start.isoformat(), end.isoformat(), kind)
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    def flush(self, user_id: Optional[str] = None) -> None:
+        if self.errors and not self._closed:
+            # Give failed writes another try before reporting them
+            self._queue.put(_RETRY)
+        self._queue.join()
+        with self._errors_lock:
+            if user_id is not None:
+                error = self.errors.get(user_id)
+            else:
+                error = next(iter(self.errors.values()), None)
+        if error is not None:
+            raise RuntimeError(f"SQLite write-behind flush failed: {error}") from error
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._flusher.join()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+
+
+def create_backend(kind: str, **options: Any) -> StorageBackend:
+    """Create a storage backend by name ("memory" or "sqlite").
+
+    ``options`` are passed to the backend constructor; the "memory" backend
+    persists nothing and ignores them.
+    """
+    if kind == "memory":
+        return StorageBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(**options)
+    raise ValueError(f"Unknown storage backend: {kind}")
@@ -0,0 +1,126 @@
+"""Deterministic daily targets: BMR/TDEE, calories, macros and hydration.
+
+These used to be worked out by the model from the instructions; computing
+them here is exact, free and instant. ``compute_targets`` handles one
+profile, ``compute_targets_batch`` recomputes many at once with NumPy.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from nutrition_coach_agent.config import (
+    ACTIVITY_MULTIPLIERS,
+    GOAL_CALORIE_ADJUSTMENTS,
+    HYDRATION_BASE,
+    HYDRATION_BY_ACTIVITY,
+    KCAL_PER_GRAM,
+    MACRO_TARGETS
+)
+
+# Mifflin-St Jeor sex constant; the midpoint is used when sex is unknown
+SEX_OFFSETS = {"male": 5, "female": -161}
+UNKNOWN_SEX_OFFSET = -78
+
+DEFAULT_ACTIVITY = "moderate"
+DEFAULT_GOAL = "maintenance"
+
+
+def targets_key(profile: Dict[str, Any]) -> Tuple:
+    """Return the profile fields the targets depend on, for cache invalidation."""
+    return (
+        profile.get("weight_kg"),
+        profile.get("height_cm"),
+        profile.get("age"),
+        profile.get("sex"),
+        profile.get("activity_level"),
+        profile.get("fitness_goal"),
+        profile.get("daily_calories")
+    )
+
+
+def _sex_offset(sex: Optional[str]) -> int:
+    return SEX_OFFSETS.get((sex or "").strip().lower(), UNKNOWN_SEX_OFFSET)
+
+
+def calculate_bmr(weight_kg: float, height_cm: float, age: int, sex: Optional[str] = None) -> float:
+    """Basal metabolic rate in kcal/day (Mifflin-St Jeor)."""
+    return 10 * weight_kg + 6.25 * height_cm - 5 * age + _sex_offset(sex)
+
+
+def compute_targets(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compute daily targets for a user profile.
+
+    An explicit ``daily_calories`` in the profile overrides the computed
+    calorie target; macros are then split from whichever target applies.
+
+    Returns:
+        Dictionary with bmr, tdee, calories, protein_g, carbs_g, fats_g
+        and water_ml.
+    """
+    activity = profile.get("activity_level") if profile.get("activity_level") in ACTIVITY_MULTIPLIERS else DEFAULT_ACTIVITY
+    goal = profile.get("fitness_goal") if profile.get("fitness_goal") in MACRO_TARGETS else DEFAULT_GOAL
+    weight = profile.get("weight_kg") or 0
+
+    bmr = calculate_bmr(weight, profile.get("height_cm") or 0, profile.get("age") or 0, profile.get("sex"))
+    tdee = bmr * ACTIVITY_MULTIPLIERS[activity]
+    calories = profile.get("daily_calories") or tdee + GOAL_CALORIE_ADJUSTMENTS[goal]
+
+    split = MACRO_TARGETS[goal]
+    return {
+        "bmr": round(bmr),
+        "tdee": round(tdee),
+        "calories": round(calories),
+        "protein_g": round(calories * split["protein"] / KCAL_PER_GRAM["protein"]),
+        "carbs_g": round(calories * split["carbs"] / KCAL_PER_GRAM["carbs"]),
+        "fats_g": round(calories * split["fats"] / KCAL_PER_GRAM["fats"]),
+        "water_ml": round(weight * HYDRATION_BY_ACTIVITY.get(activity, HYDRATION_BASE)),
+        "fitness_goal": goal,
+        "activity_level": activity
+    }
+
+
+def compute_targets_batch(profiles: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Vectorized ``compute_targets`` for many profiles at once. Requires NumPy.
+
+    Returns:
+        Dictionary of NumPy arrays (bmr, tdee, calories, protein_g, carbs_g,
+        fats_g, water_ml), one element per profile, in input order.
+    """
+    # Imported here so single-profile callers never pay NumPy's import time
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("compute_targets_batch requires numpy (pip install numpy)") from None
+
+    activities = [p.get("activity_level") if p.get("activity_level") in ACTIVITY_MULTIPLIERS else DEFAULT_ACTIVITY
+                  for p in profiles]
+    goals = [p.get("fitness_goal") if p.get("fitness_goal") in MACRO_TARGETS else DEFAULT_GOAL
+             for p in profiles]
+
+    weight = np.array([p.get("weight_kg") or 0 for p in profiles], dtype=float)
+    height = np.array([p.get("height_cm") or 0 for p in profiles], dtype=float)
+    age = np.array([p.get("age") or 0 for p in profiles], dtype=float)
+    sex_offset = np.array([_sex_offset(p.get("sex")) for p in profiles], dtype=float)
+    multiplier = np.array([ACTIVITY_MULTIPLIERS[a] for a in activities])
+    adjustment = np.array([GOAL_CALORIE_ADJUSTMENTS[g] for g in goals], dtype=float)
+    hydration = np.array([HYDRATION_BY_ACTIVITY.get(a, HYDRATION_BASE) for a in activities], dtype=float)
+    override = np.array([p.get("daily_calories") or 0 for p in profiles], dtype=float)
+    split = {
+        macro: np.array([MACRO_TARGETS[g][macro] for g in goals])
+        for macro in ("protein", "carbs", "fats")
+    }
+
+    bmr = 10 * weight + 6.25 * height - 5 * age + sex_offset
+    tdee = bmr * multiplier
+    calories = np.where(override > 0, override, tdee + adjustment)
+
+    return {
+        "bmr": np.rint(bmr),
+        "tdee": np.rint(tdee),
+        "calories": np.rint(calories),
+        "protein_g": np.rint(calories * split["protein"] / KCAL_PER_GRAM["protein"]),
+        "carbs_g": np.rint(calories * split["carbs"] / KCAL_PER_GRAM["carbs"]),
+        "fats_g": np.rint(calories * split["fats"] / KCAL_PER_GRAM["fats"]),
+        "water_ml": np.rint(weight * hydration)
+    }
@@ -1,83 +1,329 @@
 """Custom tools for the Health & Nutrition Coach Agent."""
 
-from typing import Dict, Any, Optional
-from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from datetime import date, datetime, time
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+import atexit
 import json
 
+from nutrition_coach_agent.config import (
+    MEAL_PLAN_CACHE_BUCKET_KCAL,
+    MEAL_PLAN_CACHE_MAX_ADAPT_KCAL,
+    MEAL_PLAN_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_MEMORY_ENTRIES,
+    SEARCH_CACHE_PATH,
+    SEARCH_CACHE_TTL_SECONDS,
+    SEARCH_MODEL,
+    SESSION_STORE_MAX_USERS,
+    SESSION_STORE_STRIPES,
+    SQLITE_BATCH_SIZE,
+    SQLITE_FLUSH_INTERVAL,
+    SQLITE_PATH,
+    SQLITE_WRITE_RETRIES,
+    STORAGE_BACKEND,
+    SUMMARY_MAX_PAGE_SIZE,
+    SUMMARY_PAGE_SIZE
+)
+from nutrition_coach_agent.analytics import ProgressAnalytics
+from nutrition_coach_agent.food_db import food_database
+from nutrition_coach_agent.meal_plan_index import DAYS, MEAL_SLOTS, MealPlanIndex, resolve_day, slot_name
+from nutrition_coach_agent.plan_cache import MealPlanCache, profile_signature
+from nutrition_coach_agent.records import HydrationRecord, MealRecord, WorkoutRecord
+from nutrition_coach_agent.search_cache import CachedSearch, GoogleSearchBackend, SearchCache
+from nutrition_coach_agent.serialization import dumps
+from nutrition_coach_agent.session_store import SessionStore
+from nutrition_coach_agent.shopping_list import build_shopping_list
+from nutrition_coach_agent.storage import StorageBackend, create_backend
+from nutrition_coach_agent.targets import compute_targets as calculate_targets, targets_key
 
-class SessionMemory:
-    """In-memory storage for user session data."""
+if TYPE_CHECKING:
+    from google.adk.plugins.base_plugin import BasePlugin
+    from google.adk.tools import ToolContext
+
+
+class DailyLogIndex:
+    """Log entries bucketed by calendar day, with a sorted index of days.
+
+    Lookups for a single day are a dict hit and ``[start, end)`` range
+    queries only visit the buckets inside the range, so neither gets slower
+    as older history accumulates.
+    """
 
     def __init__(self):
+        self._buckets: Dict[date, list] = {}
+        self._days: List[date] = []
+
+    def add(self, day: date, entry: Any) -> None:
+        """Append an entry to the bucket for ``day``."""
+        bucket = self._buckets.get(day)
+        if bucket is None:
+            bucket = self._buckets[day] = []
+            # Entries almost always arrive in chronological order, so the
+            # common case is a plain append rather than an insort.
+            if not self._days or self._days[-1] < day:
+                self._days.append(day)
+            else:
+                insort(self._days, day)
+        bucket.append(entry)
+
+    def on(self, day: date) -> list:
+        """Return the entries logged on ``day``."""
+        return self._buckets.get(day, [])
+
+    def between(self, start: date, end: date) -> list:
+        """Return the entries logged from ``start`` (inclusive) to ``end`` (exclusive)."""
+        lo = bisect_left(self._days, start)
+        hi = bisect_left(self._days, end, lo)
+        entries = []
+        for day in self._days[lo:hi]:
+            entries.extend(self._buckets[day])
+        return entries
+
+    def days(self) -> List[date]:
+        """Return the days that have at least one entry, oldest first."""
+        return list(self._days)
+
+
+def _merge_by_time(sources: List[list], offsets: List[int], limit: int) -> Tuple[list, List[int]]:
+    """Take up to ``limit`` records from ``sources`` in timestamp order, starting at ``offsets``.
+
+    Returns:
+        Tuple of (records, offsets just past the records taken)
+    """
+    offsets = list(offsets)
+    records = []
+    while len(records) < limit:
+        heads = [(source[i].ts, n) for n, (source, i) in enumerate(zip(sources, offsets)) if i < len(source)]
+        if not heads:
+            break
+        _, n = min(heads)
+        records.append(sources[n][offsets[n]])
+        offsets[n] += 1
+    return records, offsets
+
+
+class SessionMemory:
+    """In-memory storage for user session data.
+
+    Log lists hold compact records (see ``records.py``); the dict shape is
+    produced on demand by the summary methods.
+
+    When created with a ``user_id`` and a storage ``backend``, the user's
+    existing data is loaded from the backend and every change is persisted
+    to it; the in-memory state remains the source for all reads.
+    """
+
+    def __init__(self, user_id: Optional[str] = None, backend: Optional[StorageBackend] = None):
+        self.user_id = user_id
         self.user_profile: Optional[Dict[str, Any]] = None
         self.workout_logs: list = []
         self.meal_logs: list = []
         self.hydration_logs: list = []
         self.meal_plan: Optional[Dict[str, Any]] = None
 
+        # Day x meal-slot index over meal_plan["plan"], rebuilt whenever it is saved
+        self.meal_plan_index: Optional[MealPlanIndex] = None
+
+        # Per-day indexes over the log lists above
+        self._workout_index = DailyLogIndex()
+        self._meal_index = DailyLogIndex()
+        self._hydration_index = DailyLogIndex()
+
+        # Running per-day totals, updated as each entry is logged
+        self._daily_totals: Dict[date, Dict[str, Any]] = {}
+
+        # Rolling trends, streaks and adherence over the running totals, updated on every log
+        self.analytics = ProgressAnalytics(self._daily_totals)
+
+        # Profile fields the memoized profile["targets"] were computed from
+        self._targets_key: Optional[tuple] = None
+
+        # Positions in the (workout, meal, hydration) log lists already returned by get_log_delta
+        self._delta_offsets: Optional[List[int]] = None
+
+        self._backend = backend if user_id is not None else None
+        if self._backend is not None:
+            self._load()
+
+    def _load(self) -> None:
+        """Rebuild in-memory state from the storage backend."""
+        stored = self._backend.load_user(self.user_id)
+        self.user_profile = stored["profile"]
+        if self.user_profile is not None and "targets" in self.user_profile:
+            self._targets_key = targets_key(self.user_profile)
+        self.analytics.set_targets(self.get_targets())
+        self.meal_plan = stored["meal_plan"]
+        if self.meal_plan is not None:
+            self.meal_plan_index = MealPlanIndex(self.meal_plan.get("plan"))
+        record = {
+            "workout": (WorkoutRecord, self._record_workout),
+            "meal": (MealRecord, self._record_meal),
+            "hydration": (HydrationRecord, self._record_hydration)
+        }
+        for kind, timestamp, entry in stored["logs"]:
+            record_cls, record_func = record[kind]
+            record_func(record_cls.from_dict(entry), timestamp.date())
+
+    @staticmethod
+    def _empty_totals() -> Dict[str, Any]:
+        """Return zeroed running totals for a day with nothing logged."""
+        return {
+            "water_ml": 0,
+            "calories": 0,
+            "protein_g": 0.0,
+            "carbs_g": 0.0,
+            "fats_g": 0.0,
+            "meals": 0,
+            "workouts": 0,
+            "workout_minutes": {}
+        }
+
+    def _totals_for(self, day: date) -> Dict[str, Any]:
+        """Return the mutable running totals for ``day``, creating them if needed."""
+        totals = self._daily_totals.get(day)
+        if totals is None:
+            totals = self._daily_totals[day] = self._empty_totals()
+        return totals
+
+    def _record_workout(self, record: WorkoutRecord, day: date) -> None:
+        self.workout_logs.append(record)
+        self._workout_index.add(day, record)
+
+        totals = self._totals_for(day)
+        previous = self.analytics.snapshot(day)
+        intensity = record.intensity or "unspecified"
+        totals["workouts"] += 1
+        totals["workout_minutes"][intensity] = totals["workout_minutes"].get(intensity, 0) + (record.duration or 0)
+        self.analytics.update(day, previous)
+
+    def _record_meal(self, record: MealRecord, day: date) -> None:
+        self.meal_logs.append(record)
+        self._meal_index.add(day, record)
+
+        totals = self._totals_for(day)
+        previous = self.analytics.snapshot(day)
+        totals["meals"] += 1
+        totals["calories"] += record.calories or 0
+        totals["protein_g"] += record.protein or 0
+        totals["carbs_g"] += record.carbs or 0
+        totals["fats_g"] += record.fats or 0
+        self.analytics.update(day, previous)
+
+    def _record_hydration(self, record: HydrationRecord, day: date) -> None:
+        self.hydration_logs.append(record)
+        self._hydration_index.add(day, record)
+        totals = self._totals_for(day)
+        previous = self.analytics.snapshot(day)
+        totals["water_ml"] += record.amount_ml
+        self.analytics.update(day, previous)
+
     def set_user_profile(self, profile: Dict[str, Any]) -> str:
-        """Store user profile information."""
+        """Store user profile information and its daily targets."""
+        key = targets_key(profile)
+        previous = self.user_profile or {}
+        if key == self._targets_key and "targets" in previous:
+            profile["targets"] = previous["targets"]
+        else:
+            profile["targets"] = calculate_targets(profile)
+            self._targets_key = key
+
         self.user_profile = profile
+        self.analytics.set_targets(profile["targets"])
+        if self._backend is not None:
+            self._backend.save_profile(self.user_id, profile)
         return f"User profile saved: {profile.get('name', 'User')}"
 
-    def log_workout(self, workout_data: Dict[str, Any]) -> str:
+    def get_targets(self) -> Optional[Dict[str, Any]]:
+        """Get the daily targets for the stored profile, if there is one."""
+        if self.user_profile is None:
+            return None
+        if targets_key(self.user_profile) != self._targets_key or "targets" not in self.user_profile:
+            self.user_profile["targets"] = calculate_targets(self.user_profile)
+            self._targets_key = targets_key(self.user_profile)
+            self.analytics.set_targets(self.user_profile["targets"])
+        return self.user_profile["targets"]
+
+    def log_workout(self, workout_data: Dict[str, Any], timestamp: Optional[datetime] = None) -> str:
         """Log a workout session."""
-        workout_entry = {
-            "timestamp": datetime.now().isoformat(),
-            "data": workout_data
-        }
-        self.workout_logs.append(workout_entry)
+        timestamp = timestamp or datetime.now()
+        record = WorkoutRecord.from_data(workout_data, timestamp.timestamp())
+        self._record_workout(record, timestamp.date())
+        if self._backend is not None:
+            self._backend.append_log(self.user_id, "workout", timestamp, record.to_dict())
         return f"Workout logged: {workout_data.get('type', 'Unknown')} - {workout_data.get('duration', 0)} minutes"
 
-    def log_meal(self, meal_data: Dict[str, Any]) -> str:
+    def log_meal(self, meal_data: Dict[str, Any], timestamp: Optional[datetime] = None) -> str:
         """Log a meal."""
-        meal_entry = {
-            "timestamp": datetime.now().isoformat(),
-            "data": meal_data
-        }
-        self.meal_logs.append(meal_entry)
+        timestamp = timestamp or datetime.now()
+        record = MealRecord.from_data(meal_data, timestamp.timestamp())
+        self._record_meal(record, timestamp.date())
+        if self._backend is not None:
+            self._backend.append_log(self.user_id, "meal", timestamp, record.to_dict())
         return f"Meal logged: {meal_data.get('name', 'Unknown meal')}"
 
-    def log_hydration(self, water_ml: int) -> str:
+    def log_hydration(self, water_ml: int, timestamp: Optional[datetime] = None) -> str:
         """Log water intake."""
-        hydration_entry = {
-            "timestamp": datetime.now().isoformat(),
-            "amount_ml": water_ml
-        }
-        self.hydration_logs.append(hydration_entry)
-
-        # Calculate daily total
-        today = datetime.now().date()
-        daily_total = sum(
-            entry["amount_ml"]
-            for entry in self.hydration_logs
-            if datetime.fromisoformat(entry["timestamp"]).date() == today
-        )
+        timestamp = timestamp or datetime.now()
+        record = HydrationRecord(timestamp.timestamp(), water_ml)
+        self._record_hydration(record, timestamp.date())
+        if self._backend is not None:
+            self._backend.append_log(self.user_id, "hydration", timestamp, record.to_dict())
 
+        daily_total = self._daily_totals[timestamp.date()]["water_ml"]
         return f"Logged {water_ml}ml of water. Today's total: {daily_total}ml"
 
-    def get_daily_summary(self) -> Dict[str, Any]:
-        """Get summary of today's activity."""
-        today = datetime.now().date()
+    def log_batch(
+            self,
+            workouts: Iterable[Dict[str, Any]] = (),
+            meals: Iterable[Dict[str, Any]] = (),
+            water_ml: Iterable[int] = (),
+            timestamp: Optional[datetime] = None
+    ) -> List[str]:
+        """Log many entries at once, persisted to the backend in a single operation.
+
+        Returns:
+            One confirmation line per entry, in the order given
+        """
+        timestamp = timestamp or datetime.now()
+        ts = timestamp.timestamp()
+        day = timestamp.date()
+        logged = []
+        confirmations = []
+        for workout_data in workouts:
+            record = WorkoutRecord.from_data(workout_data, ts)
+            self._record_workout(record, day)
+            logged.append(("workout", timestamp, record))
+            confirmations.append(
+                f"Workout logged: {workout_data.get('type', 'Unknown')} - {workout_data.get('duration', 0)} minutes"
+            )
+        for meal_data in meals:
+            record = MealRecord.from_data(meal_data, ts)
+            self._record_meal(record, day)
+            logged.append(("meal", timestamp, record))
+            confirmations.append(f"Meal logged: {meal_data.get('name', 'Unknown meal')}")
+        for amount in water_ml:
+            record = HydrationRecord(ts, amount)
+            self._record_hydration(record, day)
+            logged.append(("hydration", timestamp, record))
+            confirmations.append(f"Logged {amount}ml of water")
 
-        today_workouts = [
-            entry for entry in self.workout_logs
-            if datetime.fromisoformat(entry["timestamp"]).date() == today
-        ]
+        if self._backend is not None and logged:
+            self._backend.append_logs(
+                self.user_id, [(kind, when, record.to_dict()) for kind, when, record in logged]
+            )
+        return confirmations
 
-        today_meals = [
-            entry for entry in self.meal_logs
-            if datetime.fromisoformat(entry["timestamp"]).date() == today
-        ]
+    def get_daily_summary(self, day: Optional[date] = None) -> Dict[str, Any]:
+        """Get summary of one day's activity (today by default)."""
+        day = day or datetime.now().date()
 
-        today_hydration = sum(
-            entry["amount_ml"]
-            for entry in self.hydration_logs
-            if datetime.fromisoformat(entry["timestamp"]).date() == today
-        )
+        today_workouts = [record.to_dict() for record in self._workout_index.on(day)]
+        today_meals = [record.to_dict() for record in self._meal_index.on(day)]
+        today_hydration = self._daily_totals.get(day, {}).get("water_ml", 0)
 
         return {
-            "date": today.isoformat(),
+            "date": day.isoformat(),
             "workouts": len(today_workouts),
             "meals": len(today_meals),
             "hydration_ml": today_hydration,
@@ -85,14 +331,95 @@ class SessionMemory:
             "meal_details": today_meals
         }
 
+    def get_daily_entries(self, day: Optional[date] = None, offsets: Tuple[int, int] = (0, 0),
+                          limit: int = SUMMARY_PAGE_SIZE) -> Dict[str, Any]:
+        """
+        Get one page of a day's workouts and meals (today by default) in time order.
+
+        ``offsets`` are positions in the day's workout and meal buckets. Buckets
+        only grow at the end, so a page boundary stays valid while more entries
+        are logged.
+
+        Returns:
+            Dictionary with compact ``entries``, ``next_offsets`` (None on the
+            last page) and the day's ``total`` number of entries
+        """
+        day = day or datetime.now().date()
+        sources = [self._workout_index.on(day), self._meal_index.on(day)]
+        records, next_offsets = _merge_by_time(sources, list(offsets), limit)
+        more = any(i < len(source) for source, i in zip(sources, next_offsets))
+        return {
+            "entries": [record.to_compact() for record in records],
+            "next_offsets": tuple(next_offsets) if more else None,
+            "total": sum(len(source) for source in sources)
+        }
+
+    def get_log_delta(self, limit: int = SUMMARY_PAGE_SIZE) -> Dict[str, Any]:
+        """
+        Get up to ``limit`` entries logged since the previous call.
+
+        The first call starts from the beginning of today. Positions are kept
+        per user in the append-only log lists, so entries are never skipped
+        or repeated; ``has_more`` is set when the next call has more to return.
+        """
+        sources = [self.workout_logs, self.meal_logs, self.hydration_logs]
+        start_of_today = datetime.combine(datetime.now().date(), time.min).timestamp()
+        if self._delta_offsets is None:
+            self._delta_offsets = []
+            for logs in sources:
+                # Logs arrive (almost) in time order, so today's entries are at the end
+                i = len(logs)
+                while i > 0 and logs[i - 1].ts >= start_of_today:
+                    i -= 1
+                self._delta_offsets.append(i)
+
+        records, self._delta_offsets = _merge_by_time(sources, self._delta_offsets, limit)
+        return {
+            "entries": [record.to_compact(with_date=record.ts < start_of_today) for record in records],
+            "has_more": any(i < len(logs) for logs, i in zip(sources, self._delta_offsets))
+        }
+
+    def get_daily_totals(self, day: Optional[date] = None) -> Dict[str, Any]:
+        """Get running totals for one day (today by default) without scanning logs."""
+        day = day or datetime.now().date()
+        totals = self._daily_totals.get(day) or self._empty_totals()
+        return {
+            "date": day.isoformat(),
+            **totals,
+            "workout_minutes": dict(totals["workout_minutes"])
+        }
+
+    def get_logs_between(self, start: date, end: date) -> Dict[str, list]:
+        """Get all log entries from ``start`` (inclusive) to ``end`` (exclusive)."""
+        return {
+            "workouts": [record.to_dict() for record in self._workout_index.between(start, end)],
+            "meals": [record.to_dict() for record in self._meal_index.between(start, end)],
+            "hydration": [record.to_dict() for record in self._hydration_index.between(start, end)]
+        }
+
     def save_meal_plan(self, meal_plan: Dict[str, Any]) -> str:
         """Save weekly meal plan."""
         self.meal_plan = {
             "created_at": datetime.now().isoformat(),
             "plan": meal_plan
         }
+        self.meal_plan_index = MealPlanIndex(meal_plan)
+        if self._backend is not None:
+            self._backend.save_meal_plan(self.user_id, self.meal_plan)
         return "Weekly meal plan saved successfully"
 
+    def get_remaining_planned_meals(self, day: Optional[date] = None) -> Optional[Dict[str, Any]]:
+        """Get the meal plan's meals for one day (today by default) that have not been logged yet."""
+        if self.meal_plan_index is None:
+            return None
+        day = day or datetime.now().date()
+        logged_types = [record.type or "" for record in self._meal_index.on(day)]
+        return self.meal_plan_index.remaining(DAYS[day.weekday()], logged_types)
+
+    def get_trends(self, today: Optional[date] = None) -> Dict[str, Any]:
+        """Get rolling averages, adherence and streaks as of one day (today by default)."""
+        return self.analytics.trends(today or datetime.now().date())
+
     def get_user_stats(self) -> Dict[str, Any]:
         """Get comprehensive user statistics."""
         return {
@@ -104,9 +431,72 @@ class SessionMemory:
         }
 
 
-# Global session memory instance
+# Fallback session memory for tools called outside an ADK invocation
 session_memory = SessionMemory()
 
+# Durable storage shared by every user's session memory
+storage_backend = create_backend(
+    STORAGE_BACKEND,
+    path=SQLITE_PATH,
+    batch_size=SQLITE_BATCH_SIZE,
+    flush_interval=SQLITE_FLUSH_INTERVAL,
+    write_retries=SQLITE_WRITE_RETRIES
+)
+atexit.register(storage_backend.close)
+
+# Per-user session memory, keyed by the ADK user id. Users are only evicted
+# when the backend can reload them; otherwise eviction would erase their data.
+session_store = SessionStore(
+    lambda user_id: SessionMemory(user_id=user_id, backend=storage_backend),
+    num_stripes=SESSION_STORE_STRIPES,
+    max_users=SESSION_STORE_MAX_USERS if storage_backend.durable else None
+)
+
+
+# Web search shared by the sub-agents, cached in memory and on disk
+search_cache = SearchCache(
+    SEARCH_CACHE_PATH,
+    ttl_seconds=SEARCH_CACHE_TTL_SECONDS,
+    max_memory_entries=SEARCH_CACHE_MEMORY_ENTRIES
+)
+cached_search = CachedSearch(GoogleSearchBackend(SEARCH_MODEL), search_cache)
+atexit.register(search_cache.close)
+
+
+# Meal plans shared between users with the same profile signature
+meal_plan_cache = MealPlanCache(
+    max_entries=MEAL_PLAN_CACHE_MAX_ENTRIES,
+    max_adapt_kcal=MEAL_PLAN_CACHE_MAX_ADAPT_KCAL
+)
+
+
+@contextmanager
+def user_memory(tool_context: Optional["ToolContext"] = None) -> Iterator[SessionMemory]:
+    """Yield the SessionMemory of the user behind ``tool_context``.
+
+    Falls back to the module-level ``session_memory`` when called without a
+    tool context (scripts, tests). The user's shard lock is held for the
+    duration of the ``with`` block.
+    """
+    if tool_context is None:
+        yield session_memory
+        return
+    key = tool_context.user_id or tool_context.session.id
+    with session_store.lease(key) as memory:
+        yield memory
+
+
+def invocation_plugins(context: Any = None) -> List["BasePlugin"]:
+    """Return the plugins of the invocation behind a tool or invocation context.
+
+    Runners started from inside a tool or agent pass these on, so their
+    calls are recorded, replayed and traced like the caller's. Without a
+    real ADK context (scripts, tests) there are none.
+    """
+    invocation_context = getattr(context, "_invocation_context", context)
+    plugin_manager = getattr(invocation_context, "plugin_manager", None)
+    return list(plugin_manager.plugins) if plugin_manager is not None else []
+
 
 def save_user_profile(
         name: str,
@@ -117,7 +507,9 @@ def save_user_profile(
         activity_level: str,
         dietary_restrictions: str = "",
         allergies: str = "",
-        daily_calories: int = 0
+        daily_calories: int = 0,
+        sex: str = "",
+        tool_context=None
 ) -> str:
     """
     Save user profile information to session memory.
@@ -132,9 +524,10 @@ def save_user_profile(
         dietary_restrictions: Comma-separated list (e.g., "vegetarian, gluten-free")
         allergies: Comma-separated list of allergies
         daily_calories: Target daily calorie intake (if not provided, will be calculated)
+        sex: One of: male, female (used for the BMR calculation; optional)
 
     Returns:
-        Confirmation message
+        Confirmation message with the computed daily calorie, macro and hydration targets
     """
     profile = {
         "name": name,
@@ -145,10 +538,93 @@ def save_user_profile(
         "activity_level": activity_level,
         "dietary_restrictions": [r.strip() for r in dietary_restrictions.split(",")] if dietary_restrictions else [],
         "allergies": [a.strip() for a in allergies.split(",")] if allergies else [],
-        "daily_calories": daily_calories if daily_calories > 0 else None
+        "daily_calories": daily_calories if daily_calories > 0 else None,
+        "sex": sex.strip().lower() or None
     }
 
-    return session_memory.set_user_profile(profile)
+    with user_memory(tool_context) as memory:
+        result = memory.set_user_profile(profile)
+        targets = memory.get_targets()
+
+    return (
+        f"{result}. Daily targets: {targets['calories']} kcal "
+        f"(BMR {targets['bmr']}, TDEE {targets['tdee']}), "
+        f"protein {targets['protein_g']}g, carbs {targets['carbs_g']}g, fats {targets['fats_g']}g, "
+        f"water {targets['water_ml']}ml"
+    )
+
+
+def compute_targets(tool_context=None) -> str:
+    """
+    Get the user's daily targets computed from their saved profile.
+
+    Targets are calculated locally (Mifflin-St Jeor BMR, activity-based TDEE,
+    goal-based macro split and ml/kg hydration) and updated automatically
+    whenever the profile changes.
+
+    Returns:
+        JSON string with bmr, tdee, calories, protein_g, carbs_g, fats_g and water_ml
+    """
+    with user_memory(tool_context) as memory:
+        targets = memory.get_targets()
+    if targets is None:
+        return "Error: No user profile saved yet. Save the profile with save_user_profile first."
+    return json.dumps(targets)
+
+
+def _prepare_meal(
+        meal_name: str,
+        meal_type: str,
+        foods: Any,
+        estimated_calories: float = 0,
+        protein_g: float = 0.0,
+        carbs_g: float = 0.0,
+        fats_g: float = 0.0,
+        notes: str = ""
+) -> Tuple[Dict[str, Any], str]:
+    """Build a meal entry, filling missing calories/macros from the food database.
+
+    Returns:
+        Tuple of (meal data, note describing any estimated values)
+    """
+    if isinstance(foods, str):
+        foods = foods.split(",")
+    meal_data = {
+        "name": meal_name,
+        "type": meal_type,
+        "foods": [str(f).strip() for f in foods],
+        "calories": estimated_calories if estimated_calories > 0 else None,
+        "macros": {
+            "protein": protein_g if protein_g > 0 else None,
+            "carbs": carbs_g if carbs_g > 0 else None,
+            "fats": fats_g if fats_g > 0 else None
+        },
+        "notes": notes
+    }
+
+    estimate_note = ""
+    macros = meal_data["macros"]
+    if meal_data["calories"] is None or None in macros.values():
+        estimate = food_database.estimate_meal(meal_data["foods"])
+        if estimate["unresolved"]:
+            # Totals of the matched foods alone would understate the meal, so nothing is filled in
+            estimate_note = (
+                f" (not estimated, no food database match for: {', '.join(estimate['unresolved'])}; "
+                f"pass calories and macros to record them)"
+            )
+        elif estimate["items"]:
+            if meal_data["calories"] is None:
+                meal_data["calories"] = estimate["calories"]
+            for macro in ("protein", "carbs", "fats"):
+                if macros[macro] is None:
+                    macros[macro] = estimate[f"{macro}_g"]
+            matched = ", ".join(f"{item['food']} {item['grams']}g" for item in estimate["items"])
+            estimate_note = (
+                f" (estimated from food database as {matched}: {meal_data['calories']} kcal, "
+                f"protein {macros['protein']}g, carbs {macros['carbs']}g, fats {macros['fats']}g)"
+            )
+
+    return meal_data, estimate_note
 
 
 def log_workout(
@@ -156,7 +632,8 @@ def log_workout(
         duration_minutes: int,
         intensity: str,
         exercises: str = "",
-        notes: str = ""
+        notes: str = "",
+        tool_context=None
 ) -> str:
     """
     Log a workout session.
@@ -179,7 +656,8 @@ def log_workout(
         "notes": notes
     }
 
-    return session_memory.log_workout(workout_data)
+    with user_memory(tool_context) as memory:
+        return memory.log_workout(workout_data)
 
 
 def log_meal(
@@ -190,41 +668,52 @@ def log_meal(
         protein_g: float = 0.0,
         carbs_g: float = 0.0,
         fats_g: float = 0.0,
-        notes: str = ""
+        notes: str = "",
+        tool_context=None
 ) -> str:
     """
     Log a meal.
 
+    Calories and macros left at 0 are filled in from the local food database
+    when every food can be resolved, so there is no need to look them up first.
+    Foods without a confident match are named in the reply instead.
+
     Args:
         meal_name: Name or description of the meal
         meal_type: One of: breakfast, lunch, dinner, snack, pre_workout, post_workout
-        foods: Comma-separated list of foods consumed
-        estimated_calories: Estimated total calories
-        protein_g: Protein in grams
-        carbs_g: Carbohydrates in grams
-        fats_g: Fats in grams
+        foods: Comma-separated list of foods consumed, with amounts where known (e.g., "chicken breast 150g, rice 1 cup")
+        estimated_calories: Estimated total calories (0 to estimate from foods)
+        protein_g: Protein in grams (0 to estimate from foods)
+        carbs_g: Carbohydrates in grams (0 to estimate from foods)
+        fats_g: Fats in grams (0 to estimate from foods)
         notes: Additional notes
 
     Returns:
-        Confirmation message
+        Confirmation message, including any values estimated from the food database
     """
-    meal_data = {
-        "name": meal_name,
-        "type": meal_type,
-        "foods": [f.strip() for f in foods.split(",")],
-        "calories": estimated_calories if estimated_calories > 0 else None,
-        "macros": {
-            "protein": protein_g if protein_g > 0 else None,
-            "carbs": carbs_g if carbs_g > 0 else None,
-            "fats": fats_g if fats_g > 0 else None
-        },
-        "notes": notes
-    }
+    meal_data, estimate_note = _prepare_meal(
+        meal_name, meal_type, foods, estimated_calories, protein_g, carbs_g, fats_g, notes
+    )
+
+    with user_memory(tool_context) as memory:
+        return memory.log_meal(meal_data) + estimate_note
 
-    return session_memory.log_meal(meal_data)
 
+def estimate_food_nutrition(foods: str) -> str:
+    """
+    Estimate calories and macros for foods using the local food database.
+
+    Args:
+        foods: Comma-separated list of foods with amounts (e.g., "2 eggs, oats 40g, 1 banana")
 
-def log_water_intake(amount_ml: int) -> str:
+    Returns:
+        JSON string with total calories/macros, per-item estimates and any foods not found
+    """
+    estimate = food_database.estimate_meal([f.strip() for f in foods.split(",")])
+    return json.dumps(estimate)
+
+
+def log_water_intake(amount_ml: int, tool_context=None) -> str:
     """
     Log water intake.
 
@@ -234,21 +723,261 @@ def log_water_intake(amount_ml: int) -> str:
     Returns:
         Confirmation message with daily total
     """
-    return session_memory.log_hydration(amount_ml)
+    with user_memory(tool_context) as memory:
+        return memory.log_hydration(amount_ml)
+
+
+MEAL_TYPES = ("breakfast", "lunch", "dinner", "snack", "pre_workout", "post_workout")
+INTENSITIES = ("low", "moderate", "high", "very_high")
+
+
+def _parse_entries(entries_json: str, what: str) -> List[Any]:
+    """Parse a JSON array argument, raising ValueError with a message for the model."""
+    try:
+        entries = json.loads(entries_json)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise ValueError(f"{what} must be a JSON array ({e})") from None
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{what} must be a non-empty JSON array")
+    return entries
+
 
+def _number_field(entry: Dict[str, Any], field: str, errors: List[str], index: int, required: bool = False) -> float:
+    value = entry.get(field, 0)
+    if required and field not in entry:
+        errors.append(f"item {index}: missing {field}")
+    elif isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        errors.append(f"item {index}: {field} must be a non-negative number")
+        return 0
+    return value
 
-def get_daily_summary() -> str:
+
+def _text_list_field(entry: Dict[str, Any], field: str, errors: List[str], index: int,
+                     required: bool = False) -> List[str]:
+    """A comma-separated string or list of strings field, as a list of stripped strings."""
+    value = entry.get(field)
+    if value is None or value == "" or value == []:
+        if required:
+            errors.append(f"item {index}: {field} is required")
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    elif not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        errors.append(f"item {index}: {field} must be a comma-separated string or a list of strings")
+        return []
+    return [item.strip() for item in value if item.strip()]
+
+
+def _bulk_confirmation(confirmations: List[str], memory: SessionMemory) -> str:
+    count = len(confirmations)
+    lines = [f"Logged {count} {'entry' if count == 1 else 'entries'}:"]
+    lines.extend(f"- {confirmation}" for confirmation in confirmations)
+    lines.append(f"Today's totals: {json.dumps(memory.get_daily_totals(), separators=(',', ':'))}")
+    return "\n".join(lines)
+
+
+def log_meals(meals_json: str, tool_context=None) -> str:
+    """
+    Log several meals in one call (e.g. a whole day's meals).
+
+    Every meal is validated first; if any is invalid nothing is logged.
+
+    Args:
+        meals_json: JSON array of meals, each an object with meal_name, meal_type
+            (breakfast, lunch, dinner, snack, pre_workout, post_workout), foods
+            (with amounts, e.g. "chicken breast 150g, rice 1 cup") and optionally
+            estimated_calories, protein_g, carbs_g, fats_g, notes. Leave
+            calories/macros out to estimate them from the local food database.
+
+    Returns:
+        One confirmation per meal and today's updated totals, or the validation errors
+    """
+    try:
+        entries = _parse_entries(meals_json, "meals_json")
+    except ValueError as e:
+        return f"Error: {e}"
+
+    meals = []
+    notes = []
+    errors: List[str] = []
+    for index, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict):
+            errors.append(f"item {index}: must be an object")
+            continue
+        if not entry.get("meal_name"):
+            errors.append(f"item {index}: meal_name is required")
+        foods = _text_list_field(entry, "foods", errors, index, required=True)
+        if entry.get("meal_type") not in MEAL_TYPES:
+            errors.append(f"item {index}: meal_type must be one of {', '.join(MEAL_TYPES)}")
+        numbers = [_number_field(entry, field, errors, index)
+                   for field in ("estimated_calories", "protein_g", "carbs_g", "fats_g")]
+        if not errors:
+            meal_data, estimate_note = _prepare_meal(
+                entry["meal_name"], entry["meal_type"], foods, *numbers, entry.get("notes", "")
+            )
+            meals.append(meal_data)
+            notes.append(estimate_note)
+    if errors:
+        return "Error: nothing was logged. " + "; ".join(errors)
+
+    with user_memory(tool_context) as memory:
+        confirmations = memory.log_batch(meals=meals)
+        return _bulk_confirmation([c + note for c, note in zip(confirmations, notes)], memory)
+
+
+def log_workouts(workouts_json: str, tool_context=None) -> str:
+    """
+    Log several workouts in one call.
+
+    Every workout is validated first; if any is invalid nothing is logged.
+
+    Args:
+        workouts_json: JSON array of workouts, each an object with workout_type
+            (e.g. strength, cardio, flexibility, sports), duration_minutes,
+            intensity (low, moderate, high, very_high) and optionally exercises
+            (comma-separated) and notes
+
+    Returns:
+        One confirmation per workout and today's updated totals, or the validation errors
+    """
+    try:
+        entries = _parse_entries(workouts_json, "workouts_json")
+    except ValueError as e:
+        return f"Error: {e}"
+
+    workouts = []
+    errors: List[str] = []
+    for index, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict):
+            errors.append(f"item {index}: must be an object")
+            continue
+        if not entry.get("workout_type"):
+            errors.append(f"item {index}: workout_type is required")
+        if entry.get("intensity") not in INTENSITIES:
+            errors.append(f"item {index}: intensity must be one of {', '.join(INTENSITIES)}")
+        duration = _number_field(entry, "duration_minutes", errors, index, required=True)
+        exercises = _text_list_field(entry, "exercises", errors, index)
+        workouts.append({
+            "type": entry.get("workout_type"),
+            "duration": duration,
+            "intensity": entry.get("intensity"),
+            "exercises": exercises,
+            "notes": entry.get("notes", "")
+        })
+    if errors:
+        return "Error: nothing was logged. " + "; ".join(errors)
+
+    with user_memory(tool_context) as memory:
+        return _bulk_confirmation(memory.log_batch(workouts=workouts), memory)
+
+
+def log_water_intakes(amounts_json: str, tool_context=None) -> str:
+    """
+    Log several water intakes in one call.
+
+    Args:
+        amounts_json: JSON array of amounts in milliliters (e.g. "[250, 250, 500]")
+
+    Returns:
+        One confirmation per entry and today's updated totals, or the validation errors
+    """
+    try:
+        amounts = _parse_entries(amounts_json, "amounts_json")
+    except ValueError as e:
+        return f"Error: {e}"
+
+    invalid = [str(index) for index, amount in enumerate(amounts, 1)
+               if isinstance(amount, bool) or not isinstance(amount, (int, float)) or amount <= 0]
+    if invalid:
+        return f"Error: nothing was logged. Amounts must be positive numbers of ml (items {', '.join(invalid)})"
+
+    with user_memory(tool_context) as memory:
+        return _bulk_confirmation(memory.log_batch(water_ml=[round(amount) for amount in amounts]), memory)
+
+
+def _compact_daily_totals(memory: SessionMemory) -> Dict[str, Any]:
+    """Today's totals, rounded, plus what is left of the daily targets."""
+    totals = memory.get_daily_totals()
+    for macro in ("protein_g", "carbs_g", "fats_g"):
+        totals[macro] = round(totals[macro], 1)
+    targets = memory.get_targets()
+    if targets is not None:
+        totals["remaining"] = {
+            "calories": round(targets["calories"] - totals["calories"]),
+            "protein_g": round(targets["protein_g"] - totals["protein_g"], 1),
+            "water_ml": targets["water_ml"] - totals["water_ml"]
+        }
+    return totals
+
+
+def _parse_cursor(cursor: str) -> Optional[Tuple[date, Tuple[int, int]]]:
+    try:
+        day, workout_offset, meal_offset = cursor.split(":")
+        return date.fromisoformat(day), (int(workout_offset), int(meal_offset))
+    except ValueError:
+        return None
+
+
+def get_daily_summary(mode: str = "compact", cursor: str = "", limit: int = SUMMARY_PAGE_SIZE,
+                      tool_context=None) -> str:
     """
     Get a summary of today's logged activities.
 
+    Args:
+        mode: "compact" (default) for today's totals and what is left of the
+            daily targets; "details" for one page of today's logged workouts
+            and meals; "delta" for only the entries logged since the previous
+            "delta" call
+        cursor: next_cursor from a previous "details" call, to get the next page
+        limit: Maximum entries returned in "details" and "delta" modes (up to 50)
+
+    Returns:
+        JSON string with today's totals, plus the page of entries and
+        next_cursor ("details") or the new entries and has_more ("delta")
+    """
+    mode = mode.strip().lower() or "compact"
+    if mode not in ("compact", "details", "delta"):
+        return f"Error: Unknown mode {mode!r}. Use 'compact', 'details' or 'delta'."
+    try:
+        limit = max(1, min(int(limit), SUMMARY_MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return f"Error: limit must be a whole number of entries (got {limit!r})."
+    position = None
+    if mode == "details" and cursor:
+        position = _parse_cursor(cursor)
+        if position is None:
+            return "Error: Invalid cursor. Pass next_cursor from the previous call unchanged."
+
+    with user_memory(tool_context) as memory:
+        summary = {"totals": _compact_daily_totals(memory)}
+        if mode == "details":
+            day, offsets = position or (datetime.now().date(), (0, 0))
+            page = memory.get_daily_entries(day, offsets, limit)
+            summary["entries"] = page["entries"]
+            summary["total_entries"] = page["total"]
+            if page["next_offsets"] is not None:
+                summary["next_cursor"] = f"{day.isoformat()}:{page['next_offsets'][0]}:{page['next_offsets'][1]}"
+        elif mode == "delta":
+            summary.update(memory.get_log_delta(limit))
+    return dumps(summary)
+
+
+def get_daily_totals(tool_context=None) -> str:
+    """
+    Get today's running totals: water, calories, macros and workout minutes.
+
+    Cheaper than get_daily_summary because it returns totals only, without
+    the individual meal and workout entries.
+
     Returns:
-        JSON string containing today's workouts, meals, and hydration
+        JSON string containing today's totals
     """
-    summary = session_memory.get_daily_summary()
-    return json.dumps(summary, indent=2)
+    with user_memory(tool_context) as memory:
+        totals = memory.get_daily_totals()
+    return json.dumps(totals)
 
 
-def save_meal_plan_to_memory(meal_plan_json: str) -> str:
+def save_meal_plan_to_memory(meal_plan_json: str, tool_context=None) -> str:
     """
     Save a weekly meal plan to session memory.
 
@@ -260,17 +989,210 @@ def save_meal_plan_to_memory(meal_plan_json: str) -> str:
     """
     try:
         meal_plan = json.loads(meal_plan_json)
-        return session_memory.save_meal_plan(meal_plan)
     except json.JSONDecodeError:
         return "Error: Invalid meal plan format. Please provide valid JSON."
 
+    with user_memory(tool_context) as memory:
+        result = memory.save_meal_plan(meal_plan)
+        signature = profile_signature(memory.user_profile, MEAL_PLAN_CACHE_BUCKET_KCAL)
+    if signature is not None:
+        meal_plan_cache.put(signature, meal_plan)
+    return result
+
+
+def get_cached_meal_plan(tool_context=None) -> str:
+    """
+    Get a ready-made weekly meal plan for the user's profile, if one is cached.
+
+    Plans are shared between users with the same fitness goal, dietary
+    restrictions, allergies and calorie target (to the nearest 100 kcal). A
+    plan for a nearby calorie target is scaled to fit, food amounts included.
+    A plan that is found is saved to the user's memory, so it does not need
+    to be saved again.
+
+    Returns:
+        JSON string with the meal plan and whether it was adapted, or a
+        message saying no plan is cached and a new one must be created
+    """
+    with user_memory(tool_context) as memory:
+        signature = profile_signature(memory.user_profile, MEAL_PLAN_CACHE_BUCKET_KCAL)
+        if signature is None:
+            return "No cached meal plan: save the user profile first."
+        cached = meal_plan_cache.get(signature)
+        if cached is None:
+            return "No cached meal plan for this profile. Delegate to nutrition_planner to create one."
+        meal_plan, adapted = cached
+        memory.save_meal_plan(meal_plan)
+
+    return json.dumps({
+        "adapted": adapted,
+        "calorie_target": signature[3],
+        "plan": meal_plan
+    })
 
-def get_user_stats() -> str:
+
+NO_MEAL_PLAN = "Error: No meal plan saved yet. Create one first (weekly_meal_planner or nutrition_planner)."
+
+
+def get_planned_meal(day: str, meal_type: str, tool_context=None) -> str:
+    """
+    Look up one meal of the saved meal plan, e.g. Tuesday's lunch.
+
+    Args:
+        day: Day of the week (e.g. "tuesday"), "today" or "tomorrow"
+        meal_type: breakfast, lunch, dinner or snacks
+
+    Returns:
+        JSON string with the planned meal(s) and their calories and macros
+    """
+    plan_day = resolve_day(day)
+    if plan_day is None:
+        return f"Error: Unknown day {day!r}. Use a day of the week, 'today' or 'tomorrow'."
+    slot = slot_name(meal_type)
+    if slot is None:
+        return f"Error: Unknown meal type {meal_type!r}. Use one of: {', '.join(MEAL_SLOTS)}."
+
+    with user_memory(tool_context) as memory:
+        index = memory.meal_plan_index
+        meal = index.meal(plan_day, slot) if index is not None else None
+    if index is None:
+        return NO_MEAL_PLAN
+    if meal is None:
+        return f"Error: The saved meal plan has no entry for {plan_day}."
+    return json.dumps(meal)
+
+
+def get_remaining_meals(tool_context=None) -> str:
+    """
+    Get today's planned meals that have not been logged yet.
+
+    A logged breakfast, lunch or dinner covers that meal of the plan; each
+    logged snack covers one planned snack.
+
+    Returns:
+        JSON string with the remaining meals and their combined calories and macros
+    """
+    with user_memory(tool_context) as memory:
+        if memory.meal_plan_index is None:
+            return NO_MEAL_PLAN
+        remaining = memory.get_remaining_planned_meals()
+    if remaining is None:
+        return "Error: The saved meal plan has no entry for today."
+    return json.dumps(remaining)
+
+
+def get_meal_plan_totals(day: str = "", tool_context=None) -> str:
+    """
+    Get the planned calorie and macro totals of the saved meal plan.
+
+    Args:
+        day: Optional day of the week, "today" or "tomorrow"; leave empty for
+            the weekly totals (e.g. "weekly protein total")
+
+    Returns:
+        JSON string with the weekly totals and daily average, or one day's
+        totals broken down by meal type
+    """
+    plan_day = None
+    if day.strip():
+        plan_day = resolve_day(day)
+        if plan_day is None:
+            return f"Error: Unknown day {day!r}. Use a day of the week, 'today' or 'tomorrow'."
+
+    with user_memory(tool_context) as memory:
+        index = memory.meal_plan_index
+        totals = index.totals(plan_day) if index is not None else None
+    if index is None:
+        return NO_MEAL_PLAN
+    if totals is None:
+        return f"Error: The saved meal plan has no entry for {plan_day}."
+    return json.dumps(totals)
+
+
+def get_shopping_list(days: str = "", tool_context=None) -> str:
+    """
+    Get the shopping list for the saved meal plan, computed locally.
+
+    Ingredient amounts are summed across the planned meals, converted to one
+    unit per food (g/kg, ml/l or pieces) and grouped by store category.
+    Foods without a confident food database match are not converted; they are
+    listed under Other as written in the plan and in ``unmatched``. Present
+    this list as-is instead of writing a shopping list yourself.
+
+    Args:
+        days: Optional comma-separated days to shop for (e.g. "monday, tuesday,
+            wednesday"); leave empty for the whole plan
+
+    Returns:
+        JSON string with the categorized items and any foods that could not be
+        matched to the food database
+    """
+    selected = None
+    if days.strip():
+        selected = [resolve_day(day) for day in days.split(",") if day.strip()]
+        if None in selected:
+            return f"Error: Unknown day in {days!r}. Use days of the week, 'today' or 'tomorrow'."
+
+    with user_memory(tool_context) as memory:
+        index = memory.meal_plan_index
+    if index is None:
+        return NO_MEAL_PLAN
+    return json.dumps(build_shopping_list(index, selected))
+
+
+def get_user_stats(mode: str = "compact", tool_context=None) -> str:
     """
     Get comprehensive user statistics and current state.
 
+    Args:
+        mode: "compact" (default) omits empty profile fields and whitespace;
+            "full" returns everything, indented
+
     Returns:
         JSON string containing user profile and activity statistics
     """
-    stats = session_memory.get_user_stats()
-    return json.dumps(stats, indent=2)
\ No newline at end of file
+    with user_memory(tool_context) as memory:
+        stats = memory.get_user_stats()
+    stats["meal_plan_cache"] = meal_plan_cache.stats()
+    if mode.strip().lower() == "full":
+        return json.dumps(stats, indent=2)
+    if stats["profile"]:
+        stats["profile"] = {key: value for key, value in stats["profile"].items() if value not in (None, "", [])}
+    return dumps(stats)
+
+
+def get_trends(tool_context=None) -> str:
+    """
+    Get the user's progress trends, computed from everything they have logged.
+
+    Use this for questions about progress, consistency, patterns or trends
+    instead of reading through the logs.
+
+    Returns:
+        JSON string with 7- and 28-day averages (calories and macros per day
+        with meals logged, water per day with water logged, workouts and
+        minutes), adherence to the calorie, protein and hydration targets
+        (share of days on target), the change of the last 7 days against
+        the 28-day baseline, and current and longest workout and
+        hydration-goal streaks
+    """
+    with user_memory(tool_context) as memory:
+        if memory.analytics.first_day is None:
+            return "No workouts, meals or water logged yet, so there are no trends to report."
+        trends = memory.get_trends()
+    return dumps(trends)
+
+
+async def web_search(query: str) -> str:
+    """
+    Search the web with Google Search for current nutrition, exercise and recovery information.
+
+    Results are cached and shared across users, so repeated questions are answered instantly.
+
+    Args:
+        query: Search query (e.g., "high protein vegetarian breakfast")
+
+    Returns:
+        Summary of the most relevant search results
+    """
+    return await cached_search.search(query)
\ No newline at end of file
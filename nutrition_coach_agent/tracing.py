@@ -0,0 +1,329 @@
+"""Per-turn latency tracing for the agent tree.
+
+``TracingPlugin`` is an ADK plugin that opens a timed span for every user
+turn, every agent run (including transfers to sub-agents), every model call
+and every tool call, nested as ``turn > agent > model/tool``. Finished spans
+feed in-process latency histograms on the ``Tracer`` and, optionally, a
+``JsonlSpanExporter`` that writes one OpenTelemetry-shaped span per line.
+"""
+
+import json
+import math
+import os
+import secrets
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.agents.base_agent import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events.event import Event
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+
+class Span:
+    """A timed operation within a turn."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes")
+
+    def __init__(
+            self,
+            name: str,
+            kind: str,
+            trace_id: str,
+            parent_id: Optional[str] = None,
+            attributes: Optional[Dict[str, Any]] = None
+    ):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def to_otel(self) -> Dict[str, Any]:
+        """The span in OpenTelemetry's JSON field naming."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": {"stringValue": str(value)}}
+                for key, value in {"span.kind": self.kind, **self.attributes}.items()
+            ]
+        }
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram; percentiles are accurate to ~5%.
+
+    Buckets grow by ``GROWTH`` from 1µs, so memory stays constant no matter
+    how many samples are recorded.
+    """
+
+    GROWTH = 1.1
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = defaultdict(int)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, duration_ms: float) -> None:
+        micros = max(duration_ms * 1000, 1.0)
+        self.buckets[int(math.log(micros, self.GROWTH))] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+    def percentile(self, fraction: float) -> float:
+        """Approximate latency in ms below which ``fraction`` of samples fall."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                # Geometric midpoint of the bucket, capped at the observed max
+                return min(self.GROWTH ** (bucket + 0.5) / 1000, self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "p99_ms": round(self.percentile(0.99), 3),
+            "max_ms": round(self.max_ms, 3)
+        }
+
+
+class JsonlSpanExporter:
+    """Append finished spans to a JSONL file, one OpenTelemetry-shaped span per line."""
+
+    def __init__(self, path: str, buffer_size: int = 64):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.buffer_size = buffer_size
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_otel())
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.buffer_size:
+                self._write_locked()
+
+    def _write_locked(self) -> None:
+        if self._buffer:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(self._buffer) + "\n")
+            self._buffer.clear()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._write_locked()
+
+    def close(self) -> None:
+        self.flush()
+
+
+class Tracer:
+    """Creates spans and aggregates finished ones into per-operation histograms.
+
+    Histograms are keyed by ``"<kind>:<name>"``, e.g. ``"tool:log_meal"`` or
+    ``"agent:progress_tracker"``.
+    """
+
+    def __init__(self, exporter: Optional[JsonlSpanExporter] = None):
+        self.exporter = exporter
+        self.histograms: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self._lock = threading.Lock()
+
+    def start_span(
+            self,
+            name: str,
+            kind: str,
+            parent: Optional[Span] = None,
+            attributes: Optional[Dict[str, Any]] = None
+    ) -> Span:
+        trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        return Span(name, kind, trace_id, parent.span_id if parent else None, attributes)
+
+    def end_span(self, span: Span) -> None:
+        if span.end_ns is not None:
+            return
+        span.end_ns = time.time_ns()
+        with self._lock:
+            self.histograms[f"{span.kind}:{span.name}"].record(span.duration_ms)
+        if self.exporter is not None:
+            self.exporter.export(span)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Histogram summaries, largest p99 first."""
+        with self._lock:
+            summaries = {key: histogram.summary() for key, histogram in self.histograms.items()}
+        return dict(sorted(summaries.items(), key=lambda item: item[1]["p99_ms"], reverse=True))
+
+    def print_summary(self) -> None:
+        print(f"{'operation':<40} {'count':>7} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10} {'max (ms)':>10}")
+        for key, s in self.summary().items():
+            print(f"{key:<40} {s['count']:>7} {s['p50_ms']:>10.1f} {s['p95_ms']:>10.1f} "
+                  f"{s['p99_ms']:>10.1f} {s['max_ms']:>10.1f}")
+
+    def close(self) -> None:
+        if self.exporter is not None:
+            self.exporter.close()
+
+
+class TracingPlugin(BasePlugin):
+    """ADK plugin that times turns, agents, model calls and tool calls.
+
+    Register it before plugins that short-circuit callbacks (such as
+    ``RecordReplayPlugin``) so it sees every call.
+
+    Args:
+        tracer: Tracer receiving the spans; a new one is created if omitted
+        exporter_path: If given (and no tracer is passed), spans are also
+            written to this JSONL file
+    """
+
+    def __init__(self, tracer: Optional[Tracer] = None, exporter_path: Optional[str] = None):
+        super().__init__(name="tracing")
+        self.tracer = tracer or Tracer(JsonlSpanExporter(exporter_path) if exporter_path else None)
+        self._turns: Dict[str, Span] = {}
+        self._agent_stacks: Dict[str, List[Span]] = defaultdict(list)
+        self._models: Dict[Tuple[str, str], Span] = {}
+        self._tools: Dict[str, Span] = {}
+
+    def _current_parent(self, invocation_id: str) -> Optional[Span]:
+        stack = self._agent_stacks.get(invocation_id)
+        return stack[-1] if stack else self._turns.get(invocation_id)
+
+    def _end_model_span(self, invocation_id: str, agent_name: str) -> None:
+        # Plugins that answer before_model (e.g. replay) skip after_model, so
+        # the span is also closed by the next event or tool call of the agent
+        span = self._models.pop((invocation_id, agent_name), None)
+        if span is not None:
+            self.tracer.end_span(span)
+
+    async def before_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        self._turns[invocation_context.invocation_id] = self.tracer.start_span(
+            "turn",
+            "turn",
+            attributes={"user_id": invocation_context.user_id, "session_id": invocation_context.session.id}
+        )
+        return None
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        invocation_id = invocation_context.invocation_id
+        for key in [key for key in self._models if key[0] == invocation_id]:
+            self.tracer.end_span(self._models.pop(key))
+        for span in reversed(self._agent_stacks.pop(invocation_id, [])):
+            self.tracer.end_span(span)
+        turn = self._turns.pop(invocation_id, None)
+        if turn is not None:
+            self.tracer.end_span(turn)
+
+    async def before_agent_callback(self, *, agent: BaseAgent, callback_context: CallbackContext) -> None:
+        invocation_id = callback_context.invocation_id
+        parent = self._current_parent(invocation_id)
+        attributes = {}
+        if parent is not None and parent.kind == "agent":
+            attributes["transferred_from"] = parent.name
+        span = self.tracer.start_span(agent.name, "agent", parent, attributes)
+        self._agent_stacks[invocation_id].append(span)
+        return None
+
+    async def after_agent_callback(self, *, agent: BaseAgent, callback_context: CallbackContext) -> None:
+        invocation_id = callback_context.invocation_id
+        self._end_model_span(invocation_id, agent.name)
+        stack = self._agent_stacks.get(invocation_id)
+        if stack and stack[-1].name == agent.name:
+            self.tracer.end_span(stack.pop())
+        return None
+
+    async def before_model_callback(
+            self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        invocation_id = callback_context.invocation_id
+        agent = callback_context.agent_name
+        self._end_model_span(invocation_id, agent)
+        self._models[(invocation_id, agent)] = self.tracer.start_span(
+            llm_request.model or "model",
+            "model",
+            self._current_parent(invocation_id),
+            {"agent": agent}
+        )
+        return None
+
+    async def after_model_callback(
+            self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        if not llm_response.partial:
+            self._end_model_span(callback_context.invocation_id, callback_context.agent_name)
+        return None
+
+    async def on_event_callback(self, *, invocation_context: InvocationContext, event: Event) -> Optional[Event]:
+        if not event.partial:
+            self._end_model_span(invocation_context.invocation_id, event.author)
+        return None
+
+    async def before_tool_callback(
+            self, *, tool: BaseTool, tool_args: Dict[str, Any], tool_context: ToolContext
+    ) -> Optional[dict]:
+        invocation_id = tool_context.invocation_id
+        self._end_model_span(invocation_id, tool_context.agent_name)
+        key = tool_context.function_call_id or f"{invocation_id}:{tool.name}"
+        self._tools[key] = self.tracer.start_span(
+            tool.name,
+            "tool",
+            self._current_parent(invocation_id),
+            {"agent": tool_context.agent_name}
+        )
+        return None
+
+    async def after_tool_callback(
+            self, *, tool: BaseTool, tool_args: Dict[str, Any], tool_context: ToolContext, result: dict
+    ) -> Optional[dict]:
+        key = tool_context.function_call_id or f"{tool_context.invocation_id}:{tool.name}"
+        span = self._tools.pop(key, None)
+        if span is not None:
+            self.tracer.end_span(span)
+        return None
+
+    async def on_tool_error_callback(
+            self, *, tool: BaseTool, tool_args: Dict[str, Any], tool_context: ToolContext, error: Exception
+    ) -> Optional[dict]:
+        key = tool_context.function_call_id or f"{tool_context.invocation_id}:{tool.name}"
+        span = self._tools.pop(key, None)
+        if span is not None:
+            span.attributes["error"] = type(error).__name__
+            self.tracer.end_span(span)
+        return None
+
+    async def close(self) -> None:
+        self.tracer.close()
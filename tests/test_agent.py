@@ -7,12 +7,14 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-# Import the agent
-from nutrition_coach_agent.agent import root_agent
+# Cold-start budget for importing the package and its tools (no google.adk)
+IMPORT_TIME_BUDGET_S = 0.5
 
 
 def test_agent_creation():
     """Test that the agent is created successfully."""
+    from nutrition_coach_agent.agent import root_agent
+
     assert root_agent is not None
     assert root_agent.name == "health_nutrition_coach"
     print("✅ Agent created successfully")
@@ -20,6 +22,8 @@ def test_agent_creation():
 
 def test_sub_agents():
     """Test that all sub-agents are present."""
+    from nutrition_coach_agent.agent import root_agent
+
     sub_agent_names = [agent.name for agent in root_agent.sub_agents]
 
     expected_agents = [
@@ -36,6 +40,8 @@ def test_sub_agents():
 
 def test_tools():
     """Test that all required tools are available."""
+    from nutrition_coach_agent.agent import root_agent
+
     tool_names = []
     for tool in root_agent.tools:
         if hasattr(tool, '__name__'):
@@ -53,9 +59,39 @@ def test_tools():
         assert tool_name in tool_names, f"Missing tool: {tool_name}"
         print(f"✅ Found tool: {tool_name}")
 
+    for tool in root_agent.tools:
+        parameters = tool._get_declaration().parameters
+        assert parameters is None or "tool_context" not in (parameters.properties or {})
+
     print(f"✅ All required tools are available")
 
 
+def test_exported_app():
+    """Test that agent.py exports an App, loaded by `adk run` / `adk web`, with the configured plugins."""
+    import tempfile
+
+    from google.adk.cli.utils.agent_loader import AgentLoader
+    from nutrition_coach_agent.agent import app, app_plugins, root_agent
+    from nutrition_coach_agent.config import FAST_PATH_ENABLED, TRACING_ENABLED
+    from nutrition_coach_agent.fast_path import FastPathPlugin
+    from nutrition_coach_agent.tracing import TracingPlugin
+
+    assert app.name == "nutrition_coach_agent" and app.root_agent is root_agent
+    assert any(isinstance(plugin, FastPathPlugin) for plugin in app.plugins) == FAST_PATH_ENABLED
+    assert any(isinstance(plugin, TracingPlugin) for plugin in app.plugins) == TRACING_ENABLED
+    # Tracing goes before the fast path, which short-circuits the turns it answers
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "spans.jsonl")
+        plugins = app_plugins(tracing=True, trace_path=path, fast_path=True)
+    assert [type(plugin) for plugin in plugins] == [TracingPlugin, FastPathPlugin]
+    assert plugins[0].tracer.exporter.path == path
+    assert app_plugins(tracing=False, fast_path=False) == []
+
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert AgentLoader(project_dir).load_agent("nutrition_coach_agent") is app
+    print("✅ Exported app working correctly")
+
+
 def test_configuration():
     """Test that configuration is loaded."""
     from nutrition_coach_agent.config import GOOGLE_API_KEY, MAIN_MODEL
@@ -96,6 +132,790 @@ def test_session_memory():
     print("✅ Session memory working correctly")
 
 
+def test_session_memory_daily_index():
+    """Test that daily summaries and range queries only see their own days."""
+    from datetime import datetime, timedelta
+    from nutrition_coach_agent.tools import SessionMemory
+
+    memory = SessionMemory()
+    now = datetime.now()
+    memory.log_hydration(1000, timestamp=now - timedelta(days=2))
+    memory.log_meal({"name": "Old dinner"}, timestamp=now - timedelta(days=1))
+    memory.log_hydration(300)
+    result = memory.log_hydration(200)
+    assert "Today's total: 500ml" in result
+
+    summary = memory.get_daily_summary()
+    assert summary["hydration_ml"] == 500
+    assert summary["meals"] == 0
+
+    logs = memory.get_logs_between((now - timedelta(days=2)).date(), now.date())
+    assert len(logs["hydration"]) == 1
+    assert len(logs["meals"]) == 1
+    assert memory.get_user_stats()["total_hydration_entries"] == 3
+
+    print("✅ Daily log index working correctly")
+
+
+def test_session_memory_daily_totals():
+    """Test that running daily totals track every log call."""
+    from nutrition_coach_agent.tools import SessionMemory
+
+    memory = SessionMemory()
+    memory.log_meal({"name": "Oats", "calories": 400, "macros": {"protein": 20, "carbs": 60, "fats": None}})
+    memory.log_meal({"name": "Shake", "calories": None, "macros": {"protein": 30}})
+    memory.log_workout({"type": "cardio", "duration": 45, "intensity": "moderate"})
+    memory.log_workout({"type": "strength", "duration": 30, "intensity": "moderate"})
+    memory.log_hydration(750)
+
+    totals = memory.get_daily_totals()
+    assert totals["calories"] == 400
+    assert totals["protein_g"] == 50
+    assert totals["fats_g"] == 0
+    assert totals["meals"] == 2
+    assert totals["workout_minutes"] == {"moderate": 75}
+    assert totals["water_ml"] == 750
+
+    print("✅ Daily totals working correctly")
+
+
+def test_session_store_isolation():
+    """Test that each ADK user gets their own session memory."""
+    from types import SimpleNamespace
+    from nutrition_coach_agent.session_store import SessionStore
+    from nutrition_coach_agent.tools import SessionMemory, get_daily_totals, log_water_intake
+
+    alice = SimpleNamespace(user_id="store_test_alice", session=SimpleNamespace(id="s1"))
+    bob = SimpleNamespace(user_id="store_test_bob", session=SimpleNamespace(id="s2"))
+    log_water_intake(400, tool_context=alice)
+    result = log_water_intake(100, tool_context=bob)
+    assert "Today's total: 100ml" in result
+    assert '"water_ml": 400' in get_daily_totals(tool_context=alice)
+
+    store = SessionStore(lambda key: SessionMemory(), num_stripes=1, max_users=2)
+    first = store.get("a")
+    store.get("b")
+    store.get("a")
+    store.get("c")
+    assert "b" not in store
+    assert store.get("a") is first
+    assert store.stats()["evictions"] == 1
+
+    # Without durable storage nobody is evicted, since their data could not be reloaded
+    unbounded = SessionStore(lambda key: SessionMemory(), num_stripes=1, max_users=None)
+    for key in "abc":
+        unbounded.get(key)
+    assert len(unbounded) == 3 and unbounded.stats()["evictions"] == 0
+
+    print("✅ Per-user session store working correctly")
+
+
+def test_sqlite_backend():
+    """Test that session memory survives a restart with the SQLite backend."""
+    import os
+    import tempfile
+    from datetime import date, timedelta
+    from nutrition_coach_agent.session_store import SessionStore
+    from nutrition_coach_agent.storage import SQLiteBackend
+    from nutrition_coach_agent.tools import SessionMemory
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "coach.db")
+        backend = SQLiteBackend(path, batch_size=4)
+        memory = SessionMemory(user_id="alice", backend=backend)
+        memory.set_user_profile({"name": "Alice"})
+        memory.log_meal({"name": "Eggs", "calories": 300, "macros": {"protein": 20}})
+        memory.log_hydration(500)
+        memory.save_meal_plan({"monday": []})
+        SessionMemory(user_id="bob", backend=backend).log_hydration(900)
+        backend.close()
+
+        backend = SQLiteBackend(path)
+        restored = SessionMemory(user_id="alice", backend=backend)
+        assert restored.user_profile["name"] == "Alice"
+        assert restored.meal_plan["plan"] == {"monday": []}
+        assert restored.meal_plan_index.days == ["monday"]
+        assert restored.get_daily_totals()["water_ml"] == 500
+        assert restored.get_daily_totals()["calories"] == 300
+        today = date.today()
+        assert len(backend.logs_between("alice", "meal", today, today + timedelta(days=1))) == 1
+
+        # An evicted user is rebuilt from SQLite on their next request
+        store = SessionStore(lambda user_id: SessionMemory(user_id=user_id, backend=backend),
+                             num_stripes=1, max_users=1)
+        store.get("alice").log_hydration(250)
+        store.get("bob")
+        assert "alice" not in store
+        reloaded = store.get("alice")
+        assert reloaded.user_profile["name"] == "Alice"
+        assert reloaded.get_daily_totals()["water_ml"] == 750
+        assert reloaded.get_daily_totals()["calories"] == 300
+        backend.close()
+
+    print("✅ SQLite backend working correctly")
+
+
+def test_sqlite_backend_failed_writes():
+    """Test that failed write-behind batches are kept and retried, and errors stay per user."""
+    import os
+    import sqlite3
+    import tempfile
+    from datetime import datetime
+    from nutrition_coach_agent.storage import SQLiteBackend
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "coach.db")
+        backend = SQLiteBackend(path, flush_interval=0.01, write_retries=1)
+        with sqlite3.connect(path) as conn:
+            conn.execute(
+                "CREATE TRIGGER reject_bob BEFORE INSERT ON logs WHEN NEW.user_id = 'bob' "
+                "BEGIN SELECT RAISE(ABORT, 'disk full'); END"
+            )
+        now = datetime.now()
+        backend.append_log("alice", "hydration", now, {"amount_ml": 250})
+        backend.append_log("bob", "hydration", now, {"amount_ml": 500})
+
+        # Alice's write is committed and her reads are unaffected by Bob's failure
+        assert len(backend.load_user("alice")["logs"]) == 1
+        backend.flush("alice")
+        try:
+            backend.load_user("bob")
+            assert False, "Bob's failed write should be reported on his read"
+        except RuntimeError as e:
+            assert "disk full" in str(e)
+        assert "bob" in backend.errors and "alice" not in backend.errors
+
+        # The write was kept, so it lands once the cause is gone
+        with sqlite3.connect(path) as conn:
+            conn.execute("DROP TRIGGER reject_bob")
+        assert backend.load_user("bob")["logs"][0][2] == {"amount_ml": 500}
+        assert backend.errors == {}
+        backend.close()
+
+    print("✅ SQLite failed writes retried correctly")
+
+
+def test_bulk_logging_tools():
+    """Test that bulk logging validates everything first and persists in one operation."""
+    import json
+    import os
+    import tempfile
+    from types import SimpleNamespace
+    from nutrition_coach_agent.storage import SQLiteBackend
+    from nutrition_coach_agent.session_store import SessionStore
+    from nutrition_coach_agent import tools
+
+    context = SimpleNamespace(user_id="bulk_test", session=SimpleNamespace(id="s1"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteBackend(os.path.join(tmp, "coach.db"))
+        store = SessionStore(lambda user_id: tools.SessionMemory(user_id=user_id, backend=backend))
+        original_store, tools.session_store = tools.session_store, store
+        try:
+            result = tools.log_meals(json.dumps([
+                {"meal_name": "Eggs and toast", "meal_type": "breakfast", "foods": "2 eggs, 1 slice bread"},
+                {"meal_name": "Chicken bowl", "meal_type": "lunch", "foods": ["chicken breast 150g", "rice 1 cup"],
+                 "estimated_calories": 650, "protein_g": 50, "carbs_g": 60, "fats_g": 12}
+            ]), tool_context=context)
+            assert result.startswith("Logged 2 entries:"), result
+            assert "estimated from food database" in result
+            totals = json.loads(result.split("Today's totals: ")[1])
+            assert totals["meals"] == 2 and totals["calories"] > 650
+
+            result = tools.log_workouts(json.dumps([
+                {"workout_type": "cardio", "duration_minutes": 30, "intensity": "moderate", "exercises": "running"},
+                {"workout_type": "strength", "duration_minutes": 45, "intensity": "high"}
+            ]), tool_context=context)
+            assert json.loads(result.split("Today's totals: ")[1])["workouts"] == 2
+
+            result = tools.log_water_intakes("[250, 250, 500]", tool_context=context)
+            assert json.loads(result.split("Today's totals: ")[1])["water_ml"] == 1000
+
+            # One invalid item means nothing is logged
+            result = tools.log_workouts(json.dumps([
+                {"workout_type": "yoga", "duration_minutes": 20, "intensity": "low"},
+                {"workout_type": "cardio", "duration_minutes": -5, "intensity": "extreme"}
+            ]), tool_context=context)
+            assert result.startswith("Error: nothing was logged") and "item 2" in result
+            assert tools.log_water_intakes("not json", tool_context=context).startswith("Error:")
+            # Wrongly typed lists are reported per item instead of raising
+            result = tools.log_meals(json.dumps([
+                {"meal_name": "Snack", "meal_type": "snack", "foods": 42},
+                {"meal_name": "Lunch", "meal_type": "lunch", "foods": {"rice": "1 cup"}},
+                {"meal_name": "Dinner", "meal_type": "dinner", "foods": None}
+            ]), tool_context=context)
+            assert result.startswith("Error: nothing was logged")
+            assert all(f"item {i}: foods" in result for i in (1, 2, 3)), result
+            result = tools.log_workouts(json.dumps([
+                {"workout_type": "yoga", "duration_minutes": 20, "intensity": "low", "exercises": 3}
+            ]), tool_context=context)
+            assert "item 1: exercises must be" in result
+            assert tools.log_meals("[]", tool_context=context).startswith("Error:")
+
+            with store.lease(context.user_id) as memory:
+                assert len(memory.workout_logs) == 2
+                assert len(memory.hydration_logs) == 3
+                assert tools._bulk_confirmation(["Meal logged: Eggs"], memory).startswith("Logged 1 entry:")
+        finally:
+            tools.session_store = original_store
+
+        backend.flush()
+        # Each bulk call is a single write operation (one executemany)
+        assert backend.batches_committed <= 3
+        restored = tools.SessionMemory(user_id="bulk_test", backend=backend)
+        assert len(restored.meal_logs) == 2 and restored.get_daily_totals()["water_ml"] == 1000
+        backend.close()
+
+    print("✅ Bulk logging tools working correctly")
+
+
+def test_compact_records():
+    """Test that compact log records round-trip to the original dict shape."""
+    from datetime import datetime
+    from nutrition_coach_agent.records import MealRecord, WorkoutRecord
+
+    timestamp = datetime(2025, 3, 4, 12, 30, 15, 123456)
+    meal_data = {
+        "name": "Chicken bowl",
+        "type": "lunch",
+        "foods": ["chicken breast", "rice"],
+        "calories": 550,
+        "macros": {"protein": 40.0, "carbs": 55.0, "fats": None},
+        "notes": ""
+    }
+    entry = MealRecord.from_data(meal_data, timestamp.timestamp()).to_dict()
+    assert entry == {"timestamp": timestamp.isoformat(), "data": meal_data}
+    assert MealRecord.from_dict(entry).to_dict() == entry
+
+    first = WorkoutRecord.from_data({"exercises": ["".join(["sq", "uat"])]}, 0)
+    second = WorkoutRecord.from_data({"exercises": ["".join(["squ", "at"])]}, 0)
+    assert first.exercises[0] is second.exercises[0]
+
+    print("✅ Compact records working correctly")
+
+
+def test_targets_engine():
+    """Test deterministic targets and their memoization on the profile."""
+    from nutrition_coach_agent.targets import compute_targets, compute_targets_batch
+    from nutrition_coach_agent.tools import SessionMemory
+
+    profile = {
+        "weight_kg": 75, "height_cm": 175, "age": 28, "sex": "male",
+        "fitness_goal": "muscle_gain", "activity_level": "moderate"
+    }
+    targets = compute_targets(profile)
+    assert targets["bmr"] == 1709
+    assert targets["calories"] == round(1708.75 * 1.55 + 300)
+    assert targets["water_ml"] == 75 * 45
+
+    memory = SessionMemory()
+    memory.set_user_profile(dict(profile))
+    first = memory.get_targets()
+    memory.set_user_profile(dict(profile, name="Renamed"))
+    assert memory.get_targets() is first
+    memory.set_user_profile(dict(profile, weight_kg=80))
+    assert memory.get_targets()["water_ml"] == 80 * 45
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("⚠️ NumPy not installed - skipping batch targets check")
+    else:
+        profiles = [profile, dict(profile, sex="female", fitness_goal="weight_loss", daily_calories=1800)]
+        batch = compute_targets_batch(profiles)
+        for i, single in enumerate(map(compute_targets, profiles)):
+            for field in ("bmr", "tdee", "calories", "protein_g", "carbs_g", "fats_g", "water_ml"):
+                assert batch[field][i] == single[field], field
+
+    print("✅ Targets engine working correctly")
+
+
+def test_food_database():
+    """Test food parsing, lookup and meal estimation from the local food table."""
+    from nutrition_coach_agent.food_db import food_database, parse_food_item
+    from nutrition_coach_agent.tools import session_memory, log_meal
+
+    assert parse_food_item("chicken breast 150g") == ("chicken breast", 150, "g")
+    assert parse_food_item("1 cup of rice") == ("rice", 1, "cup")
+    assert parse_food_item("2% milk") == ("2% milk", None, None)
+
+    assert food_database.lookup("Eggs").name == "egg"
+    assert food_database.lookup("grilled chicken breast").name == "chicken breast"
+    assert food_database.lookup("brocoli").name == "broccoli"
+    # A food that merely contains a known name is not that food
+    for name in ("water", "apple pie", "potato chips", "banana bread", "chocolate milk"):
+        assert food_database.lookup(name) is None, name
+    assert food_database.estimate("2 eggs")["grams"] == 100
+
+    estimate = food_database.estimate_meal(["chicken breast 150g", "rice 1 cup", "mystery sauce"])
+    assert estimate["calories"] == 248 + 205
+    assert estimate["unresolved"] == ["mystery sauce"]
+
+    result = log_meal("Chicken and rice", "lunch", "chicken breast 150g, rice 1 cup", protein_g=50)
+    assert "453 kcal" in result
+    assert "chicken breast 150g" in result
+    logged = session_memory.meal_logs[-1]
+    assert logged.calories == 453 and logged.protein == 50
+
+    # With an unmatched food nothing is guessed; the reply names it instead
+    result = log_meal("Dessert", "snack", "apple pie, 1 banana")
+    assert "no food database match for: apple pie" in result
+    assert session_memory.meal_logs[-1].calories is None
+
+    print("✅ Food database working correctly")
+
+
+def test_search_cache():
+    """Test that repeated web searches are served from the memory and disk caches."""
+    import asyncio
+    import os
+    import tempfile
+    from nutrition_coach_agent.search_cache import CachedSearch, FakeSearchBackend, SearchCache, normalize_query
+
+    assert normalize_query("High-protein vegetarian breakfast?") == normalize_query("vegetarian breakfast high protein")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "search.db")
+        backend = FakeSearchBackend(default="Eggs, tofu scramble, greek yogurt")
+        search = CachedSearch(backend, SearchCache(path))
+        first = asyncio.run(search.search("high protein vegetarian breakfast"))
+        second = asyncio.run(search.search("High protein vegetarian breakfast!"))
+        assert first == second
+        assert backend.calls == 1
+        assert search.cache.stats()["memory_hits"] == 1
+        search.cache.close()
+
+        restarted = CachedSearch(backend, SearchCache(path))
+        asyncio.run(restarted.search("high protein vegetarian breakfast"))
+        assert backend.calls == 1
+        assert restarted.cache.stats()["disk_hits"] == 1
+        restarted.cache.close()
+
+        expired = CachedSearch(backend, SearchCache(path, ttl_seconds=-1))
+        asyncio.run(expired.search("rest day protein intake"))
+        asyncio.run(expired.search("rest day protein intake"))
+        assert backend.calls == 3
+        expired.cache.close()
+
+    print("✅ Search cache working correctly")
+
+
+def test_meal_plan_cache():
+    """Test that meal plans are shared and adapted between matching profiles."""
+    import json
+    from types import SimpleNamespace
+    from nutrition_coach_agent.food_db import scale_food_item
+    from nutrition_coach_agent.plan_cache import MealPlanCache, profile_signature
+    from nutrition_coach_agent.tools import (
+        get_cached_meal_plan, get_user_stats, save_meal_plan_to_memory, save_user_profile
+    )
+
+    profile = {"fitness_goal": "muscle_gain", "dietary_restrictions": ["Vegetarian", "gluten-free"],
+               "allergies": ["nuts"], "daily_calories": 2640}
+    signature = profile_signature(profile)
+    assert signature == ("muscle_gain", ("gluten-free", "vegetarian"), ("nuts",), 2600)
+    assert profile_signature(dict(profile, dietary_restrictions=["gluten-free", "vegetarian"])) == signature
+
+    cache = MealPlanCache(max_entries=2)
+    cache.put(signature, {"monday": {"lunch": {"name": "Lentil bowl", "calories": 650, "protein_g": 40,
+                                               "foods": ["200g lentils", "rice (1 cup)", "2 eggs", "spinach"]}}})
+    plan, adapted = cache.get(signature)
+    assert not adapted and plan["monday"]["lunch"]["calories"] == 650
+    plan, adapted = cache.get(signature[:3] + (2860,))
+    assert adapted and plan["monday"]["lunch"]["calories"] == 715
+    # The ingredients are scaled with the totals, so they still add up
+    assert plan["monday"]["lunch"]["foods"] == ["220g lentils", "rice (1 cup)", "2 eggs", "spinach"]
+    assert scale_food_item("1 cup of oats", 1.5) == "1.5 cup of oats"
+    assert scale_food_item("Greek yogurt", 1.3) == "1.25 servings Greek yogurt"
+    assert cache.get(signature[:3] + (3500,)) is None
+    assert cache.stats()["hit_rate"] == 2 / 3
+
+    # A calorie target that rounds to a zero bucket is never cached, and a zero bucket is never scaled
+    assert profile_signature(dict(profile, daily_calories=40)) is None
+    zero = MealPlanCache()
+    zero.put(("a", (), (), 0), {"monday": {"lunch": {"name": "Soup", "calories": 0}}})
+    assert zero.get(("a", (), (), 100)) is None
+
+    first = SimpleNamespace(user_id="plan_cache_first", session=SimpleNamespace(id="s1"))
+    second = SimpleNamespace(user_id="plan_cache_second", session=SimpleNamespace(id="s2"))
+    for context in (first, second):
+        save_user_profile("User", 30, 70, 175, "weight_loss", "light", "vegan", daily_calories=1800,
+                          tool_context=context)
+    assert "No cached meal plan" in get_cached_meal_plan(tool_context=first)
+    save_meal_plan_to_memory(json.dumps({"monday": {"breakfast": "Tofu scramble"}}), tool_context=first)
+    cached = json.loads(get_cached_meal_plan(tool_context=second))
+    assert cached["plan"] == {"monday": {"breakfast": "Tofu scramble"}}
+    stats = json.loads(get_user_stats(tool_context=second))
+    assert stats["has_meal_plan"]
+    assert stats["meal_plan_cache"]["hits"] >= 1
+
+    print("✅ Meal plan cache working correctly")
+
+
+def test_meal_plan_index():
+    """Test that saved meal plans are indexed by day and meal type with precomputed totals."""
+    import json
+    from datetime import date
+    from types import SimpleNamespace
+    from nutrition_coach_agent.meal_plan_index import DAYS, MealPlanIndex, resolve_day
+    from nutrition_coach_agent.tools import (
+        get_meal_plan_totals, get_planned_meal, get_remaining_meals, log_meal, save_meal_plan_to_memory,
+        session_store
+    )
+
+    # Free-form shapes: nested container, day abbreviations, macro aliases, typed meal lists, estimates
+    index = MealPlanIndex({"plan": [
+        {"day": "Mon", "meals": [{"type": "Breakfast", "name": "Oats", "kcal": "400 kcal", "protein": 15,
+                                  "carbs": 60, "fat": 8},
+                                 {"type": "post-workout snack", "name": "Shake",
+                                  "macros": {"calories": 200, "protein": 30, "carbs": 10, "fats": 3}}]},
+        {"day": "Tuesday", "lunch": {"name": "Chicken rice", "foods": ["chicken breast 150g", "rice 1 cup"]}}
+    ]})
+    assert index.days == ["monday", "tuesday"]
+    assert index.meal("monday", "snacks")["totals"]["protein_g"] == 30
+    assert index.day_totals["monday"] == {"calories": 600, "protein_g": 45, "carbs_g": 70, "fats_g": 11}
+    assert index.meal("tuesday", "lunch")["totals"]["protein_g"] > 40  # estimated from the food database
+    assert index.totals()["weekly_totals"]["protein_g"] == index.day_totals["monday"]["protein_g"] + \
+        index.day_totals["tuesday"]["protein_g"]
+    assert resolve_day("tomorrow", date(2024, 1, 7)) == "monday"
+
+    # Keys that only start like a day are not days, and do not overwrite the real ones
+    lunch = lambda calories: {"lunch": {"name": "Bowl", "calories": calories, "protein_g": 30,
+                                        "carbs_g": 50, "fats_g": 10}}
+    index = MealPlanIndex({"monday": lunch(500), "monthly_notes": lunch(1), "friendly_tips": lunch(2),
+                           "Sunscreen": lunch(3), "Thurs": lunch(600), "day 3": lunch(700)})
+    assert index.days == ["monday", "wednesday", "thursday"]
+    assert index.day_totals["monday"]["calories"] == 500
+    assert resolve_day("tues") == "tuesday" and resolve_day("saturation") is None
+
+    context = SimpleNamespace(user_id="meal_plan_index_user", session=SimpleNamespace(id="s"))
+    session_store.evict(context.user_id)
+    assert get_planned_meal("tuesday", "lunch", tool_context=context).startswith("Error: No meal plan")
+
+    meal = lambda name, calories, protein: {"name": name, "calories": calories, "protein_g": protein,
+                                            "carbs_g": 50, "fats_g": 10}
+    plan = {day.capitalize(): {"breakfast": meal(f"{day} oats", 400, 20), "lunch": meal(f"{day} bowl", 600, 40),
+                               "dinner": meal(f"{day} salmon", 700, 45),
+                               "snacks": [meal("Yogurt", 150, 15), meal("Shake", 200, 30)]}
+            for day in DAYS}
+    save_meal_plan_to_memory(json.dumps(plan), tool_context=context)
+
+    lunch = json.loads(get_planned_meal("Tuesday", "Lunch", tool_context=context))
+    assert lunch["meals"][0]["name"] == "tuesday bowl" and lunch["totals"]["calories"] == 600
+    assert get_planned_meal("someday", "lunch", tool_context=context).startswith("Error")
+    weekly = json.loads(get_meal_plan_totals(tool_context=context))
+    assert weekly["weekly_totals"]["protein_g"] == 7 * 150 and weekly["days_planned"] == 7
+    friday = json.loads(get_meal_plan_totals("friday", tool_context=context))
+    assert friday["by_meal_type"]["snacks"]["calories"] == 350
+
+    log_meal("Oats", "breakfast", "oats", 400, 20, 50, 10, tool_context=context)
+    log_meal("Yogurt", "snack", "greek yogurt", 150, 15, 10, 5, tool_context=context)
+    remaining = json.loads(get_remaining_meals(tool_context=context))
+    assert list(remaining["remaining"]) == ["lunch", "dinner", "snacks"]
+    assert [m["name"] for m in remaining["remaining"]["snacks"]] == ["Shake"]
+    assert remaining["remaining_totals"]["calories"] == 600 + 700 + 200
+
+    print("✅ Meal plan index working correctly")
+
+
+def test_shopping_list():
+    """Test that the shopping list aggregates plan ingredients into normalized, categorized amounts."""
+    import json
+    from types import SimpleNamespace
+    from nutrition_coach_agent.meal_plan_index import DAYS
+    from nutrition_coach_agent.shopping_list import format_amount
+    from nutrition_coach_agent.tools import get_shopping_list, save_meal_plan_to_memory, session_store
+
+    context = SimpleNamespace(user_id="shopping_list_user", session=SimpleNamespace(id="s"))
+    session_store.evict(context.user_id)
+    assert get_shopping_list(tool_context=context).startswith("Error: No meal plan")
+
+    plan = {day: {"breakfast": {"name": "Oats", "foods": ["oats 40g", "1 banana", "milk 250ml"]},
+                  "lunch": {"name": "Chicken rice", "foods": ["150g chicken breast", "rice 1 cup", "1 tbsp olive oil"]},
+                  "dinner": {"name": "Salmon", "foods": ["0.2 kg salmon", "2 eggs", "pinch of sumac"]},
+                  "snacks": [{"name": "Shake", "foods": ["milk 1 cup"]}]}
+            for day in DAYS}
+    save_meal_plan_to_memory(json.dumps(plan), tool_context=context)
+
+    shopping = json.loads(get_shopping_list(tool_context=context))
+    items = {line["item"]: line for lines in shopping["categories"].values() for line in lines}
+    assert shopping["days"] == list(DAYS)
+    assert items["chicken breast"]["amount"] == 1050 and items["chicken breast"]["display"] == "1.05 kg"
+    assert items["salmon"]["amount"] == 1400
+    assert items["milk"]["unit"] == "ml" and items["milk"]["amount"] == 7 * (250 + 240)
+    assert items["olive oil"]["display"] == "105 ml"
+    assert items["egg"]["display"] == "14 pieces" and items["banana"]["amount"] == 7
+    assert items["white rice"]["unit"] == "g"  # a cup of rice is bought by weight
+    assert [line["item"] for line in shopping["categories"]["Meat & Fish"]] == ["chicken breast", "salmon"]
+    assert list(shopping["categories"])[-1] == "Other" and shopping["unmatched"] == ["pinch of sumac"]
+
+    # Foods that only contain a known name are listed as written, not as that food
+    save_meal_plan_to_memory(json.dumps({"monday": {"breakfast": {"name": "Treats", "foods": [
+        "water 500ml", "apple pie", "banana bread 2 slices", "potato chips"
+    ]}}}), tool_context=context)
+    treats = json.loads(get_shopping_list(tool_context=context))
+    assert list(treats["categories"]) == ["Other"]
+    assert [line["item"] for line in treats["categories"]["Other"]] == [
+        "apple pie", "banana bread", "potato chips", "water"
+    ]
+    assert treats["unmatched"] == ["apple pie", "banana bread 2 slices", "potato chips", "water 500ml"]
+    save_meal_plan_to_memory(json.dumps(plan), tool_context=context)
+
+    partial = json.loads(get_shopping_list("monday, tuesday", tool_context=context))
+    partial_items = {line["item"]: line for lines in partial["categories"].values() for line in lines}
+    assert partial["days"] == ["monday", "tuesday"] and partial_items["chicken breast"]["amount"] == 300
+    assert get_shopping_list("funday", tool_context=context).startswith("Error")
+    assert format_amount(1, "pieces") == "1 piece"
+
+    print("✅ Shopping list working correctly")
+
+
+def test_summary_output_modes():
+    """Test compact, paginated and delta summaries keep tool output flat as logs grow."""
+    import json
+    from datetime import datetime, timedelta
+    from types import SimpleNamespace
+    from unittest import mock
+    from nutrition_coach_agent import serialization
+    from nutrition_coach_agent.tools import (
+        get_daily_summary, get_user_stats, save_user_profile, session_store
+    )
+
+    context = SimpleNamespace(user_id="summary_modes_user", session=SimpleNamespace(id="s"))
+    session_store.evict(context.user_id)
+    save_user_profile("Sam", 30, 70, 175, "maintenance", "moderate", tool_context=context)
+
+    def log(count, start):
+        with session_store.lease(context.user_id) as memory:
+            for i in range(count):
+                when = start + timedelta(seconds=i)
+                if i % 4 == 0:
+                    memory.log_workout({"type": "cardio", "duration": 30, "intensity": "moderate"}, timestamp=when)
+                else:
+                    memory.log_meal({"name": f"Meal {i}", "type": "snack", "calories": 100,
+                                     "macros": {"protein": 5}}, timestamp=when)
+
+    morning = datetime.combine(datetime.now().date(), datetime.min.time())
+    with session_store.lease(context.user_id) as memory:
+        memory.log_hydration(300, timestamp=morning - timedelta(days=1))  # before today: not in the first delta
+    log(8, morning)
+    small = get_daily_summary(tool_context=context)
+    log(200, morning + timedelta(minutes=10))
+    large = get_daily_summary(tool_context=context)
+    assert abs(len(large) - len(small)) < 20  # compact size does not grow with the number of entries
+    assert "\n" not in large
+    totals = json.loads(large)["totals"]
+    assert totals["meals"] + totals["workouts"] == 208 and "remaining" in totals
+
+    # Details: walk every page; entries logged mid-walk do not shift the pages already returned
+    seen, cursor, pages = [], "", 0
+    while True:
+        page = json.loads(get_daily_summary("details", cursor, 25, tool_context=context))
+        assert len(page["entries"]) <= 25
+        seen += page["entries"]
+        pages += 1
+        if pages == 2:
+            log(4, morning + timedelta(hours=5))
+        if "next_cursor" not in page:
+            break
+        cursor = page["next_cursor"]
+    assert len(seen) == page["total_entries"] == 212
+    assert seen[0]["kind"] == "workout" and seen[1] == {"kind": "meal", "time": "00:00", "name": "Meal 1",
+                                                        "type": "snack", "calories": 100, "protein_g": 5}
+    assert get_daily_summary("details", "not-a-cursor", tool_context=context).startswith("Error")
+    assert get_daily_summary("everything", tool_context=context).startswith("Error")
+    assert get_daily_summary("details", limit="ten", tool_context=context).startswith("Error: limit")
+    assert get_daily_summary("delta", limit=None, tool_context=context).startswith("Error: limit")
+    assert json.loads(get_daily_summary("details", limit="5", tool_context=context))["next_cursor"]
+
+    # Delta: first call starts from today, later calls return only what is new
+    first = json.loads(get_daily_summary("delta", limit=50, tool_context=context))
+    assert len(first["entries"]) == 50 and first["has_more"]
+    drained = 50
+    while first["has_more"]:
+        first = json.loads(get_daily_summary("delta", limit=50, tool_context=context))
+        drained += len(first["entries"])
+    assert drained == 212
+    log(1, morning + timedelta(hours=6))
+    delta = json.loads(get_daily_summary("delta", tool_context=context))
+    assert [entry["kind"] for entry in delta["entries"]] == ["workout"] and not delta["has_more"]
+
+    stats = get_user_stats(tool_context=context)
+    assert "\n" not in stats and json.loads(stats)["total_meals_logged"] == 159
+    full = get_user_stats("full", tool_context=context)
+    assert "\n" in full and json.loads(full)["total_meals_logged"] == 159
+
+    # The stdlib fallback produces the same compact JSON
+    with mock.patch.object(serialization, "orjson", None):
+        assert serialization.dumps({"a": [1, 2.5], "b": None}) == '{"a":[1,2.5],"b":null}'
+    assert json.loads(serialization.dumps({"a": [1, 2.5], "b": None})) == {"a": [1, 2.5], "b": None}
+
+    print("✅ Summary output modes working correctly")
+
+
+def test_progress_analytics():
+    """Test that rolling trends, streaks and adherence stay exact as entries are logged in any order."""
+    import json
+    import os
+    import random
+    import tempfile
+    from datetime import datetime, timedelta
+    from types import SimpleNamespace
+    from nutrition_coach_agent.storage import SQLiteBackend
+    from nutrition_coach_agent.tools import SessionMemory, get_trends, save_user_profile, session_store
+
+    profile = {"name": "Ana", "age": 30, "weight_kg": 70, "height_cm": 175, "sex": "female",
+               "fitness_goal": "maintenance", "activity_level": "moderate"}
+    now = datetime.now().replace(hour=12)
+    today = now.date()
+    entries = []
+    for days_ago in range(40):
+        when = now - timedelta(days=days_ago)
+        entries.append(("meal", when, {"name": "Lunch", "calories": 1000, "macros": {"protein": 60}}))
+        entries.append(("meal", when, {"name": "Dinner", "calories": 900 + 100 * (days_ago % 3),
+                                       "macros": {"protein": 50}}))
+        if days_ago in (0, 1, 2, 5, 6, 20):
+            entries.append(("workout", when, {"type": "strength", "duration": 45, "intensity": "high"}))
+        if days_ago < 10:
+            entries.append(("hydration", when, 1600))
+            entries.append(("hydration", when, 1600 if days_ago != 4 else 500))
+
+    def replay(memory, items):
+        for kind, when, data in items:
+            if kind == "meal":
+                memory.log_meal(data, timestamp=when)
+            elif kind == "workout":
+                memory.log_workout(data, timestamp=when)
+            else:
+                memory.log_hydration(data, timestamp=when)
+
+    ordered = SessionMemory()
+    ordered.set_user_profile(dict(profile))
+    replay(ordered, sorted(entries, key=lambda entry: entry[1]))
+    shuffled = SessionMemory()
+    shuffled.set_user_profile(dict(profile))
+    random.Random(7).shuffle(entries)
+    replay(shuffled, entries)
+
+    trends = ordered.get_trends()
+    assert shuffled.get_trends() == trends
+    targets = ordered.get_targets()
+    week = trends["7d"]
+    assert targets["water_ml"] == 3150
+    assert week["days_with_meals"] == 7 and week["avg_water_ml"] == 3042.9
+    assert week["avg_calories"] == round(sum(1900 + 100 * (d % 3) for d in range(7)) / 7, 1)
+    assert week["workouts"] == 5 and week["workout_minutes"] == 225
+    assert trends["28d"]["workouts"] == 6 and trends["28d"]["workouts_per_week"] == 1.5
+    in_range = [d for d in range(28) if abs(1900 + 100 * (d % 3) - targets["calories"]) <= 0.1 * targets["calories"]]
+    assert trends["28d"]["adherence"]["calories"] == round(len(in_range) / 28, 2)
+    assert trends["streaks"]["workout_days"] == {"current": 3, "longest": 3}
+    assert trends["streaks"]["hydration_goal_days"] == {"current": 4, "longest": 5}
+    assert trends["7d"]["adherence"]["hydration"] == 0.86
+    assert trends["change_7d_vs_28d"]["workouts_per_week"] > 0
+
+    # Days leave the windows as time passes
+    later = ordered.get_trends(today + timedelta(days=8))
+    assert later["7d"]["days_with_meals"] == 0 and later["7d"]["avg_calories"] is None
+    assert later["28d"]["days_with_meals"] == 20
+    assert later["streaks"]["workout_days"]["current"] == 0
+
+    # New targets re-score past days
+    shuffled.set_user_profile(dict(profile, weight_kg=40))
+    rescored = shuffled.get_trends()
+    assert rescored["targets"]["water_ml"] < targets["water_ml"]
+    assert rescored["7d"]["adherence"]["hydration"] == 1.0
+    assert rescored["streaks"]["hydration_goal_days"] == {"current": 10, "longest": 10}
+
+    # A user restored from storage gets the same trends
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteBackend(os.path.join(tmp, "coach.db"))
+        stored = SessionMemory(user_id="ana", backend=backend)
+        stored.set_user_profile(dict(profile))
+        replay(stored, entries)
+        backend.close()
+        backend = SQLiteBackend(os.path.join(tmp, "coach.db"))
+        assert SessionMemory(user_id="ana", backend=backend).get_trends() == trends
+        backend.close()
+
+    context = SimpleNamespace(user_id="trends_test_user", session=SimpleNamespace(id="s"))
+    session_store.evict(context.user_id)
+    assert get_trends(tool_context=context).startswith("No workouts")
+    save_user_profile("Ana", 30, 70, 175, "maintenance", "moderate", sex="female", tool_context=context)
+    with session_store.lease(context.user_id) as memory:
+        replay(memory, entries)
+    result = get_trends(tool_context=context)
+    assert "\n" not in result and json.loads(result)["7d"] == week
+
+    print("✅ Progress analytics working correctly")
+
+
+def test_fast_path_router():
+    """Test that the fast-path router only matches unambiguous logging messages."""
+    from types import SimpleNamespace
+
+    from nutrition_coach_agent.fast_path import FastPathRouter
+
+    router = FastPathRouter()
+
+    water = router.match("I've just had 2 glasses of water!")
+    assert water.intent == "log_water" and water.args == {"amount_ml": 500}
+    assert router.match("drank 1.5 liters of water.").args == {"amount_ml": 1500}
+
+    workout = router.match("ran for 30 minutes at a moderate pace")
+    assert workout.intent == "log_workout"
+    assert workout.args["workout_type"] == "cardio"
+    assert workout.args["duration_minutes"] == 30
+    assert workout.args["intensity"] == "moderate"
+
+    meal = router.match("had 2 eggs and a banana for breakfast")
+    assert meal.intent == "log_meal"
+    assert meal.args["meal_type"] == "breakfast"
+    assert meal.args["foods"] == "2 eggs, a banana"
+
+    # Anything ambiguous goes to the model
+    for message in [
+        "How much water should I drink?",
+        "I didn't drink 500ml of water",
+        "did 45 min cardio",  # no intensity
+        "had mac and cheese for dinner",  # not an exact food match
+        "had 2 eggs for breakfast yesterday",
+        "I drank 500ml of water. Also make me a meal plan",
+        "drank 20 liters of water"
+    ]:
+        assert router.match(message) is None, message
+
+    context = SimpleNamespace(user_id="fast_path_test", session=SimpleNamespace(id="s1"))
+    reply = router.handle("had 2 eggs and a banana for breakfast", tool_context=context)
+    assert reply.startswith("🍽️ Meal logged") and "estimated from food database" in reply
+    assert router.handle("What should I eat?", tool_context=context) is None
+    print("✅ Fast-path router working correctly")
+
+
+def test_import_time_budget():
+    """Test that importing the package and tools is fast and does not load google.adk."""
+    import subprocess
+
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import nutrition_coach_agent, nutrition_coach_agent.tools\n"
+        "elapsed = time.perf_counter() - start\n"
+        "print(elapsed, 'google.adk' in sys.modules, 'numpy' in sys.modules)\n"
+    )
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    timings = []
+    for _ in range(3):
+        output = subprocess.run(
+            [sys.executable, "-c", script], cwd=project_root, capture_output=True, text=True, check=True
+        ).stdout.split()
+        assert output[1:] == ["False", "False"], f"Heavy modules imported eagerly: {output}"
+        timings.append(float(output[0]))
+
+    cold_start = min(timings)
+    assert cold_start < IMPORT_TIME_BUDGET_S, f"Cold import took {cold_start:.3f}s (budget {IMPORT_TIME_BUDGET_S}s)"
+    print(f"✅ Cold import in {cold_start * 1000:.0f}ms without google.adk")
+
+
 def run_all_tests():
     """Run all integration tests."""
     print("=" * 60)
@@ -106,8 +926,26 @@ def run_all_tests():
         test_agent_creation()
         test_sub_agents()
         test_tools()
+        test_exported_app()
         test_configuration()
         test_session_memory()
+        test_session_memory_daily_index()
+        test_session_memory_daily_totals()
+        test_session_store_isolation()
+        test_sqlite_backend()
+        test_sqlite_backend_failed_writes()
+        test_bulk_logging_tools()
+        test_compact_records()
+        test_targets_engine()
+        test_food_database()
+        test_search_cache()
+        test_meal_plan_cache()
+        test_meal_plan_index()
+        test_shopping_list()
+        test_summary_output_modes()
+        test_progress_analytics()
+        test_fast_path_router()
+        test_import_time_budget()
 
         print("\n" + "=" * 60)
         print("✅ ALL TESTS PASSED!")